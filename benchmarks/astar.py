@@ -0,0 +1,140 @@
+"""Compares the current ``AStar.find`` against the previous implementation.
+
+The previous search kept the visited tiles in a list and marked tiles as
+visited when pushed. It is reproduced here, unchanged, as ``legacy_find``.
+
+Usage::
+
+    python benchmarks/astar.py [n_searches]
+
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# run from a checkout, without installing the package
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(BENCHMARKS_DIR), BENCHMARKS_DIR]
+
+import vindinium as vin
+from vindinium.ai import AStar, HeapQueue
+from vindinium.models import Map
+
+SIZES = [10, 20, 30, 40]
+SEED = 42
+
+
+def random_map(size, seed):
+    """Creates a seeded random board with walls, mines, taverns, spawns and
+    some hero overlay tiles."""
+    rnd = random.Random(seed)
+    tiles = [vin.TILE_EMPTY] * 12 + [vin.TILE_WALL] * 4 + [
+        vin.TILE_MINE, vin.TILE_TAVERN, vin.TILE_SPAWN, vin.TILE_HERO,
+        vin.TILE_ADJ_HERO, vin.TILE_NEAR_HERO]
+
+    game_map = Map(size)
+    for y in xrange(size):
+        for x in xrange(size):
+            game_map[x, y] = rnd.choice(tiles)
+    return game_map
+
+
+def random_queries(game_map, n, seed):
+    """Creates ``n`` seeded (x0, y0, x1, y1) queries starting on a walkable
+    tile."""
+    rnd = random.Random(seed)
+    size = game_map.size
+    walkable = [(x, y) for y in xrange(size) for x in xrange(size)
+                if game_map[x, y] not in (vin.TILE_WALL, vin.TILE_MINE, vin.TILE_TAVERN)]
+
+    queries = []
+    for _ in xrange(n):
+        x0, y0 = rnd.choice(walkable)
+        queries.append((x0, y0, rnd.randrange(size), rnd.randrange(size)))
+    return queries
+
+
+def legacy_find(self, x0, y0, x1, y1):
+    """The previous ``AStar.find``, kept for comparison."""
+    game_map = self._map
+    adjacent = game_map[x1, y1] in self.obstacle_tiles
+
+    start = (x0, y0, 0, None)
+    queue = HeapQueue()
+    visited = [(x0, y0)]
+
+    queue.push(start, 0)
+    while not queue.is_empty():
+        state = queue.pop()
+        x, y, g, parent = state
+
+        if (x == x1 and y == y1) or (adjacent and (abs(x - x1) + abs(y - y1)) == 1):
+            break
+
+        for dx, dy in vin.DIR_NEIGHBORS:
+            x_, y_ = x + dx, y + dy
+            if not(-1 < x_ < game_map.size and -1 < y_ < game_map.size):
+                continue
+
+            tile = game_map[x_, y_]
+            if tile in self.obstacle_tiles or (x_, y_) in visited:
+                continue
+            visited.append((x_, y_))
+
+            if tile in self.avoid_spawn:
+                cost = self.cost_avoid_spawn
+            elif tile in self.avoid_adj:
+                cost = self.cost_avoid_adj
+            elif tile in self.avoid_near:
+                cost = self.cost_avoid_near
+            else:
+                cost = self.cost_move
+
+            g_ = g + cost
+            h_ = abs(x_ - x1) + abs(y_ - y1)
+            queue.push((x_, y_, g_, state), g_ + h_)
+    else:
+        return None
+
+    result = []
+    while state:
+        result.insert(0, (state[0], state[1]))
+        state = state[3]
+    result.pop(0)
+    return result
+
+
+def path_cost(searcher, path):
+    """Weighted cost of a path for the searcher's cost profile."""
+    costs = searcher._tile_costs()
+    return sum(costs[searcher._map[x, y]] for x, y in path)
+
+
+def run(n_searches = 200):
+    print('size   legacy (ms)   current (ms)   speedup   cheaper paths')
+    for size in SIZES:
+        game_map = random_map(size, SEED + size)
+        queries = random_queries(game_map, n_searches, SEED)
+        searcher = AStar(game_map)
+
+        legacy = lambda: [legacy_find(searcher, *q) for q in queries]
+        current = lambda: [searcher.find(*q) for q in queries]
+
+        t_legacy = min(timeit.repeat(legacy, number = 1, repeat = 3)) / n_searches
+        t_current = min(timeit.repeat(current, number = 1, repeat = 3)) / n_searches
+
+        # the current search must never return a more expensive path
+        cheaper = 0
+        for q, old, new in zip(queries, legacy(), current()):
+            if old is not None and new is not None:
+                assert path_cost(searcher, new) <= path_cost(searcher, old)
+                cheaper += path_cost(searcher, new) < path_cost(searcher, old)
+
+        print('%4d   %11.3f   %12.3f   %6.1fx   %13d' % (
+              size, t_legacy * 1e3, t_current * 1e3, t_legacy / t_current, cheaper))
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,357 @@
+"""Benchmark suite for the hot path: pathfinding, map update and bot moves.
+
+Every benchmark runs on fixed seeded boards from 10x10 to 40x40 and on the
+state sequences recorded on them (``benchmarks/states``), so results are
+comparable between changes. Each benchmark reports its operations per
+second and the 50th, 95th and 99th percentiles of the latency of an
+operation:
+
+- ``astar/<profile>/<size>``: one ``AStar.find``, for the cost profile of
+  each shipped bot.
+- ``update/<size>``: one ``Game.update`` with the next recorded state.
+- ``move/<bot>/<size>``: one ``_move`` of a shipped bot (update included).
+- ``order_by_distance/<size>``: ordering the mines from a hero.
+- ``heap_queue/<size>``: pushing and popping one item per tile.
+- ``simulator/<size>``: a round (four turns) of the ``Simulator`` with its
+  default policy.
+
+Results can be saved as a baseline and later runs compared against it.
+Benchmarks slower than the baseline by more than the threshold are flagged
+and the exit status is 1. Baselines are machine specific, so compare runs
+of the same machine.
+
+Usage::
+
+    python benchmarks/suite.py                          # run all
+    python benchmarks/suite.py --save baseline.json     # save a baseline
+    python benchmarks/suite.py --compare baseline.json  # flag regressions
+    python benchmarks/suite.py --only astar --quick     # a quick subset
+    python benchmarks/suite.py --record                 # re-record states
+
+"""
+
+import argparse
+import contextlib
+import gc
+import gzip
+import json
+import os
+import random
+import sys
+import timeit
+
+# run from a checkout, without installing the package
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(BENCHMARKS_DIR), BENCHMARKS_DIR]
+
+import vindinium as vin
+from vindinium.ai import AStar, HeapQueue
+from vindinium.engine import Board, LocalGame, Simulator
+from vindinium.models import Game
+from vindinium.utils import percentile
+
+from astar import random_queries
+
+clock = timeit.default_timer
+
+SIZES = [10, 20, 30, 40]
+SEED = 42
+N_STATES = 60
+STATES_DIR = os.path.join(BENCHMARKS_DIR, 'states')
+
+# bot classes whose move is benchmarked
+BOTS = ['MinerBot', 'HunterBot', 'DecisionBot', 'RoleBot']
+
+
+def cost_profiles(size):
+    """Returns the AStar cost arguments of each shipped bot, by name."""
+    ms = float(size)
+    return [('default', (8, 6, 4)),
+            ('flat', (1, 1, 1)),
+            ('miner', (ms * 4, ms * 4, 5)),
+            ('aggressive', (-1, ms / 4)),
+            ('role', (ms / 16, ms / 4)),
+            ('cautious', (ms / 8, ms / 4)),
+            ('evade', (ms / 4, ms / 8))]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences the prints of games and bots."""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+# STATES ======================================================================
+def states_path(size):
+    return os.path.join(STATES_DIR, 'states-%d.json.gz' % size)
+
+
+def record_states(size):
+    """Plays a seeded local game on the board of the given size and saves
+    the states seen by hero 1."""
+    random.seed(SEED)
+    board = Board.generate(size, SEED + size)
+    game = LocalGame(board, n_turns = 4 * N_STATES, id = 'bench%d' % size)
+    bots = [vin.bots.MinerBot(), vin.bots.HunterBot(), vin.bots.DecisionBot(), vin.bots.MinerBot()]
+
+    states = []
+    with quiet():
+        for hero, bot in zip(game.heroes, bots):
+            bot._start(game.state(hero.id))
+
+        while not game.finished:
+            hero = game.hero
+            state = game.state(hero.id)
+            if hero.id == 1:
+                states.append(state)
+            game.move(bots[hero.id - 1]._move(state))
+
+    if not os.path.isdir(STATES_DIR):
+        os.makedirs(STATES_DIR)
+    with contextlib.closing(gzip.open(states_path(size), 'wb')) as f:
+        json.dump(states, f)
+
+
+def load_states(size):
+    """Returns the recorded states of the board of the given size."""
+    with contextlib.closing(gzip.open(states_path(size), 'rb')) as f:
+        return json.load(f)
+
+
+def game_at(states, k):
+    """Returns a game updated up to the k-th state."""
+    with quiet():
+        game = Game(states[0])
+    for state in states[1:k + 1]:
+        game.update(state, state['hero']['id'])
+    return game
+
+
+# BENCHMARKS ==================================================================
+def measure(operations):
+    """Runs each operation once and returns their latencies, in seconds.
+    The garbage collector is off meanwhile, as in ``timeit``."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        latencies = []
+        for operation in operations:
+            start = clock()
+            operation()
+            latencies.append(clock() - start)
+        return latencies
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def bench_astar(states, quick):
+    game = game_at(states, len(states) // 2)
+    queries = random_queries(game.map, 50 if quick else 300, SEED)
+
+    for name, costs in cost_profiles(game.map.size):
+        searcher = AStar(game.map, *costs)
+        find = searcher.find
+        measure([lambda q = q: find(*q) for q in queries[:10]])
+        yield name, measure([lambda q = q: find(*q) for q in queries])
+
+
+def bench_update(states, quick):
+    rounds = 1 if quick else 5
+
+    latencies = []
+    for _ in xrange(rounds):
+        with quiet():
+            game = Game(states[0])
+        latencies.extend(measure([lambda s = s: game.update(s, s['hero']['id'])
+                                  for s in states[1:]]))
+    yield None, latencies
+
+
+def bench_move(states, quick):
+    for name in BOTS:
+        random.seed(SEED)
+        bot = getattr(vin.bots, name)()
+        operations = [lambda s = s: bot._move(s) for s in states[1:]]
+        if quick:
+            operations = operations[:len(operations) // 3]
+
+        # a bot that fails is reported, not measured
+        with quiet():
+            try:
+                bot._start(states[0])
+                latencies = measure(operations)
+            except Exception as e:
+                latencies = '%s: %s' % (type(e).__name__, e)
+        yield name, latencies
+
+
+def bench_order_by_distance(states, quick):
+    order = vin.utils.order_by_distance
+    step = 3 if quick else 1
+
+    with quiet():
+        game = Game(states[0])
+    searcher = AStar(game.map)
+
+    latencies = []
+    for state in states[1::step]:
+        game.update(state, state['hero']['id'])
+        latencies.extend(measure([lambda h = h: order(h.x, h.y, game.mines, game.map, searcher)
+                                  for h in game.heroes]))
+    yield None, latencies
+
+
+def bench_heap_queue(states, quick):
+    size = states[0]['game']['board']['size']
+    rnd = random.Random(SEED)
+    items = [rnd.random() for _ in xrange(size * size)]
+
+    def push_pop():
+        queue = HeapQueue()
+        for item in items:
+            queue.push(item, item)
+        while not queue.is_empty():
+            queue.pop()
+
+    yield None, measure([push_pop] * (10 if quick else 50))
+
+
+def bench_simulator(states, quick):
+    game = game_at(states, 0)
+    sim = Simulator(game.map.size, game.empty_map.raw)
+    sim.load(game)
+    sim.max_turns = sys.maxint
+    move, policy = sim.move, sim.policy
+
+    def play_round():
+        for _ in xrange(4):
+            move(policy(sim.turn % 4))
+
+    yield None, measure([play_round] * (2000 if quick else 20000))
+
+
+BENCHMARKS = [('astar', bench_astar),
+              ('update', bench_update),
+              ('move', bench_move),
+              ('order_by_distance', bench_order_by_distance),
+              ('heap_queue', bench_heap_queue),
+              ('simulator', bench_simulator)]
+
+
+# REPORT ======================================================================
+def summarize(latencies):
+    """Returns the ops/sec and latency percentiles (in ms) of a benchmark."""
+    values = sorted(latencies)
+    return {'n': len(values),
+            'ops': len(values) / sum(values) if sum(values) > 0 else float('inf'),
+            'p50': percentile(values, 0.50) * 1e3,
+            'p95': percentile(values, 0.95) * 1e3,
+            'p99': percentile(values, 0.99) * 1e3}
+
+
+def run(sizes = SIZES, only = None, quick = False):
+    """Runs the benchmarks, printing a line for each.
+
+    Returns:
+        (dict) the summary of each benchmark, by name, or an ``error``.
+    """
+    results = {}
+    print('%-32s %10s %10s %10s %10s' % ('benchmark', 'ops/sec', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)'))
+    for size in sizes:
+        if not os.path.exists(states_path(size)):
+            record_states(size)
+        states = load_states(size)
+
+        for group, bench in BENCHMARKS:
+            if only and group not in only:
+                continue
+
+            for variant, latencies in bench(states, quick):
+                name = '/'.join([group] + ([variant] if variant else []) + [str(size)])
+                if isinstance(latencies, basestring):
+                    results[name] = {'error': latencies}
+                    print('%-32s %s' % (name, latencies))
+                    continue
+
+                result = results[name] = summarize(latencies)
+                print('%-32s %10.1f %10.3f %10.3f %10.3f' % (
+                      name, result['ops'], result['p50'], result['p95'], result['p99']))
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Compares each benchmark against a baseline. The median latency is
+    compared, being less sensitive to outliers than the ops/sec.
+
+    Returns:
+        (list) the names of the benchmarks slower than the baseline by more
+          than the threshold (a fraction, e.g. 0.1 for 10%).
+    """
+    regressions = []
+    print('')
+    print('%-32s %14s %14s %8s' % ('benchmark', 'baseline p50', 'current p50', 'speed'))
+    for name in sorted(results):
+        current, previous = results[name], baseline.get(name)
+        if previous is None or 'p50' not in current or 'p50' not in previous:
+            continue
+
+        # the change of speed, negative when slower
+        change = previous['p50'] / current['p50'] - 1 if current['p50'] > 0 else 0.0
+        flag = ''
+        if change < -threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('%-32s %14.3f %14.3f %+7.1f%%%s' % (name, previous['p50'], current['p50'],
+                                                 change * 100, flag))
+
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Runs the benchmark suite.')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = SIZES,
+                        help = 'board sizes, even numbers (default: %(default)s)')
+    parser.add_argument('--only', nargs = '+', choices = [group for group, _ in BENCHMARKS],
+                        help = 'run only these benchmarks')
+    parser.add_argument('--quick', action = 'store_true', help = 'fewer operations')
+    parser.add_argument('--save', metavar = 'FILE', help = 'save the results as a baseline')
+    parser.add_argument('--compare', metavar = 'FILE', help = 'compare against a baseline')
+    parser.add_argument('--threshold', type = float, default = 0.1,
+                        help = 'slowdown flagged as a regression (default: %(default)s)')
+    parser.add_argument('--record', action = 'store_true',
+                        help = 're-record the state sequences and exit')
+    args = parser.parse_args(argv)
+
+    if args.record:
+        for size in args.sizes:
+            record_states(size)
+            print('Recorded %s' % states_path(size))
+        return 0
+
+    results = run(args.sizes, args.only, args.quick)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent = 2, sort_keys = True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\n%d regression(s) over %d%%.' % (len(regressions), args.threshold * 100))
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,11 +11,16 @@ focusing on the strategy and specific techniques of your bot.
 
 The library has the following features:
 
+- Clients:
+    - Client: plays a game on the server with a bot.
+    - AsyncClient: plays many games at once, sharing a connection pool.
+
 - Bots:
     - RawBot: a bot that does nothing.
     - BaseBot: a bot that process the state and create and update a Game object.
     - RandomBot: a bot that perform random movements.
     - MinerBot: a bot that looks for mines continuously.
+    - MCTSBot: a Monte Carlo tree search over a fast game simulator.
 
 - Models (used by base bot to create the game structure):
     - Game: stores all other models.
@@ -23,9 +28,31 @@ The library has the following features:
     - Mine: represents a mine in the map.
     - Hero: represents a hero in the game.
     - Tavern: represents a tavern in the game.
+    - GameArrays: a struct-of-arrays view of heroes and mines.
 
 - AI algorithms (in general, already specialized for vindinium):
     - AStar: the A* algorithm.
+    - DistanceField: one-to-all path distances, lazily flooded.
+    - DistanceTable: static all-pairs distances of a map.
+
+- Engine (play games locally, without the server):
+    - Board: a static board, loaded from tiles or randomly generated.
+    - LocalGame: the game rules, producing the server's state dicts.
+    - play: plays a local game between four bots.
+    - LocalServer: a local HTTP stand-in for the server, used by Client.
+    - Simulator: a compact forward model of the rules, for search.
+
+- Tournament (vindinium.tournament): parallel self-play between bot classes,
+  with results appended to a file and summarized with confidence intervals.
+
+- Tuning (vindinium.tuning): genetic search over the propensities of
+  DecisionBot, with parallel local games and checkpoints.
+
+- Recording (vindinium.recording): compressed logs of the states and
+  commands of the games played by Client, replayed offline through a bot.
+
+- Archive (vindinium.archive): a columnar, memory-mapped store of recorded
+  games, with streaming queries over the whole archive.
 
 Note: this client fix the inconsistent axis of the server, so you don't have to
 worry about that (if you're using the game model).
@@ -33,10 +60,16 @@ worry about that (if you're using the game model).
 """
 
 from .client import *
+from .async_client import *
 from . import bots
 from . import models
 from . import ai
 from . import utils
+from . import engine
+from . import tournament
+from . import tuning
+from . import recording
+from . import archive
 
 # CONSTANTS
 # tile values
@@ -1,2 +1,6 @@
 from .heap_queue import *
-from .astar import *
\ No newline at end of file
+from .graph import *
+from .astar import *
+from .distance_field import *
+from .distance_table import *
+from .path_cache import *
@@ -1,26 +1,54 @@
+import heapq
+import weakref
 import vindinium as vin
-from vindinium.ai import HeapQueue
 
-__all__ = ['AStar']
-
-DIR_NEIGHBORS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+__all__ = ['AStar', 'default_searcher']
 
 
 class AStar(object):
     """A* algorithm specialized for vindinium.
 
-    The A* algorithm receives an instance of ``vindinium.models.Map``` and  
-    compute the best path when necessary. 
+    The A* algorithm receives an instance of ``vindinium.models.Map``` and
+    compute the best path when necessary.
+
+    The search works over tile ids (``y * size + x``, see ``Map.raw``) and the
+    map's adjacency (see ``Map.graph``), keeping a closed array and the best
+    known cost of every tile. A tile is closed when
+    it is popped from the open list, not when it is pushed, so the returned
+    path is optimal for the weighted costs. Decrease-key is done lazily: an
+    improved tile is pushed again and stale entries are skipped when popped.
+
+    An instance is meant to be built once per game and reused for every
+    search: the cost of each tile value is looked up in ``costs``, built by
+    ``refresh`` from the cost attributes and tile lists, and the per-tile
+    search buffers are allocated once and recycled with a search stamp, so a
+    search allocates nothing but its open list and result. As the map is
+    read on every search, overlay changes need no refresh. Since the buffers
+    are shared, an instance runs one search at a time.
 
     Attributes:
-        cost_avoid (float):     cost to walk over an avoidable tile (consult the
-                                    avoid_tiles attribute). Defaults to 4.
-        cost_move (float):      cost to walk over an empty tile. Defaults to 1.
-        obstacle_tiles (list):  a list of obstacles tile VALUES.
-        avoid_tiles (list):     a list of avoidable tile VALUES.
+        cost_avoid_adj (float):   cost to walk over a hero or hero adjacent
+                                    tile. Defaults to 8.
+        cost_avoid_near (float):  cost to walk over a tile two moves away
+                                    from a hero. Defaults to 6.
+        cost_avoid_spawn (float): cost to walk over a spawn tile. Defaults
+                                    to 4.
+        cost_move (float):        cost to walk over an empty tile. Defaults
+                                    to 1.
+        obstacle_tiles (list):    a list of obstacles tile VALUES.
+        avoid_spawn (list):       a list of tile VALUES using cost_avoid_spawn.
+        avoid_adj (list):         a list of tile VALUES using cost_avoid_adj.
+        avoid_near (list):        a list of tile VALUES using cost_avoid_near.
+        distance_table (vindinium.ai.DistanceTable): if given, its static
+                                    distances replace the Manhattan heuristic.
+                                    It must be built over the same walls,
+                                    taverns and mines. Defaults to None.
+        costs (list):             the cost of walking over each tile value,
+                                    or None for obstacles (see ``refresh``).
     """
 
-    def __init__(self, game_map, cost_adj = 8, cost_near = 6, cost_spawn = 4):
+    def __init__(self, game_map, cost_adj = 8, cost_near = 6, cost_spawn = 4,
+                 distance_table = None):
         """Constructor.
 
         Args:
@@ -29,6 +57,9 @@ class AStar(object):
             cost_avoid:        acceptable cost of avoiding an avoid tile (spawns)
 
             costs input is as follows [avoid_adjacency, avoid_nearness, avoid_spawn_points]
+
+            distance_table (vindinium.ai.DistanceTable): optional static
+              distances used as heuristic.
         """
 
         self.cost_avoid_adj   = cost_adj
@@ -42,12 +73,54 @@ class AStar(object):
         self.avoid_adj      = [vin.TILE_ADJ_HERO, vin.TILE_HERO, vin.TILE_SPAWN_HERO]
         self.avoid_near     = [vin.TILE_NEAR_HERO]
 
+        self.distance_table = distance_table
+
         self._map = game_map
 
+        # per-tile search buffers, valid where their stamp is the current one
+        n = game_map.size * game_map.size
+        self._stamp = 0
+        self._seen = [0] * n
+        self._closed = [0] * n
+        self._best = [0] * n
+        self._parent = [-1] * n
+
+        self.costs = [None] * 256
+        self.refresh()
+
+
+    def refresh(self):
+        """Rebuilds ``costs`` in place from the cost attributes and tile
+        lists. Must be called after changing any of them."""
+        costs = self.costs
+        for tile in xrange(len(costs)):
+            costs[tile] = self.cost_move
+
+        for tile in self.avoid_near:
+            costs[tile] = self.cost_avoid_near
+        for tile in self.avoid_adj:
+            costs[tile] = self.cost_avoid_adj
+        for tile in self.avoid_spawn:
+            costs[tile] = self.cost_avoid_spawn
+        for tile in self.obstacle_tiles:
+            costs[tile] = None
+
+        cheapest = min(self.cost_move, self.cost_avoid_adj,
+                       self.cost_avoid_near, self.cost_avoid_spawn)
+        self._h_scale = max(cheapest, 0)
+
+        self._profile = (id(self._map), self.cost_move, self.cost_avoid_adj,
+                         self.cost_avoid_near, self.cost_avoid_spawn,
+                         tuple(self.obstacle_tiles), tuple(self.avoid_spawn),
+                         tuple(self.avoid_adj), tuple(self.avoid_near))
+
 
     def find(self, x0, y0, x1, y1):
         """Find a path between (x0, y0) and (x1, y1).
 
+        If (x1, y1) is an obstacle (e.g., a mine or a tavern), the path ends in
+        the tile adjacent to it.
+
         Args:
             x0 (int): initial position in X.
             y0 (int): initial position in Y.
@@ -60,49 +133,85 @@ class AStar(object):
               include the goal.
             (None) otherwise.
         """
+        with vin.utils.PROFILER.span('search'):
+            return self.__find(x0, y0, x1, y1)
+
+
+    def __find(self, x0, y0, x1, y1):
+        """The search of ``find``."""
 
         # To avoid access on the dot
-        game_map = self._map
-        adjacent = False
-
-        # If obstacle, cancel search
-        if game_map[x1, y1] in self.obstacle_tiles:
-            adjacent = True
-
-        # State x, y, g, parent
-        start = (x0, y0, 0, None)
-        queue = HeapQueue()
-        visited = [(x0, y0)]
-        
-        queue.push(start, 0)
-        while not queue.is_empty():
-            state = queue.pop()
-            x, y, g, parent = state
+        size = self._map.size
+        tiles = self._map.raw
+        neighbors = self._map.graph.neighbors
+        costs = self.costs
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        start = y0 * size + x0
+        goal = y1 * size + x1
+
+        # If obstacle, search for a tile adjacent to the goal instead
+        adjacent = costs[tiles[goal]] is None
+        goal_links = neighbors[goal] if adjacent else ()
+
+        # The heuristic must not overestimate, so it is scaled by the cheapest
+        # step and, when searching for an adjacent tile, by one step less.
+        h_scale = self._h_scale
+        h_offset = 1 if adjacent else 0
+
+        # Static distances to the goal, already counting the adjacency. Tiles
+        # without a static distance cannot reach the goal at all.
+        h_row = None
+        if self.distance_table is not None:
+            h_row = self.distance_table.goal_row(x1, y1)
+
+        self._stamp = stamp = self._stamp + 1
+        seen = self._seen
+        closed = self._closed
+        best = self._best
+        parent = self._parent
+
+        seen[start] = stamp
+        best[start] = 0
+        # Entries are (f, -g, tile), so ties on f expand the deepest tile first
+        queue = [(0, 0, start)]
+        while queue:
+            f, g, i = heappop(queue)
+            g = -g
+
+            # Stale entry, the tile was already expanded with a lower cost
+            if closed[i] == stamp:
+                continue
+            closed[i] = stamp
 
             # Goal
-            if (x == x1 and y == y1) or (adjacent and (abs(x - x1) + abs(y - y1)) == 1):
+            if i == goal or i in goal_links:
                 break
 
             # Children
-            for x_, y_ in self.__neighbors(x, y, visited):
-                tile = game_map[x_, y_]
-
-                # determine cost based on tile type
-                if tile in self.avoid_spawn:
-                    cost = self.cost_avoid_spawn
-
-                elif tile in self.avoid_adj:
-                    cost = self.cost_avoid_adj
-
-                elif tile in self.avoid_near:
-                    cost = self.cost_avoid_near
+            for j in neighbors[i]:
+                if closed[j] == stamp:
+                    continue
 
-                else:
-                    cost = self.cost_move
+                cost = costs[tiles[j]]
+                if cost is None:
+                    continue
 
                 g_ = g + cost
-                h_ = abs(x_ - x1) + abs(y_ - y1)
-                queue.push((x_, y_, g_, state), g_ + h_)
+                if seen[j] != stamp or g_ < best[j]:
+                    if h_row is None:
+                        y_, x_ = divmod(j, size)
+                        h_ = abs(x_ - x1) + abs(y_ - y1) - h_offset
+                    else:
+                        h_ = h_row[j]
+                        if h_ is None:
+                            continue
+
+                    seen[j] = stamp
+                    best[j] = g_
+                    parent[j] = i
+                    heappush(queue, (g_ + h_scale * h_, -g_, j))
 
         # If while does not break, no path was discovered.
         else:
@@ -110,25 +219,48 @@ class AStar(object):
 
         # Prepare result
         result = []
-        while state:
-            result.insert(0, (state[0], state[1]))
-            state = state[3]
-        result.pop(0)
+        while i != start:
+            y, x = divmod(i, size)
+            result.append((x, y))
+            i = parent[i]
+        result.reverse()
 
         return result
 
 
-    def __neighbors(self, x, y, visited):
-        """Get the valid neighbors of a tile."""
-        m = self._map
-        s = m.size
-        for dx, dy in DIR_NEIGHBORS:
-            tx, ty = x + dx, y + dy
-            
-            if not(-1 < tx < s and -1 < ty < s):
-                continue
+    def profile(self):
+        """Returns a hashable description of the map and costs used by this
+        searcher, e.g. to cache results computed with it."""
+        return self._profile
+
+
+    def _tile_costs(self):
+        """Returns a list with the cost of walking over each tile value, or
+        None for obstacles. The list is ``costs``, shared."""
+        return self.costs
+
 
-            tile = m[tx, ty]
-            if tile not in self.obstacle_tiles and (tx, ty) not in visited:
-                visited.append((tx, ty))
-                yield tx, ty
+    def _heuristic_scale(self):
+        """Returns the cheapest step cost, used to keep the Manhattan
+        heuristic admissible. Non-positive costs disable the heuristic."""
+        return self._h_scale
+
+
+# default searcher of each map, see default_searcher
+_default_searchers = weakref.WeakKeyDictionary()
+
+
+def default_searcher(game_map):
+    """Returns an ``AStar`` with default costs over the given map, built on
+    the first call and reused while the map exists.
+
+    Args:
+        game_map (vindinium.models.Map): the map.
+
+    Returns:
+        (vindinium.ai.AStar) the searcher.
+    """
+    searcher = _default_searchers.get(game_map)
+    if searcher is None:
+        searcher = _default_searchers[game_map] = AStar(game_map)
+    return searcher
@@ -0,0 +1,389 @@
+import heapq
+import vindinium as vin
+
+__all__ = ['DistanceField']
+
+
+class DistanceField(object):
+    """Weighted distances from a single source to every tile of the map.
+
+    A distance field runs a single Dijkstra flood from (x0, y0) using the map
+    and cost configuration of an ``AStar`` instance. After that, the distance
+    and the first step towards any tile are O(1) queries, answering the same
+    questions as ``AStar.find`` without a new search per target.
+
+    The flood is lazy: it only advances until the queried tiles are settled,
+    and continues from there on later queries. The map tiles are copied when
+    the field is created, so later changes to the map do not affect it.
+
+    As in ``AStar.find``, paths to obstacles (e.g., mines and taverns) end in
+    the best tile adjacent to them. Among paths with the same cost, the one
+    with fewer moves is preferred.
+
+    Example::
+
+        field = DistanceField(searcher, hero.x, hero.y)
+        field.distance(mine.x, mine.y)   # same as len(searcher.find(...))
+        field.command(mine.x, mine.y)    # e.g. 'North'
+        field.nearest(game.taverns, 1)   # [(tavern, distance, (x, y))]
+
+    Attributes:
+        x0 (int): the source position in X.
+        y0 (int): the source position in Y.
+        size (int): the board size.
+    """
+
+    def __init__(self, searcher, x0, y0, tiles = None):
+        """Constructor.
+
+        Args:
+            searcher (vindinium.ai.AStar): provides the map and the costs.
+            x0 (int): the source position in X.
+            y0 (int): the source position in Y.
+            tiles (bytearray): the tiles to use instead of the searcher's map,
+              e.g., a predicted map. Defaults to None.
+        """
+        self.x0 = x0
+        self.y0 = y0
+        self.size = searcher._map.size
+
+        if tiles is None:
+            tiles = searcher._map.raw
+        self._tiles = bytearray(tiles)
+        self._costs = list(searcher.costs)
+        self._neighbors = searcher._map.graph.neighbors
+        self.__reset()
+
+        source = self.y0 * self.size + self.x0
+        self._cost[source] = 0
+        self._steps[source] = 0
+        self._queue = [(0, 0, source, source)]
+
+
+    def __reset(self):
+        """Clears the flood."""
+        n = self.size * self.size
+        self._cost = [None] * n
+        self._steps = [None] * n
+        self._first = [-1] * n
+        self._closed = bytearray(n)
+
+        # Tiles in the order they were settled, by increasing cost
+        self._order = []
+
+        # Where paths to each tile may end (see __ends)
+        self._ends = {}
+
+
+    def __advance(self):
+        """Settles the next tile of the Dijkstra flood.
+
+        Returns:
+            (int) the settled tile id, or None if the flood is complete.
+        """
+        tiles = self._tiles
+        costs = self._costs
+        neighbors = self._neighbors
+        best = self._cost
+        steps = self._steps
+        closed = self._closed
+        queue = self._queue
+        source = self.y0 * self.size + self.x0
+
+        while queue:
+            g, s, i, f = heapq.heappop(queue)
+
+            # Stale entry, the tile was already settled with a lower cost
+            if closed[i]:
+                continue
+            closed[i] = 1
+            best[i] = g
+            steps[i] = s
+            self._first[i] = f
+            self._order.append(i)
+
+            for j in neighbors[i]:
+                if closed[j]:
+                    continue
+
+                cost = costs[tiles[j]]
+                if cost is None:
+                    continue
+
+                g_ = g + cost
+                s_ = s + 1
+                if best[j] is None or (g_, s_) < (best[j], steps[j]):
+                    best[j] = g_
+                    steps[j] = s_
+                    heapq.heappush(queue, (g_, s_, j, j if i == source else f))
+
+            return i
+
+        return None
+
+
+    def rebase(self, tiles):
+        """Moves the field to new map tiles, keeping the part of the flood
+        that does not depend on the tiles that changed.
+
+        Any path through a changed tile first reaches one of its neighbors,
+        so every settled tile cheaper than the cheapest neighbor of a changed
+        tile (plus a step) keeps its distance and first step. The rest of the
+        flood is discarded and recomputed lazily over the new tiles, giving
+        the same results as a new field. Running ``settled`` generators are
+        invalidated.
+
+        Args:
+            tiles (bytearray): the new tiles, e.g. ``game.map.raw``.
+
+        Returns:
+            (int) the number of settled tiles kept.
+        """
+        tiles = bytearray(tiles)
+        old = self._tiles
+        if tiles == old:
+            return len(self._order)
+
+        costs = self._costs
+        neighbors = self._neighbors
+        best = self._cost
+        closed = self._closed
+        source = self.y0 * self.size + self.x0
+
+        # cheapest settled tile next to a changed tile
+        limit = None
+        for j in xrange(len(tiles)):
+            if tiles[j] == old[j] or j == source:
+                continue
+
+            for i in neighbors[j]:
+                if closed[i] and (limit is None or best[i] < limit):
+                    limit = best[i]
+
+            # the adjacency leaves walls out, and the source may be one
+            if j in neighbors[source]:
+                limit = 0
+
+        order = self._order
+        kept = len(order)
+        if limit is not None:
+            step = max(min(c for c in costs if c is not None), 0)
+            kept = 0
+            while kept < len(order) and best[order[kept]] < limit + step:
+                kept += 1
+
+        # keep the prefix of the flood and resume it from there
+        order = order[:kept]
+        old_cost, old_steps, old_first = self._cost, self._steps, self._first
+        self._tiles = tiles
+        self.__reset()
+        for i in order:
+            self._cost[i] = old_cost[i]
+            self._steps[i] = old_steps[i]
+            self._first[i] = old_first[i]
+            self._closed[i] = 1
+        self._order = order
+
+        if not order:
+            self._cost[source] = 0
+            self._steps[source] = 0
+            self._queue = [(0, 0, source, source)]
+            return 0
+
+        best = self._cost
+        steps = self._steps
+        closed = self._closed
+        queue = self._queue = []
+        for i in order:
+            g, s, f = best[i], steps[i], self._first[i]
+            for j in neighbors[i]:
+                if closed[j]:
+                    continue
+
+                cost = costs[tiles[j]]
+                if cost is None:
+                    continue
+
+                g_ = g + cost
+                s_ = s + 1
+                if best[j] is None or (g_, s_) < (best[j], steps[j]):
+                    best[j] = g_
+                    steps[j] = s_
+                    heapq.heappush(queue, (g_, s_, j, j if i == source else f))
+
+        return kept
+
+
+    def settled(self):
+        """Yields the tile ids by increasing cost from the source, advancing
+        the flood as needed."""
+        k = 0
+        order = self._order
+        while True:
+            if k < len(order):
+                yield order[k]
+                k += 1
+            elif self.__advance() is None:
+                return
+
+
+    def __ends(self, x, y):
+        """Returns the tile ids where a path to (x, y) may end: the tile
+        itself, or its walkable neighbors if (x, y) is an obstacle."""
+        size = self.size
+        i = y * size + x
+
+        ends = self._ends.get(i)
+        if ends is not None:
+            return ends
+
+        if self._costs[self._tiles[i]] is not None or (x, y) == (self.x0, self.y0):
+            ends = [i]
+        else:
+            # in the order of vin.DIR_NEIGHBORS, which breaks ties between ends
+            links = self._neighbors[i]
+            ends = [j for j in (i - 1, i + 1, i - size, i + size)
+                    if j in links and self._costs[self._tiles[j]] is not None]
+
+        self._ends[i] = ends
+        return ends
+
+
+    def __settled(self, x, y):
+        """Returns the tile id where the path to (x, y) ends, or None if the
+        tile cannot be reached."""
+        ends = self.__ends(x, y)
+        closed = self._closed
+
+        if len(ends) == 1:
+            j = ends[0]
+            while not closed[j]:
+                if self.__advance() is None:
+                    return None
+            return j
+
+        # Tiles settle by increasing cost, so the first end to be settled is
+        # the best one
+        cost, steps = self._cost, self._steps
+        best = None
+        while best is None:
+            for j in ends:
+                if closed[j] and (best is None or (cost[j], steps[j]) < (cost[best], steps[best])):
+                    best = j
+
+            if best is None and self.__advance() is None:
+                return None
+
+        return best
+
+
+    def cost(self, x, y):
+        """Returns the weighted cost to reach (x, y), or None if unreachable."""
+        i = self.__settled(x, y)
+        if i is None:
+            return None
+        return self._cost[i]
+
+
+    def distance(self, x, y):
+        """Returns the number of moves to reach (x, y), or None if unreachable.
+
+        The value is the length of the path returned by ``AStar.find``.
+        """
+        i = self.__settled(x, y)
+        if i is None:
+            return None
+        return self._steps[i]
+
+
+    def distances(self, targets):
+        """Returns the number of moves to reach each target, as
+        ``distance``, or None for unreachable targets.
+
+        Args:
+            targets (list): objects with ``x`` and ``y`` attributes.
+        """
+        steps = self._steps
+        distances = []
+        for target in targets:
+            i = self.__settled(target.x, target.y)
+            distances.append(None if i is None else steps[i])
+        return distances
+
+
+    def next_step(self, x, y):
+        """Returns the first tile to move to when going to (x, y).
+
+        Returns:
+            (tuple) the (x, y) of the first step. If the path is empty (the
+              source itself or an obstacle next to it), (x, y) is returned, so
+              ``vindinium.utils.path_to_command`` gives the right command.
+            (None) if (x, y) cannot be reached.
+        """
+        i = self.__settled(x, y)
+        if i is None:
+            return None
+
+        return self.__step(i, x, y)
+
+
+    def __step(self, i, x, y):
+        """Returns the first step towards (x, y), whose path ends in i."""
+        if i == self.y0 * self.size + self.x0:
+            return x, y
+
+        y_, x_ = divmod(self._first[i], self.size)
+        return x_, y_
+
+
+    def command(self, x, y):
+        """Returns the command to move towards (x, y), or None if (x, y)
+        cannot be reached."""
+        step = self.next_step(x, y)
+        if step is None:
+            return None
+        return vin.utils.path_to_command(self.x0, self.y0, step[0], step[1])
+
+
+    def nearest(self, targets, k = 1):
+        """Finds the k nearest targets, stopping the flood as soon as they are
+        settled.
+
+        Args:
+            targets (list): objects with ``x`` and ``y`` attributes, e.g.,
+              heroes, mines or taverns.
+            k (int): the maximum number of targets. Defaults to 1.
+
+        Returns:
+            (list) up to k ``(target, distance, (x, y))`` triples, nearest
+              first, where distance is the number of moves and (x, y) is the
+              first step (see ``next_step``). Unreachable targets are left out.
+        """
+        # which targets are reached when a given tile is settled
+        watch = {}
+        reachable = set()
+        for target in targets:
+            for j in self.__ends(target.x, target.y):
+                watch.setdefault(j, []).append(target)
+                reachable.add(id(target))
+
+        found = []
+        if not watch or k <= 0:
+            return found
+
+        seen = set()
+        for i in self.settled():
+            for target in watch.get(i, ()):
+                if id(target) in seen:
+                    continue
+                seen.add(id(target))
+
+                step = self.__step(i, target.x, target.y)
+                found.append((target, self._steps[i], step))
+                if len(found) == k:
+                    return found
+
+            if len(seen) == len(reachable):
+                break
+
+        return found
@@ -0,0 +1,264 @@
+import os
+import sys
+import struct
+import logging
+import hashlib
+import tempfile
+from array import array
+import vindinium as vin
+
+__all__ = ['DistanceTable']
+
+
+class DistanceTable(object):
+    """All-pairs shortest distances over the walkable tiles of a static map.
+
+    The table is built once per game from ``Game.empty_map`` with a
+    breadth-first search from every walkable tile, and stored as a flat
+    ``uint16`` matrix. Walls, taverns, mines and spawns never change during a
+    game, so the table holds for the whole game.
+
+    The distances are the minimum number of moves ignoring heroes, thus they
+    are a lower bound to any weighted path over the same map. ``AStar`` uses
+    them as an admissible heuristic when given a table.
+
+    Tables can be saved to a cache directory, keyed by a hash of the board
+    (see ``load_or_build``), so repeated games on the same map skip the build.
+
+    Attributes:
+        size (int): the board size.
+        key (str): the hash of the board tiles and obstacles.
+        tiles (array): the tile ids (``y * size + x``) of the walkable tiles.
+        index (array): the position of each tile id in ``tiles``, or -1.
+        table (array): the ``uint16`` distance matrix, indexed by
+          ``index[a] * len(tiles) + index[b]``.
+    """
+
+    UNREACHABLE = 0xFFFF
+    MAGIC = b'VDT1'
+
+    def __init__(self, game_map, obstacle_tiles = None, build = True):
+        """Constructor.
+
+        Args:
+            game_map (vindinium.models.Map): the static map (no heroes).
+            obstacle_tiles (list): the non-walkable tile VALUES. Defaults to
+              walls, taverns and mines, as in ``AStar``.
+            build (bool): whether to build the table now. Defaults to True.
+        """
+        if obstacle_tiles is None:
+            obstacle_tiles = [vin.TILE_WALL, vin.TILE_TAVERN, vin.TILE_MINE]
+
+        self.size = game_map.size
+        self.obstacle_tiles = list(obstacle_tiles)
+        self.key = self.board_key(game_map, obstacle_tiles)
+
+        size = self.size
+        raw = game_map.raw
+        self._walkable = bytearray(1 if raw[i] not in obstacle_tiles else 0
+                                   for i in xrange(size * size))
+
+        self.tiles = array('i', [i for i in xrange(size * size) if self._walkable[i]])
+        self.index = array('i', [-1] * (size * size))
+        for k, i in enumerate(self.tiles):
+            self.index[i] = k
+
+        self.table = None
+        self._rows = {}
+        self._links = game_map.graph.neighbors
+
+        if build:
+            self.build()
+
+
+    @staticmethod
+    def board_key(game_map, obstacle_tiles = None):
+        """Returns the hash identifying a board and its obstacles.
+
+        Args:
+            game_map (vindinium.models.Map): the static map.
+            obstacle_tiles (list): the non-walkable tile VALUES.
+
+        Returns:
+            (str) a hexadecimal digest.
+        """
+        if obstacle_tiles is None:
+            obstacle_tiles = [vin.TILE_WALL, vin.TILE_TAVERN, vin.TILE_MINE]
+
+        digest = hashlib.sha1()
+        digest.update(struct.pack('<H', game_map.size))
+        digest.update(bytes(bytearray(sorted(obstacle_tiles))))
+        digest.update(bytes(game_map.raw))
+        return digest.hexdigest()
+
+
+    def build(self):
+        """Builds the distance matrix with a BFS from every walkable tile."""
+        tiles = self.tiles
+        index = self.index
+        walkable = self._walkable
+        n = len(tiles)
+        unreachable = self.UNREACHABLE
+
+        # neighbors of each walkable tile, by position in ``tiles``
+        links = self._links
+        neighbors = [[index[j] for j in links[i] if walkable[j]] for i in tiles]
+
+        table = array('H', [unreachable]) * (n * n)
+        for source in xrange(n):
+            row = [unreachable] * n
+            row[source] = 0
+            frontier = [source]
+            distance = 0
+            while frontier:
+                distance += 1
+                next_frontier = []
+                for k in frontier:
+                    for j in neighbors[k]:
+                        if row[j] == unreachable:
+                            row[j] = distance
+                            next_frontier.append(j)
+                frontier = next_frontier
+
+            table[source * n:(source + 1) * n] = array('H', row)
+
+        self.table = table
+        self._rows = {}
+
+
+    def distance(self, x0, y0, x1, y1):
+        """Returns the number of moves between (x0, y0) and (x1, y1).
+
+        If (x1, y1) is an obstacle, returns the moves to the nearest tile
+        adjacent to it, like the length of an ``AStar.find`` path.
+
+        Returns:
+            (int) the distance, or None if unreachable.
+        """
+        row = self.goal_row(x1, y1)
+        return row[y0 * self.size + x0]
+
+
+    def goal_row(self, x, y):
+        """Returns the distances from every tile to the goal (x, y).
+
+        Rows are computed once per goal and kept.
+
+        Returns:
+            (list) indexed by tile id, the number of moves to reach (x, y),
+              or to a tile adjacent to it if it is an obstacle. None for
+              obstacles and tiles that cannot reach the goal.
+        """
+        size = self.size
+        goal = y * size + x
+
+        row = self._rows.get(goal)
+        if row is not None:
+            return row
+
+        n = len(self.tiles)
+        table = self.table
+        unreachable = self.UNREACHABLE
+
+        if self._walkable[goal]:
+            targets = [self.index[goal]]
+        else:
+            targets = [self.index[j] for j in self._links[goal] if self._walkable[j]]
+
+        best = [unreachable] * n
+        for k in targets:
+            best = map(min, best, table[k * n:(k + 1) * n])
+
+        row = [None] * (size * size)
+        for k, i in enumerate(self.tiles):
+            if best[k] != unreachable:
+                row[i] = best[k]
+
+        self._rows[goal] = row
+        return row
+
+
+    def save(self, path):
+        """Saves the table to a file, atomically. The file is little-endian
+        whatever the machine, so it can be shared between machines.
+
+        Args:
+            path (str): the file path.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.MAGIC)
+                f.write(struct.pack('<HI', self.size, len(self.tiles)))
+                table = self.table
+                if sys.byteorder == 'big':
+                    table = array('H', table)
+                    table.byteswap()
+                table.tofile(f)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+    def load(self, path):
+        """Loads the table from a file saved by ``save``.
+
+        Args:
+            path (str): the file path.
+
+        Raises:
+            ValueError if the file does not match this board.
+        """
+        with open(path, 'rb') as f:
+            header = f.read(len(self.MAGIC) + 6)
+            magic, (size, n) = header[:4], struct.unpack('<HI', header[4:])
+            if magic != self.MAGIC or size != self.size or n != len(self.tiles):
+                raise ValueError('Distance table file "%s" does not match '
+                                 'the board.' % path)
+
+            table = array('H')
+            table.fromfile(f, n * n)
+            if sys.byteorder == 'big':
+                table.byteswap()
+
+        self.table = table
+        self._rows = {}
+
+
+    @classmethod
+    def load_or_build(cls, game_map, cache_dir = None, obstacle_tiles = None):
+        """Loads the table of a board from the cache, building and caching it
+        if necessary.
+
+        Args:
+            game_map (vindinium.models.Map): the static map.
+            cache_dir (str): the cache directory, created if needed. If None,
+              the table is just built.
+            obstacle_tiles (list): the non-walkable tile VALUES.
+
+        Returns:
+            (vindinium.ai.DistanceTable) the table.
+        """
+        table = cls(game_map, obstacle_tiles, build = False)
+        if cache_dir is None:
+            table.build()
+            return table
+
+        path = os.path.join(cache_dir, table.key + '.vdt')
+        if os.path.exists(path):
+            try:
+                table.load(path)
+                return table
+            except (IOError, EOFError, ValueError, struct.error) as e:
+                logging.warning('Rebuilding the cached distance table "%s": %s', path, e)
+
+        table.build()
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            table.save(path)
+        except (IOError, OSError) as e:
+            logging.warning('Could not cache the distance table to "%s": %s', path, e)
+        return table
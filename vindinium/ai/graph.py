@@ -0,0 +1,84 @@
+from array import array
+import vindinium as vin
+
+__all__ = ['Graph']
+
+
+class Graph(object):
+    """The adjacency of a board, built once from its walls.
+
+    Every tile id (``y * size + x``, see ``Map.raw``) is linked to its
+    neighbors inside the board that are not walls, in north, south, west,
+    east order. The links are stored in compressed sparse row form: the
+    neighbors of tile i are ``targets[offsets[i]:offsets[i + 1]]``.
+
+    Walls never change during a game, so the graph is built once (see
+    ``Map.graph``) and shared by the searches and the move generation. As
+    indexing an ``array`` is slower than iterating a tuple in Python loops,
+    ``neighbors`` keeps the same links as one tuple per tile for the inner
+    loops of the searches.
+
+    Example::
+
+        graph = game.map.graph
+        for j in graph.neighbors[i]:
+            ...
+        graph.moves(hero.x, hero.y)   # {'Stay': (x, y), 'North': (x, y - 1)}
+
+    Attributes:
+        size (int): the board size.
+        offsets (array): where the neighbors of each tile start in
+          ``targets``, plus the total number of links at the end.
+        targets (array): the neighbor tile ids.
+        neighbors (list): the tuple of neighbor tile ids of each tile.
+    """
+
+    def __init__(self, game_map):
+        """Constructor.
+
+        Args:
+            game_map (vindinium.models.Map): the map whose walls are used.
+        """
+        size = game_map.size
+        tiles = game_map.raw
+        last = size - 1
+
+        self.size = size
+        self.offsets = array('i', [0] * (size * size + 1))
+        self.targets = array('i')
+        self.neighbors = []
+
+        for i in xrange(size * size):
+            y, x = divmod(i, size)
+            links = tuple(j for j, inside in ((i - size, y > 0), (i + size, y < last),
+                                              (i - 1, x > 0), (i + 1, x < last))
+                          if inside and tiles[j] != vin.TILE_WALL)
+
+            self.targets.extend(links)
+            self.offsets[i + 1] = len(self.targets)
+            self.neighbors.append(links)
+
+
+    def moves(self, x, y):
+        """Returns the commands that do not walk into a wall or off the
+        board from (x, y), as a dict of target (x, y) by command.
+
+        Moving into a mine, tavern or hero is valid. Staying always is.
+        """
+        size = self.size
+        i = y * size + x
+        links = self.neighbors[i]
+
+        moves = {vin.STAY : (i, (x, y)),
+                 vin.NORTH: (i - size, (x, y - 1)),
+                 vin.WEST : (i - 1, (x - 1, y)),
+                 vin.EAST : (i + 1, (x + 1, y)),
+                 vin.SOUTH: (i + size, (x, y + 1))}
+
+        valid_moves = {}
+        for key in moves:
+            j, target = moves[key]
+            if j == i or j in links:
+                valid_moves[key] = target
+
+        return valid_moves
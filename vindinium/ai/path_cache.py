@@ -0,0 +1,233 @@
+from collections import OrderedDict
+
+__all__ = ['PathCache']
+
+
+class PathCache(object):
+    """Complete paths kept across turns, until the tiles around them change.
+
+    Paths are found with ``AStar.find`` and stored by start, goal and the
+    searcher's cost profile (see ``AStar.profile``). An entry only depends on
+    the tiles on the path and next to it, so ``invalidate`` receives the
+    tiles whose overlay changed in a turn (see ``Game.update``) and drops the
+    entries around them, keeping the others.
+
+    A hero following a cached path does not need a new search: the tail of
+    the path from its new position is still valid, as long as the tiles
+    ahead of it did not change. Changes elsewhere on the map are ignored, so
+    a cached path is always walkable with the cost it was found with, but a
+    new cheaper path far from it may be missed until it is invalidated.
+
+    Example::
+
+        cache = PathCache(game.map.size)
+        cache.find(searcher, hero.x, hero.y, mine.x, mine.y)   # a search
+        cache.invalidate(changed_tiles)
+        cache.find(searcher, x, y, mine.x, mine.y)             # the tail
+
+    Attributes:
+        size (int): the board size.
+        capacity (int): the maximum number of paths kept. The oldest paths
+          are dropped first. Defaults to 128.
+        hits (int): queries answered with a whole cached path.
+        tail_hits (int): queries answered with the tail of a cached path.
+        misses (int): queries that needed a search.
+    """
+
+    def __init__(self, size, capacity = 128):
+        """Constructor.
+
+        Args:
+            size (int): the board size.
+            capacity (int): the maximum number of paths kept.
+        """
+        self.size = size
+        self.capacity = capacity
+        self.hits = 0
+        self.tail_hits = 0
+        self.misses = 0
+
+        # (start, goal, profile) -> _Entry, oldest first
+        self._entries = OrderedDict()
+
+        # (goal, profile) -> keys of the entries with that goal
+        self._by_goal = {}
+
+        # tile id -> keys of the entries on or next to it
+        self._by_tile = {}
+
+
+    def get(self, searcher, x0, y0, x1, y1):
+        """Returns the cached path from (x0, y0) to (x1, y1), without
+        searching.
+
+        Args:
+            searcher (vindinium.ai.AStar): the map and cost profile.
+            x0 (int): initial position in X.
+            y0 (int): initial position in Y.
+            x1 (int): goal position in X.
+            y1 (int): goal position in Y.
+
+        Returns:
+            (list) the path, as ``AStar.find``, if a cached path starts at
+              (x0, y0) or passes through it.
+            (None) otherwise.
+        """
+        size = self.size
+        start = y0 * size + x0
+        goal = (y1 * size + x1, searcher.profile())
+
+        entry = self._entries.get((start,) + goal)
+        if entry is not None and entry.valid_from == 0:
+            self.hits += 1
+            return entry.path(0)
+
+        for key in self._by_goal.get(goal, ()):
+            entry = self._entries[key]
+            k = entry.index.get(start)
+            if k is not None and k >= entry.valid_from:
+                self.tail_hits += 1
+                return entry.path(k)
+
+        return None
+
+
+    def find(self, searcher, x0, y0, x1, y1):
+        """Returns the path from (x0, y0) to (x1, y1), from the cache or
+        from a new search with ``searcher.find``, which is then cached.
+
+        Returns:
+            (list) the path, as ``AStar.find``.
+            (None) if there is no path.
+        """
+        path = self.get(searcher, x0, y0, x1, y1)
+        if path is not None:
+            return path
+
+        self.misses += 1
+        path = searcher.find(x0, y0, x1, y1)
+        if path is not None:
+            self.put(searcher, x0, y0, x1, y1, path)
+        return path
+
+
+    def put(self, searcher, x0, y0, x1, y1, path):
+        """Caches a path from (x0, y0) to (x1, y1) found with searcher."""
+        size = self.size
+        start = y0 * size + x0
+        goal = (y1 * size + x1, searcher.profile())
+        key = (start,) + goal
+
+        if key in self._entries:
+            self.__remove(key)
+        while len(self._entries) >= self.capacity:
+            self.__remove(next(iter(self._entries)))
+
+        entry = _Entry([start] + [y * size + x for x, y in path], size)
+        self._entries[key] = entry
+        self._by_goal.setdefault(goal, set()).add(key)
+        for i in entry.guard:
+            self._by_tile.setdefault(i, set()).add(key)
+
+
+    def invalidate(self, tiles):
+        """Drops the paths (or the part of them) that depend on the given
+        tiles.
+
+        A path from a tile only depends on the tiles ahead of it and their
+        neighbors, so a change behind a hero does not discard the tail in
+        front of it.
+
+        Args:
+            tiles (iterable): the ids (``y * size + x``) of the tiles whose
+              value changed.
+        """
+        by_tile = self._by_tile
+        for i in tiles:
+            keys = by_tile.get(i)
+            if not keys:
+                continue
+
+            for key in list(keys):
+                entry = self._entries[key]
+                entry.invalidate(i)
+                if entry.valid_from >= len(entry.nodes) - 1:
+                    self.__remove(key)
+
+
+    def clear(self):
+        """Drops every cached path."""
+        self._entries.clear()
+        self._by_goal.clear()
+        self._by_tile.clear()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __remove(self, key):
+        entry = self._entries.pop(key)
+
+        keys = self._by_goal[key[1:]]
+        keys.discard(key)
+        if not keys:
+            del self._by_goal[key[1:]]
+
+        for i in entry.guard:
+            keys = self._by_tile[i]
+            keys.discard(key)
+            if not keys:
+                del self._by_tile[i]
+
+
+class _Entry(object):
+    """A cached path, as the tile ids from the start to the end.
+
+    ``valid_from`` is the first index of ``nodes`` from where the rest of the
+    path can still be used.
+    """
+
+    __slots__ = ('nodes', 'index', 'guard', 'valid_from', '_size')
+
+    def __init__(self, nodes, size):
+        self.nodes = nodes
+        self.index = dict((i, k) for k, i in enumerate(nodes))
+        self.valid_from = 0
+        self._size = size
+
+        self.guard = set(nodes)
+        for i in nodes:
+            self.guard.update(self.__neighbors(i))
+
+
+    def path(self, k):
+        """Returns the (x, y) path from node k, not including it."""
+        size = self._size
+        return [(i % size, i // size) for i in self.nodes[k + 1:]]
+
+
+    def invalidate(self, i):
+        """Moves ``valid_from`` past the nodes whose path depends on i."""
+        k = self.index.get(i)
+        if k is not None:
+            # tile i is ahead of every node before it; its own value does
+            # not count when a path starts there
+            self.valid_from = max(self.valid_from, k)
+        else:
+            index = self.index
+            last = max(index.get(j, -1) for j in self.__neighbors(i))
+            self.valid_from = max(self.valid_from, last + 1)
+
+
+    def __neighbors(self, i):
+        size = self._size
+        y, x = divmod(i, size)
+        if y > 0:
+            yield i - size
+        if y < size - 1:
+            yield i + size
+        if x > 0:
+            yield i - 1
+        if x < size - 1:
+            yield i + 1
@@ -0,0 +1,498 @@
+"""A columnar, memory-mapped archive of recorded games, for bulk analysis.
+
+An archive is a directory with one binary file per column and a JSON index:
+
+- ``index.json``: the boards and the games, see ``Archive``.
+- ``boards.dat``: the static tiles of each distinct board (``Map.raw`` of
+  ``Game.empty_map``), one byte per tile, stored once per board.
+- ``game.dat``, ``turn.dat``: the game number and turn of each row.
+- ``hero_x.dat``, ``hero_y.dat``, ``hero_life.dat``, ``hero_gold.dat``,
+  ``hero_mine_count.dat``: one value per hero and row.
+- ``mine_owner.dat``: the owner (0 for none) of each mine of the board, per
+  row. Its width depends on the board, so each game keeps the offset of its
+  first row in this column.
+
+Every row is a turn seen by the recording hero, with fixed-width values, so
+the rows of a game are a contiguous block of every column and any column can
+be read with ``numpy.memmap`` (see ``Archive.column``) without loading the
+others nor the whole archive in memory. Positions are in the models' axes
+(see ``Hero``).
+
+The archive is filled from the ``Game`` models, turn by turn with
+``ArchiveWriter`` or from the logs of ``vindinium.recording``, and only
+grows by appending games.
+
+Example::
+
+    from vindinium.archive import ArchiveWriter, Archive, mine_control
+
+    with ArchiveWriter('archive') as writer:
+        for path in glob.glob('games/*.jsonl.gz'):
+            writer.add_log(path)
+
+    archive = Archive('archive')
+    for game, control in mine_control(archive):
+        ...
+
+"""
+
+import os
+import sys
+import json
+import mmap
+import hashlib
+import tempfile
+from array import array
+from collections import Counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import vindinium as vin
+
+__all__ = ['ArchiveWriter', 'Archive', 'mine_control', 'death_locations', 'tavern_usage']
+
+VERSION = 1
+N_HEROES = 4
+
+# name, array typecode and values per row of the row-aligned columns
+COLUMNS = [('game', 'I', 1),
+           ('turn', 'H', 1),
+           ('hero_x', 'B', N_HEROES),
+           ('hero_y', 'B', N_HEROES),
+           ('hero_life', 'B', N_HEROES),
+           ('hero_gold', 'I', N_HEROES),
+           ('hero_mine_count', 'H', N_HEROES)]
+
+# the mine owners, whose width is the number of mines of each board
+MINE_COLUMN = ('mine_owner', 'B')
+
+
+class ArchiveWriter(object):
+    """Appends games to an archive, creating it if needed.
+
+    A game is added turn by turn from its model::
+
+        writer = ArchiveWriter('archive')
+        writer.begin(game)
+        writer.append(game)        # after every Game.update
+        writer.end(finished = True)
+        writer.close()
+
+    The index is only saved by ``end``, so an archive is never left with a
+    partial game: the rows of a game that was not ended are dropped when the
+    archive is opened again.
+
+    Attributes:
+        path (str): the archive directory.
+        index (dict): the boards and the games of the archive.
+    """
+
+    def __init__(self, path):
+        """Constructor.
+
+        Args:
+            path (str): the archive directory.
+
+        Raises:
+            ValueError if the directory has an archive of another version or
+              byte order.
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        self.path = path
+        self.index = _load_index(path)
+        if self.index is None:
+            self.index = {'version': VERSION,
+                          'byteorder': sys.byteorder,
+                          'n_rows': 0,
+                          'n_mine_values': 0,
+                          'boards_size': 0,
+                          'boards': {},
+                          'games': []}
+        elif self.index['byteorder'] != sys.byteorder:
+            raise ValueError('Archive "%s" is %s endian.' % (path, self.index['byteorder']))
+
+        # drop the rows of a game that was not ended
+        self._truncate()
+
+        self._files = {}
+        for name, _, _ in COLUMNS + [MINE_COLUMN + (None,), ('boards', 'B', None)]:
+            self._files[name] = open(_column_path(path, name), 'ab')
+
+        self._game = None
+        self._board = None
+
+
+    def begin(self, game):
+        """Starts a game, storing its board if it is a new one.
+
+        Args:
+            game (vindinium.models.Game): the game, at its first turn.
+        """
+        if self._game is not None:
+            raise RuntimeError('Game %s has not ended.' % self._game['id'])
+        if len(game.heroes) != N_HEROES:
+            raise ValueError('Expected %d heroes, got %d.' % (N_HEROES, len(game.heroes)))
+
+        tiles = bytes(game.empty_map.raw)
+        size = game.map.size
+        key = hashlib.sha1(('%d:' % size).encode('ascii') + tiles).hexdigest()[:16]
+
+        board = self.index['boards'].get(key)
+        if board is None:
+            board = self.index['boards'][key] = {
+                'size': size,
+                'offset': self.index['boards_size'],
+                'mines': [[mine.x, mine.y] for mine in game.mines],
+                'taverns': [[tavern.x, tavern.y] for tavern in game.taverns]}
+            self._files['boards'].write(tiles)
+            self.index['boards_size'] += len(tiles)
+
+        self._board = board
+        self._game = {'id': game.id,
+                      'board': key,
+                      'max_turns': game.max_turns,
+                      'heroes': [hero.name for hero in game.heroes],
+                      'spawns': [[hero.spawn_x, hero.spawn_y] for hero in game.heroes],
+                      'row': self.index['n_rows'],
+                      'mine_row': self.index['n_mine_values'],
+                      'n_rows': 0,
+                      'finished': False}
+
+
+    def append(self, game):
+        """Appends the current turn of the game started with ``begin``."""
+        if self._game is None:
+            raise RuntimeError('No game has begun.')
+
+        arrays = game.arrays
+        files = self._files
+        array('I', [len(self.index['games'])]).tofile(files['game'])
+        array('H', [game.turn]).tofile(files['turn'])
+        array('B', arrays.hero_x).tofile(files['hero_x'])
+        array('B', arrays.hero_y).tofile(files['hero_y'])
+        array('B', arrays.hero_life).tofile(files['hero_life'])
+        array('I', arrays.hero_gold).tofile(files['hero_gold'])
+        array('H', arrays.hero_mine_count).tofile(files['hero_mine_count'])
+        array('B', arrays.mine_owner).tofile(files['mine_owner'])
+        self._game['n_rows'] += 1
+
+
+    def end(self, finished = True):
+        """Ends the game started with ``begin`` and saves the index.
+
+        Args:
+            finished (bool): whether the game was played to its end.
+        """
+        if self._game is None:
+            raise RuntimeError('No game has begun.')
+
+        game, self._game = self._game, None
+        game['finished'] = finished
+        self.index['games'].append(game)
+        self.index['n_rows'] += game['n_rows']
+        self.index['n_mine_values'] += game['n_rows'] * len(self._board['mines'])
+
+        for f in self._files.values():
+            f.flush()
+        self._save_index()
+
+
+    def add_log(self, path):
+        """Adds a game recorded by ``vindinium.recording``, replaying its
+        states through a ``Game``.
+
+        Args:
+            path (str): the log file.
+
+        Returns:
+            (bool) whether the log had any state.
+        """
+        log = vin.recording.load_log(path)
+        states = log['states']
+        if not states:
+            return False
+
+        game = vin.models.Game(states[0])
+        self.begin(game)
+        self.append(game)
+        for state in states[1:]:
+            game.update(state, state['hero']['id'])
+            self.append(game)
+        self.end(log['finished'])
+        return True
+
+
+    def close(self):
+        """Closes the archive, dropping a game that was not ended."""
+        self._game = None
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+    def _truncate(self):
+        """Cuts every column to the rows in the index."""
+        index = self.index
+        sizes = dict((name, index['n_rows'] * array(code).itemsize * width)
+                     for name, code, width in COLUMNS)
+        sizes['mine_owner'] = index['n_mine_values']
+        sizes['boards'] = index['boards_size']
+
+        for name, size in sizes.items():
+            path = _column_path(self.path, name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+
+    def _save_index(self):
+        """Saves the index atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir = self.path, suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.index, f)
+            os.rename(tmp_path, os.path.join(self.path, 'index.json'))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+class Archive(object):
+    """Reads an archive, mapping its columns to memory.
+
+    Example::
+
+        archive = Archive('archive')
+        gold = archive.column('hero_gold')          # (n_rows, 4) memmap
+        for k in xrange(len(archive)):
+            rows = archive.game(k)                  # views of one game
+            rows['hero_life'][-1], rows['mine_owner'][-1]
+
+    Attributes:
+        path (str): the archive directory.
+        boards (dict): by board key, its ``size``, the ``offset`` of its
+          tiles in ``boards.dat`` and its ``mines`` and ``taverns`` (x, y)
+          positions, in the order of the ``mine_owner`` values.
+        games (list): a dict for each game, with its server ``id``, its
+          ``board`` key, ``max_turns``, hero names (``heroes``), hero
+          ``spawns``, its first ``row`` and ``mine_row``, its ``n_rows`` and
+          whether it ``finished``.
+    """
+
+    def __init__(self, path):
+        """Constructor.
+
+        Args:
+            path (str): the archive directory.
+
+        Raises:
+            IOError if there is no archive in the directory.
+        """
+        index = _load_index(path)
+        if index is None:
+            raise IOError('No archive in "%s".' % path)
+
+        self.path = path
+        self.boards = index['boards']
+        self.games = index['games']
+        self._byteorder = index['byteorder']
+        self._n_rows = index['n_rows']
+        self._n_mine_values = index['n_mine_values']
+        self._columns = {}
+
+
+    def __len__(self):
+        return len(self.games)
+
+
+    def column(self, name):
+        """Returns a column of every row as a read-only NumPy memmap.
+
+        Args:
+            name (str): the column, e.g. ``'hero_gold'``.
+
+        Returns:
+            (numpy.memmap) of shape (rows, values per row), or a flat one
+              for ``mine_owner``.
+
+        Raises:
+            ImportError if NumPy is not installed.
+            KeyError if there is no such column.
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required for Archive.column().')
+
+        column = self._columns.get(name)
+        if column is None:
+            if name == MINE_COLUMN[0]:
+                code, shape = MINE_COLUMN[1], (self._n_mine_values,)
+            else:
+                code, width = dict((n, (c, w)) for n, c, w in COLUMNS)[name]
+                shape = (self._n_rows, width)
+
+            # a memmap cannot map an empty file
+            dtype = _dtype(code, self._byteorder)
+            if shape[0] == 0:
+                column = numpy.zeros(shape, dtype = dtype)
+            else:
+                column = numpy.memmap(_column_path(self.path, name), dtype = dtype,
+                                      mode = 'r', shape = shape)
+            self._columns[name] = column
+        return column
+
+
+    def game(self, k, columns = None):
+        """Returns the rows of a game, as views of the columns.
+
+        Args:
+            k (int): the game number, in ``games``.
+            columns (list): the column names. Defaults to all.
+
+        Returns:
+            (dict) an array by column name, with a row per turn. The
+              ``mine_owner`` array has a column per mine of the board.
+        """
+        game = self.games[k]
+        if columns is None:
+            columns = [name for name, _, _ in COLUMNS] + [MINE_COLUMN[0]]
+
+        start, stop = game['row'], game['row'] + game['n_rows']
+        rows = {}
+        for name in columns:
+            if name == MINE_COLUMN[0]:
+                n_mines = len(self.boards[game['board']]['mines'])
+                first = game['mine_row']
+                values = self.column(name)[first:first + game['n_rows'] * n_mines]
+                rows[name] = values.reshape(game['n_rows'], n_mines)
+            else:
+                rows[name] = self.column(name)[start:stop]
+        return rows
+
+
+    def iter_games(self, columns = None):
+        """Yields the (game, rows) of every game, see ``game``."""
+        for k in xrange(len(self.games)):
+            yield self.games[k], self.game(k, columns)
+
+
+    def board(self, key):
+        """Returns the static tiles of a board.
+
+        Args:
+            key (str): the board key.
+
+        Returns:
+            (vindinium.models.Map) the map, with walls, spawns, taverns and
+              mines.
+        """
+        board = self.boards[key]
+        size = board['size']
+        game_map = vin.models.Map(size)
+        with open(_column_path(self.path, 'boards'), 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            try:
+                game_map.raw[:] = data[board['offset']:board['offset'] + size * size]
+            finally:
+                data.close()
+        return game_map
+
+
+def mine_control(archive):
+    """Yields, for each game, the number of mines of each hero per turn.
+
+    Yields:
+        (dict, numpy.ndarray) the game and an array of shape (rows, 4).
+    """
+    for game, rows in archive.iter_games(['hero_mine_count']):
+        yield game, numpy.asarray(rows['hero_mine_count'])
+
+
+def death_locations(archive):
+    """Counts where heroes died, by board and position.
+
+    A death is only seen through the respawn, as the rows are sampled once
+    per round: a hero either jumped more than one step from its last
+    position (every hero moves once between two rows), or gained life while
+    not next to a tavern (only a beer or the respawn give life). The
+    position of a death is the last one seen before it. A hero killed next
+    to its spawn point and next to a tavern is missed, and so is a hero
+    dying twice in a round.
+
+    Returns:
+        (collections.Counter) the deaths by (board key, x, y).
+    """
+    counts = Counter()
+    for game, rows in archive.iter_games(['hero_x', 'hero_y', 'hero_life']):
+        x, y = rows['hero_x'].astype(int), rows['hero_y'].astype(int)
+        life = rows['hero_life'].astype(int)
+
+        near_tavern = numpy.zeros(x[:-1].shape, dtype = bool)
+        for tx, ty in archive.boards[game['board']]['taverns']:
+            near_tavern |= abs(x[:-1] - tx) + abs(y[:-1] - ty) == 1
+
+        jumped = abs(x[1:] - x[:-1]) + abs(y[1:] - y[:-1]) > 1
+        healed = (life[1:] > life[:-1]) & ~near_tavern
+
+        for t, h in zip(*numpy.nonzero(jumped | healed)):
+            counts[(game['board'], int(x[t, h]), int(y[t, h]))] += 1
+    return counts
+
+
+def tavern_usage(archive):
+    """Counts the drinks at each tavern, by board and position.
+
+    A drink is a turn in which a hero next to a tavern, without moving,
+    gained life.
+
+    Returns:
+        (collections.Counter) the drinks by (board key, x, y) of the tavern.
+    """
+    counts = Counter()
+    for game, rows in archive.iter_games(['hero_x', 'hero_y', 'hero_life']):
+        x, y = rows['hero_x'].astype(int), rows['hero_y'].astype(int)
+        life = rows['hero_life'].astype(int)
+        still = (x[1:] == x[:-1]) & (y[1:] == y[:-1])
+        healed = still & (life[1:] > life[:-1])
+        for tx, ty in archive.boards[game['board']]['taverns']:
+            near = abs(x[:-1] - tx) + abs(y[:-1] - ty) == 1
+            drinks = int((near & healed).sum())
+            if drinks:
+                counts[(game['board'], tx, ty)] += drinks
+    return counts
+
+
+def _column_path(path, name):
+    return os.path.join(path, name + '.dat')
+
+
+def _load_index(path):
+    """Returns the index of the archive in path, or None."""
+    index_path = os.path.join(path, 'index.json')
+    if not os.path.exists(index_path):
+        return None
+
+    with open(index_path) as f:
+        index = json.load(f)
+    if index['version'] > VERSION:
+        raise ValueError('Archive "%s" has version %d, expected %d or older.' % (
+                         path, index['version'], VERSION))
+    return index
+
+
+def _dtype(code, byteorder):
+    """Returns the NumPy dtype of an array typecode."""
+    return numpy.dtype('u%d' % array(code).itemsize).newbyteorder(
+        '<' if byteorder == 'little' else '>')
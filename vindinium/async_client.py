@@ -0,0 +1,188 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from vindinium.client import Client
+
+__all__ = ['AsyncClient']
+
+
+class AsyncClient(object):
+    """Plays many games at once from a single process.
+
+    Each seat (a key and a bot) is played by a ``Client`` in its own thread,
+    with the same connect/move/finish lifecycle and bot hooks. Each seat has
+    its own ``requests`` session, as sessions are not thread-safe, but all
+    sessions are mounted on a single ``HTTPAdapter``, so connections to the
+    server are pooled and kept alive between moves and games.
+
+    Most of the time of a seat is spent waiting for the server (the other
+    heroes' turns, or the arena queue), so threads are enough to keep
+    dozens of seats busy. Bot computation (moves and speculation) runs at
+    most ``max_workers`` at a time, so slow bots do not starve the others.
+    A speculation is skipped when all the slots are busy.
+
+    Example::
+
+        client = vindinium.AsyncClient(mode = 'arena')
+        urls = client.run([(key1, vindinium.bots.MinerBot()),
+                           (key2, vindinium.bots.HunterBot()),
+                           (key3, vindinium.bots.DecisionBot())])
+
+    Attributes:
+        mode (str): the game mode ('training' or 'arena'). Defaults to
+          'training'.
+        training_map (str): the training map. Defaults to 'm1'.
+        n_turns (int): number of turns in a training game. Defaults to 300.
+        server (str): the address of the server. Defaults to
+          'http://vindinium.org'.
+        pool_size (int): the maximum number of pooled connections. Defaults
+          to 32.
+        max_workers (int): the maximum number of bots computing a move at
+          the same time. Defaults to 4.
+        timeout_move (int): movement timeout in seconds. Defaults to 15.
+        move_budget (float): seconds each bot has to decide a move (see
+          ``Client.move_budget``). Defaults to None, no budget.
+        pipelined (bool): whether bots prepare their next turn while their
+          move is in flight (see ``Client.pipelined``). Defaults to False.
+        timeout_connection (int): connection timeout in seconds. Defaults to
+          10 minutes.
+        profile_dir (str): where the spans of each game are exported (see
+          ``Client.profile_dir``). Defaults to None.
+        record_dir (str): where each game is recorded (see
+          ``Client.record_dir``). Defaults to None.
+    """
+
+    def __init__(self, mode = 'training',
+                       training_map = 'm1',
+                       n_turns = 300,
+                       server = 'http://vindinium.org',
+                       pool_size = 32,
+                       max_workers = 4):
+        """Constructor.
+
+        Args:
+            mode (str): the game mode ('training' or 'arena'). Defaults to
+              'training'.
+            training_map (str): the training map. Defaults to 'm1'.
+            n_turns (int): number of turns in a training game. Defaults to
+              300.
+            server (str): the address of the server. Defaults to
+              'http://vindinium.org'.
+            pool_size (int): the maximum number of pooled connections.
+              Defaults to 32.
+            max_workers (int): the maximum number of bots computing at the
+              same time. Defaults to 4.
+        """
+        self.mode = mode
+        self.training_map = training_map
+        self.n_turns = n_turns
+        self.server = server
+        self.pool_size = pool_size
+        self.max_workers = max_workers
+        self.timeout_move = 15
+        self.timeout_connection = 10 * 60
+        self.move_budget = None
+        self.pipelined = False
+        self.profile_dir = None
+        self.record_dir = None
+
+
+    def client(self, key, session, bot_name = None):
+        """Creates the client of a seat."""
+        client = Client(key, self.mode, self.training_map, self.n_turns,
+                        self.server, session = session)
+        client.bot_name = bot_name
+        client.timeout_move = self.timeout_move
+        client.timeout_connection = self.timeout_connection
+        client.move_budget = self.move_budget
+        client.pipelined = self.pipelined
+        client.profile_dir = self.profile_dir
+        client.record_dir = self.record_dir
+        return client
+
+
+    def run(self, seats):
+        """Plays a game for each seat, all at the same time, and waits for
+        them to finish.
+
+        Args:
+            seats (list): (key, bot) pairs. The same key may be used by many
+              seats, but each seat needs its own bot instance.
+
+        Returns:
+            (list) the url to watch each game, in the order of the seats, or
+              None for seats whose game failed (see the log).
+        """
+        adapter = HTTPAdapter(pool_connections = self.pool_size,
+                              pool_maxsize = self.pool_size)
+        slots = threading.BoundedSemaphore(self.max_workers)
+        urls = [None] * len(seats)
+
+        def play(k, key, bot):
+            # a session per seat, left open as closing it closes the adapter
+            session = requests.session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            try:
+                client = self.client(key, session, bot.__class__.__name__)
+                urls[k] = client.run(_BoundedBot(bot, slots))
+            except Exception:
+                logging.exception('Game of seat %d (%s) failed.', k, bot.__class__.__name__)
+
+        threads = []
+        for k, (key, bot) in enumerate(seats):
+            thread = threading.Thread(target = play, args = (k, key, bot))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        try:
+            for thread in threads:
+                # a timeout keeps the main thread responsive to Ctrl+C
+                while thread.is_alive():
+                    thread.join(1.0)
+        finally:
+            adapter.close()
+
+        return urls
+
+
+class _BoundedBot(object):
+    """Runs the hooks of a bot while holding one of the computation slots."""
+
+    def __init__(self, bot, slots):
+        self.bot = bot
+        self.slots = slots
+
+
+    def __getattr__(self, name):
+        return getattr(self.bot, name)
+
+
+    def _start(self, state):
+        with self.slots:
+            return self.bot._start(state)
+
+
+    def _move(self, state, deadline = None):
+        with self.slots:
+            if deadline is None:
+                return self.bot._move(state)
+            return self.bot._move(state, deadline)
+
+
+    def _end(self):
+        with self.slots:
+            return self.bot._end()
+
+
+    def speculate(self, command, cancel = None):
+        # speculation only saves time, do not wait for a slot
+        if not self.slots.acquire(False):
+            return
+        try:
+            return self.bot.speculate(command, cancel)
+        finally:
+            self.slots.release()
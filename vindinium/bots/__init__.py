@@ -1,5 +1,7 @@
 from .base_bot import *
 from .miner_bot import *
 from .hunter_bot import *
+from .decision_evaluator import *
 from .decision_bot import *
-from .role_bot import *
\ No newline at end of file
+from .role_bot import *
+from .mcts_bot import *
@@ -1,11 +1,12 @@
 import vindinium as vin
 from vindinium.models import Game
 import random
+import timeit
 
 __all__ = ['BaseBot']
 
 
-class BaseBot():
+class BaseBot(object):
     """ Base bot.
 
     Attributes:
@@ -14,12 +15,31 @@ class BaseBot():
         hero (vindinium.models.Hero): the bot's hero instance, updated by this 
           object.
         state (dict): the unprocessed state from server.
+        distance_table (bool): whether the game builds the static all-pairs
+          distance table (see ``vindinium.ai.DistanceTable``).
+        distance_cache (str): directory where distance tables are cached.
+        deadline (float): the time (``timeit.default_timer``) by which the
+          current move must be decided, or None if there is no deadline.
+        best_move (str): the best command found so far in the current move,
+          see ``publish``.
+
+    Anytime bots:
+        When the client has a move budget (see ``Client.move_budget``), the
+        move is computed in a worker thread and, at the deadline, the client
+        sends the last command given to ``publish`` (or ``vindinium.STAY``),
+        even if ``move`` is still running. A bot that can decide in stages
+        should publish a cheap command first, refine it while
+        ``time_left()`` is positive and return its final answer.
     """
 
     id = None
     state = None
     game = None
     hero = None
+    distance_table = False
+    distance_cache = None
+    deadline = None
+    best_move = None
 
 
     def start(self):
@@ -43,22 +63,61 @@ class BaseBot():
         return False
 
 
+    def speculate(self, command, cancel = None):
+        """Prepares the next turn while ``command`` is being sent.
+
+        Called by a pipelined client (see ``Client.pipelined``) in a worker
+        thread, while the bot is otherwise idle. By default, it computes the
+        distance field from the predicted position of the hero, with the
+        bot's ``search`` if any (see ``Game.speculate``).
+
+        Args:
+            command (str): the command sent to the server.
+            cancel (threading.Event): set when the next state arrives.
+        """
+        self.game.speculate(self.hero, command, searcher = getattr(self, 'search', None),
+                            cancel = cancel)
+
+
+    def publish(self, command):
+        """Sets the best command found so far, to be sent if the move
+        deadline expires before ``move`` returns."""
+        self.best_move = command
+
+
+    def time_left(self):
+        """Returns the seconds left until the move deadline, or None if
+        there is no deadline."""
+        if self.deadline is None:
+            return None
+        return self.deadline - timeit.default_timer()
+
+
     def _start(self, state):
         """ Wrapper to start method, called by client """
         self.id = state['hero']['id']
         self.state = state
-        self.game = Game(state)
+        self.game = Game(state, self.distance_table, self.distance_cache)
         self.hero = self.game.heroes[self.id - 1]
 
         print("I am {0}".format(self.hero.name))
         self.start()
 
 
-    def _move(self, state):
-        """ Wrapper to move method, called by client """
-        self.state = state
-        self.game.update(state, self.hero.id)
-        return self.move()
+    def _move(self, state, deadline = None):
+        """ Wrapper to move method, called by client. ``deadline`` is the
+        time (``timeit.default_timer``) by which the move must be decided """
+        profiler = vin.utils.PROFILER
+        with profiler.span('move'):
+            self.deadline = deadline
+            self.best_move = None
+            self.state = state
+            with profiler.span('update'):
+                self.game.update(state, self.hero.id)
+            with profiler.span('decide'):
+                command = self.move()
+            self.best_move = command
+            return command
 
 
     def _end(self):
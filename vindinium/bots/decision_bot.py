@@ -4,6 +4,7 @@ import random
 import vindinium as vin
 from vindinium.bots import BaseBot
 from vindinium.ai import AStar
+from vindinium.bots.decision_evaluator import DecisionEvaluator
 
 
 __all__ = ["DecisionBot"]
@@ -14,8 +15,14 @@ class DecisionBot(BaseBot):
      it occupies, as well as the surrounding 4 spaces. It uses propensities
      to mine, drink, kill, and flee, which can be randomly altered to
      optimize the behavior.
+
+     when NumPy is installed and ``vectorized`` is set, all the candidate
+     moves are scored at once by a ``DecisionEvaluator``, with the same
+     results.
      """
 
+    vectorized = True
+
     def __init__(self, props = None):
         super(DecisionBot, self).__init__()
 
@@ -32,7 +39,14 @@ class DecisionBot(BaseBot):
 
     def start(self):
         print("I am {0} with id: {1}".format(self.hero.name, self.hero.id))
-        self.search = AStar(self.game.map)
+        self.search = AStar(self.game.map, distance_table = self.game.distance_table)
+
+        self.evaluator = None
+        if self.vectorized:
+            try:
+                self.evaluator = DecisionEvaluator(self.propensity_to)
+            except ImportError:
+                pass
 
 
     def move(self):
@@ -44,12 +58,34 @@ class DecisionBot(BaseBot):
         # this dict will house the final scores, where values are floats
         move_scores  = {}
 
-        # find the values of all valid moves
-        for key in valid_moves:
-            x1 = valid_moves[key][0]
-            y1 = valid_moves[key][1]
-            move_values[key] = self._total_value_of_point(x1, y1)
-            move_scores[key] = sum(move_values[key])
+        # find the values of all valid moves, at once if vectorized. The
+        # previous move is published meanwhile, in case the deadline expires
+        if self.evaluator is not None:
+            last_dir = self.hero.last_dir
+            self.publish(last_dir if last_dir in valid_moves else vin.STAY)
+
+            keys = list(valid_moves)
+            values = self.evaluator.evaluate(self.game, self.hero,
+                                             [valid_moves[key] for key in keys], self.search)
+            for key, value in zip(keys, values):
+                move_values[key] = value
+                move_scores[key] = sum(value)
+            self.publish(max(move_scores, key = move_scores.get))
+
+        # otherwise, this is an anytime decision: the best move so far is
+        # published after each evaluation, and the evaluation stops if the
+        # move deadline expires
+        else:
+            for key in valid_moves:
+                left = self.time_left()
+                if move_scores and left is not None and left <= 0:
+                    break
+
+                x1 = valid_moves[key][0]
+                y1 = valid_moves[key][1]
+                move_values[key] = self._total_value_of_point(x1, y1)
+                move_scores[key] = sum(move_values[key])
+                self.publish(max(move_scores, key = move_scores.get))
 
         # final decision time!
         v = list(move_scores.values())
@@ -78,6 +114,17 @@ class DecisionBot(BaseBot):
         return best_move
 
 
+    def speculate(self, command, cancel = None):
+        """
+        the next move scores every tile around the hero, so the fields from
+        the predicted position and its neighbors are computed in advance
+        """
+        x, y = self.game.predict(self.hero, command)
+        sources = list(self.game.graph.moves(x, y).values())
+
+        self.game.speculate(self.hero, command, sources, self.search, cancel)
+
+
     def _total_value_of_point(self, x, y):
 
 
@@ -100,7 +147,7 @@ class DecisionBot(BaseBot):
         """
 
         players = [p for p in self.game.heroes if p.id != self.hero.id]
-        players = vin.utils.order_by_distance(x, y, players, self.game.map)
+        players = self._order_by_distance(x, y, players)
 
         appeals = [float(p.path_dist) * (100 - self.hero.life) / 100 for p in players]
 
@@ -133,7 +180,7 @@ class DecisionBot(BaseBot):
         """
 
         players = [p for p in self.game.heroes if p.id != self.hero.id]
-        players = vin.utils.order_by_distance(x, y, players, self.game.map)
+        players = self._order_by_distance(x, y, players)
 
         num_mines = len(self.game.mines)
 
@@ -144,11 +191,11 @@ class DecisionBot(BaseBot):
 
         # if bot is right next to another player, who is closer to the tavern?
         if players[0].path_dist <= 2:
-                me_taverns = vin.utils.order_by_distance(self.hero.x, self.hero.y,
-                                                         self.game.taverns, self.game.map)
+                me_taverns = self._order_by_distance(self.hero.x, self.hero.y,
+                                                     self.game.taverns)
                 me_min_dist = me_taverns[0].path_dist
-                he_taverns = vin.utils.order_by_distance(players[0].x, players[0].y,
-                                                         self.game.taverns, self.game.map)
+                he_taverns = self._order_by_distance(players[0].x, players[0].y,
+                                                     self.game.taverns)
                 he_min_dist = he_taverns[0].path_dist
 
                 # if enemy is closer to tavern, begin to abort the fight
@@ -185,7 +232,7 @@ class DecisionBot(BaseBot):
         """
 
         # orders taverns by path distance from input xy
-        taverns = vin.utils.order_by_distance(x, y, self.game.taverns, self.game.map)
+        taverns = self._order_by_distance(x, y, self.game.taverns)
         path_dist = taverns[0].path_dist
 
         # calculate the final appeal
@@ -216,7 +263,7 @@ class DecisionBot(BaseBot):
             return 0
 
         # orders mines by shortest path distance and removes those owned by this bot
-        mines = vin.utils.order_by_distance(x, y, self.game.mines, self.game.map)
+        mines = self._order_by_distance(x, y, self.game.mines)
         bad_mines = []
         for mine in mines:
             if mine.owner != self.hero.id:
@@ -258,6 +305,22 @@ class DecisionBot(BaseBot):
             return appeal
 
 
+    def _order_by_distance(self, x, y, objects):
+        """
+        orders objects by path distance from (x, y) and stores it in their
+        ``path_dist`` attribute. Uses the game's distance field from (x, y),
+        so a single search serves all the objects and all the scoring
+        functions within the turn.
+        """
+        field = self.game.distance_field(x, y, self.search)
+
+        for obj in objects:
+            # unreachable objects count as 0, like vin.utils.distance_path
+            obj.path_dist = field.distance(obj.x, obj.y) or 0
+
+        return sorted(objects, key = lambda obj: obj.path_dist)
+
+
     def _is_my_mine(self, x, y, mines):
         """ returns true if one of my mines are at coordinates """
 
@@ -293,24 +356,7 @@ class DecisionBot(BaseBot):
 
 
     def _valid_moves(self) :
-        x = self.hero.x
-        y = self.hero.y
-
-        moves = {vin.STAY : (x, y),
-                 vin.NORTH: (x, y - 1),
-                 vin.WEST : (x - 1, y),
-                 vin.EAST : (x + 1, y),
-                 vin.SOUTH: (x, y + 1)}
-
-        valid_moves = {}
-        for key in moves:
-            try:
-                if self.game.map[moves[key]] != vin.TILE_WALL:
-                    valid_moves[key] = moves[key]
-            except IndexError:
-                pass
-
-        return valid_moves
+        return self.game.graph.moves(self.hero.x, self.hero.y)
 
 
     def _go_to(self, x_, y_):
@@ -0,0 +1,265 @@
+import vindinium as vin
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['DecisionEvaluator']
+
+
+class DecisionEvaluator(object):
+    """Scores the candidate moves of ``DecisionBot`` all at once.
+
+    The four appeals of ``DecisionBot`` (flee, kill, drink and mine) are
+    computed with NumPy for every candidate tile in a single pass, from the
+    distances between the candidates and the heroes, taverns and mines
+    (read from the game's distance fields). The scores are the same as the
+    bot's per-tile scoring functions.
+
+    The appeals do not depend on the propensities, so ``appeals`` can be
+    computed once per turn and weighed with many propensity sets, e.g.
+    when tuning them.
+
+    Example::
+
+        evaluator = DecisionEvaluator(bot.propensity_to)
+        values = evaluator.evaluate(game, hero, [(x, y), (x + 1, y)], searcher)
+        values[0]   # [flee, kill, drink, mine] of (x, y)
+
+        appeals = evaluator.appeals(game, hero, tiles, searcher)
+        for props in candidates:
+            scores = evaluator.weigh(appeals, props).sum(axis=-1)
+
+    Attributes:
+        propensity_to (dict): the weight of each appeal, by name ('flee',
+          'kill', 'drink' and 'mine').
+    """
+
+    def __init__(self, propensity_to):
+        """Constructor.
+
+        Args:
+            propensity_to (dict): the weight of each appeal.
+
+        Raises:
+            ImportError if NumPy is not installed.
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required for DecisionEvaluator.')
+
+        self.propensity_to = propensity_to
+
+
+    def evaluate(self, game, hero, tiles, searcher = None):
+        """Computes the weighted appeals of moving to each tile.
+
+        Args:
+            game (vindinium.models.Game): the game.
+            hero (vindinium.models.Hero): the bot's hero.
+            tiles (list): the (x, y) candidate tiles.
+            searcher (vindinium.ai.AStar): the cost configuration of the
+              distance fields.
+
+        Returns:
+            (list) for each tile, the ``[flee, kill, drink, mine]`` values,
+              weighted and clamped to at least 0.1 as in
+              ``DecisionBot._total_value_of_point``.
+        """
+        return self.weigh(self.appeals(game, hero, tiles, searcher)).tolist()
+
+
+    def weigh(self, appeals, propensity_to = None):
+        """Weighs the appeals by the propensities, setting anything less
+        than 0.1 to 0.1.
+
+        Args:
+            appeals (numpy.ndarray): the ``appeals`` of the candidate tiles.
+            propensity_to (dict): the weight of each appeal. Defaults to
+              ``propensity_to``.
+
+        Returns:
+            (numpy.ndarray) the weighted values, with the shape of appeals.
+        """
+        if propensity_to is None:
+            propensity_to = self.propensity_to
+
+        values = appeals * numpy.array([propensity_to['flee'], propensity_to['kill'],
+                                        propensity_to['drink'], propensity_to['mine']])
+        values[~(values > 0.1)] = 0.1
+        return values
+
+
+    def appeals(self, game, hero, tiles, searcher = None):
+        """Computes the unweighted appeals of moving to each tile.
+
+        Args:
+            game (vindinium.models.Game): the game.
+            hero (vindinium.models.Hero): the bot's hero.
+            tiles (list): the (x, y) candidate tiles.
+            searcher (vindinium.ai.AStar): the cost configuration of the
+              distance fields.
+
+        Returns:
+            (numpy.ndarray) a row of ``[flee, kill, drink, mine]`` appeals
+              for each tile.
+        """
+        heroes = game.heroes
+        others = [p for p in heroes if p.id != hero.id]
+        fields = [game.distance_field(x, y, searcher) for x, y in tiles]
+
+        # unreachable objects count as 0, like DecisionBot._order_by_distance
+        hero_dist = self.__distances(fields, others)
+        tavern_dist = self.__distances(fields, game.taverns)
+
+        # what is on each candidate tile
+        kinds = numpy.array([game.map[x, y] for x, y in tiles])
+        occupied = numpy.array([any(p.x == x and p.y == y for p in heroes) for x, y in tiles])
+        t_spawn = kinds == vin.TILE_SPAWN
+        t_tavern = kinds == vin.TILE_TAVERN
+        t_mine = kinds == vin.TILE_MINE
+        t_my_mine = numpy.array([any(m.x == x and m.y == y and m.owner == hero.id
+                                     for m in game.mines) for x, y in tiles])
+
+        flee = self.__flee(game, hero, others, hero_dist)
+        flee[t_spawn | t_tavern | t_mine | occupied] = 0
+
+        kill = self.__kill(game, hero, others, hero_dist, searcher, t_tavern | t_mine)
+
+        drink = self.__drink(hero, tavern_dist)
+        drink[t_tavern] *= 2
+        drink[t_mine | occupied] = 0
+
+        mine = self.__mine(game, hero, fields)
+        mine[t_mine] *= 2
+        mine[t_tavern | occupied | t_my_mine] = 0
+
+        return numpy.array([flee, kill, drink, mine]).T
+
+
+    @staticmethod
+    def __distances(fields, objects):
+        """Returns the matrix of path distances from each field's source to
+        each object."""
+        return numpy.array([[d or 0 for d in field.distances(objects)] for field in fields],
+                           dtype=float).reshape(len(fields), len(objects))
+
+
+    @staticmethod
+    def __pd(path_dist):
+        """Vectorized ``DecisionBot._pd``."""
+        return numpy.where(path_dist >= 1, path_dist, 0.5)
+
+
+    @staticmethod
+    def __sorted(dist, *columns):
+        """Sorts each row of dist (stable, as ``sorted``), along with
+        per-object columns."""
+        order = numpy.argsort(dist, axis=1, kind='mergesort')
+        rows = numpy.arange(dist.shape[0])[:, None]
+        return (dist[rows, order],) + tuple(numpy.asarray(c)[order] for c in columns)
+
+
+    def __flee(self, game, hero, others, hero_dist):
+        dist, = self.__sorted(hero_dist)
+
+        appeals = dist * (100 - hero.life) / 100
+        appeal = self.__row_sum(appeals) * (hero.mine_count / len(game.mines))
+
+        # tiles close than 3 tiles away from multiple players with more health are bad
+        stronger = numpy.array([p.life > hero.life for p in others], dtype=bool)
+        close = (hero_dist <= 2) & stronger
+        factor = 0.5 ** close.sum(axis=1)
+
+        return appeal * factor
+
+
+    def __kill(self, game, hero, others, hero_dist, searcher, bad):
+        num_mines = len(game.mines)
+        weights = [10 * num_mines * ((p.mine_count / num_mines) ** 2) * (100 - p.life)
+                   for p in others]
+
+        dist, weights, index = self.__sorted(hero_dist, weights, range(len(others)))
+        appeal = self.__row_sum(weights / self.__pd(dist))
+
+        kill = numpy.where(bad, 0.0, appeal)
+
+        # if bot is right next to another player, who is closer to the tavern?
+        for c in numpy.nonzero(dist[:, 0] <= 2)[0]:
+            player = others[index[c, 0]]
+
+            # if the players life is less than 20, appeal overwhelms
+            if player.life <= 20:
+                kill[c] = appeal[c] * 5
+                continue
+
+            me_min_dist = self.__min_tavern_dist(game, hero, searcher)
+            he_min_dist = self.__min_tavern_dist(game, player, searcher)
+
+            # if enemy is closer to tavern, begin to abort the fight, unless
+            # bot's life is more than 51 greater than player
+            abort = me_min_dist >= he_min_dist
+            if (player.life + 51) <= hero.life:
+                abort = False
+            if abort:
+                kill[c] = 0
+
+        return kill
+
+
+    def __drink(self, hero, tavern_dist):
+        path_dist = tavern_dist.min(axis=1)
+        return (100 - hero.life) ** 2 / (100 * (self.__pd(path_dist) ** 0.5))
+
+
+    def __mine(self, game, hero, fields):
+        n_tiles = len(fields)
+
+        # a weak hero will not be interested in mining
+        if hero.life <= 50:
+            return numpy.zeros(n_tiles)
+
+        mine_dist = self.__distances(fields, game.mines)
+
+        # mines by shortest path distance, without those owned by this bot
+        owners = [m.owner for m in game.mines]
+        bad = numpy.array([owner != hero.id for owner in owners], dtype=bool)
+        vals = numpy.array([2 if owner is None else 1 for owner in owners])
+
+        dist, bad, vals = self.__sorted(mine_dist, bad, vals)
+        n_bad = int(bad[0].sum()) if n_tiles else 0
+        if n_bad == 0:
+            return numpy.zeros(n_tiles)
+
+        # the bad mines first, keeping their order
+        rows = numpy.arange(n_tiles)[:, None]
+        first = numpy.argsort(~bad, axis=1, kind='mergesort')
+        pd = self.__pd(dist[rows, first])
+        v = vals[rows, first]
+
+        if n_bad >= 4:
+            return ((5.0 ** v[:, 0]) / pd[:, 0] +
+                    (4.0 ** v[:, 1]) / pd[:, 1] +
+                    (3.0 ** v[:, 2]) / pd[:, 2] +
+                    (2.0 ** v[:, 3]) / pd[:, 3]) / 2
+        elif n_bad >= 2:
+            return ((4.0 ** v[:, 0]) / pd[:, 0] +
+                    (3.0 ** v[:, 1]) / pd[:, 1]) / 2
+        else:
+            return (6.0 ** v[:, 0]) / pd[:, 0] / 2
+
+
+    @staticmethod
+    def __min_tavern_dist(game, hero, searcher):
+        """The path distance from a hero to its nearest tavern."""
+        field = game.distance_field(hero.x, hero.y, searcher)
+        return min(field.distance(t.x, t.y) or 0 for t in game.taverns)
+
+
+    @staticmethod
+    def __row_sum(values):
+        """Sums each row from left to right, as the built-in ``sum``."""
+        total = numpy.zeros(values.shape[0])
+        for k in xrange(values.shape[1]):
+            total = total + values[:, k]
+        return total
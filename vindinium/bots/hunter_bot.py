@@ -14,7 +14,7 @@ class HunterBot(BaseBot):
     search = None
 
     def start(self):
-        self.search = AStar(self.game.map)
+        self.search = AStar(self.game.map, distance_table = self.game.distance_table)
 
 
     def move(self):
@@ -74,24 +74,21 @@ class HunterBot(BaseBot):
         x = self.hero.x
         y = self.hero.y
 
-        tavern = vin.utils.order_by_distance(x, y , self.game.taverns)[0]
-        dist   = vin.utils.distance_manhattan(x, y, tavern.x, tavern.y)
+        # manhattan distance to the tavern nearest by path
+        for tavern, dist, step in self.game.nearest(x, y, self.game.taverns, 1, self.search):
+            return vin.utils.distance_manhattan(x, y, tavern.x, tavern.y)
 
-        return dist
+        return 999
 
 
     def _go_to_nearest_tavern(self):
         x = self.hero.x
         y = self.hero.y
 
-        # Order taverns by distance
-        taverns = vin.utils.order_by_distance(x, y, self.game.taverns)
-        for tavern in taverns:
-            command = self._go_to(tavern.x, tavern.y)
-
-            if command:
-                print("{0} going to nearest tavern".format(self.hero.name))
-                return command
+        # a single search for the nearest reachable tavern
+        for tavern, dist, step in self.game.nearest(x, y, self.game.taverns, 1, self.search):
+            print("{0} going to nearest tavern".format(self.hero.name))
+            return vin.utils.path_to_command(x, y, step[0], step[1])
 
         return self._random()
 
@@ -100,10 +97,9 @@ class HunterBot(BaseBot):
         x = self.hero.x
         y = self.hero.y
 
-        mines = vin.utils.order_by_distance(x, y , self.game.mines)
-        for mine in mines:
-            if mine.owner != self.hero:
-                return vin.utils.distance_manhattan(x, y, mine.x, mine.y)
+        # manhattan distance to the mine nearest by path
+        for mine, dist, step in self.game.nearest(x, y, self._mines_to_take(), 1, self.search):
+            return vin.utils.distance_manhattan(x, y, mine.x, mine.y)
 
         return 999
 
@@ -112,19 +108,17 @@ class HunterBot(BaseBot):
         x = self.hero.x
         y = self.hero.y
 
-        # Order mines by distance
-        mines = vin.utils.order_by_distance(x, y, self.game.mines)
-        for mine in mines:
+        # Grab nearest mine that is not owned by this hero
+        for mine, dist, step in self.game.nearest(x, y, self._mines_to_take(), 1, self.search):
+            print("{0} going to nearest mine".format(self.hero.name))
+            return vin.utils.path_to_command(x, y, step[0], step[1])
 
-            # Grab nearest mine that is not owned by this hero
-            if mine.owner != self.hero.id:
-                command = self._go_to(mine.x, mine.y)
+        return self._random()
 
-                if command:
-                    print("{0} going to nearest mine".format(self.hero.name))
-                    return command
 
-        return self._random()
+    def _mines_to_take(self):
+        """ mines that are not owned by this hero """
+        return [mine for mine in self.game.mines if mine.owner != self.hero.id]
 
 
     def _go_to(self, x_, y_):
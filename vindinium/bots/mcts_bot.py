@@ -0,0 +1,200 @@
+import math
+import random
+import timeit
+import vindinium as vin
+from vindinium.bots import BaseBot
+from vindinium.engine import Simulator
+from vindinium.engine.simulator import COMMANDS
+
+__all__ = ['MCTSBot']
+
+
+class MCTSBot(BaseBot):
+    """A Monte Carlo tree search bot on the game ``Simulator``.
+
+    Each move grows a tree over the bot's own commands for the next
+    ``depth`` rounds, with UCT selection. The other heroes follow the
+    simulator's MinerBot-like policy, taking a random command with
+    probability ``epsilon``, and so does the bot itself past the tree
+    (the rollout). A simulated game is scored by the bot's share of the
+    gold projected at the end of the game: the gold plus the mines times
+    the rounds left.
+
+    The search is anytime: the policy's command is published first and the
+    most visited command every few iterations, and it runs until the move
+    deadline (minus ``margin``) when the client has a move budget, or for
+    ``budget`` seconds otherwise.
+
+    Attributes:
+        budget (float): seconds per move when there is no deadline.
+        depth (int): rounds simulated per iteration, tree and rollout.
+        exploration (float): the UCT exploration constant, for scores
+          normalized to the range seen in the move.
+        epsilon (float): the probability of a random command in the
+          simulated moves.
+        margin (float): seconds kept before the deadline.
+        simulator (vindinium.engine.Simulator): the forward model.
+        iterations (int): the iterations of the last move.
+    """
+
+    def __init__(self, budget = 0.2, depth = 10, exploration = 0.7, epsilon = 0.1,
+                 margin = 0.05, seed = None):
+        super(MCTSBot, self).__init__()
+
+        self.budget = budget
+        self.depth = depth
+        self.exploration = exploration
+        self.epsilon = epsilon
+        self.margin = margin
+        self.simulator = None
+        self.iterations = 0
+        self.random = random.Random(seed)
+
+        # the range of the scores of the current move
+        self._low = None
+        self._high = None
+
+
+    def start(self):
+        game_map = self.game.empty_map
+        self.simulator = Simulator(game_map.size, game_map.raw)
+
+
+    def move(self):
+        sim = self.simulator
+        sim.load(self.game)
+        h = self.hero.id - 1
+
+        # the hero of a turn is turn % 4, as in LocalGame
+        sim.turn += (h - sim.turn) % 4
+        if sim.finished:
+            return vin.STAY
+
+        self.publish(COMMANDS[sim.policy(h)])
+
+        if self.deadline is not None:
+            deadline = self.deadline - self.margin
+        else:
+            deadline = timeit.default_timer() + self.budget
+
+        root = _Node()
+        token = sim.save()
+        horizon = min(sim.turn + 4 * self.depth, sim.max_turns)
+        self._low = self._high = None
+
+        iterations = 0
+        while True:
+            self.__iterate(root, h, horizon)
+            sim.restore(token)
+            iterations += 1
+
+            if iterations % 16 == 0:
+                self.publish(COMMANDS[root.best()])
+            if timeit.default_timer() >= deadline:
+                break
+
+        self.iterations = iterations
+        return COMMANDS[root.best()]
+
+
+    def __iterate(self, root, h, horizon):
+        """Selects and expands a node, simulates to the horizon and
+        backs up the score."""
+        sim = self.simulator
+        node = root
+        path = [root]
+
+        while sim.turn < horizon:
+            if node.untried is None:
+                node.untried = sim.moves(h)
+                self.random.shuffle(node.untried)
+
+            if node.untried:
+                d = node.untried.pop()
+                child = node.children[d] = _Node()
+                path.append(child)
+                self.__round(d, horizon)
+                break
+
+            d, node = self.__select(node)
+            path.append(node)
+            self.__round(d, horizon)
+
+        while sim.turn < horizon:
+            self.__round(self.__default(h), horizon)
+
+        score = self.__score(h)
+        if self._low is None or score < self._low:
+            self._low = score
+        if self._high is None or score > self._high:
+            self._high = score
+
+        for node in path:
+            node.visits += 1
+            node.value += score
+
+
+    def __select(self, node):
+        """Returns the (direction, child) with the best UCT value."""
+        low = self._low
+        scale = self._high - low
+        if scale <= 0:
+            scale = 1.0
+
+        log_visits = math.log(node.visits)
+        best = None
+        best_value = None
+        for d, child in node.children.iteritems():
+            value = ((child.value / child.visits - low) / scale +
+                     self.exploration * math.sqrt(log_visits / child.visits))
+            if best_value is None or value > best_value:
+                best = d, child
+                best_value = value
+        return best
+
+
+    def __round(self, d, horizon):
+        """Plays the bot's direction d and the moves of the other heroes."""
+        sim = self.simulator
+        sim.move(d)
+        for _ in xrange(3):
+            if sim.turn >= horizon:
+                return
+            sim.move(self.__default(sim.turn % 4))
+
+
+    def __default(self, h):
+        """The simulated direction of hero h."""
+        if self.random.random() < self.epsilon:
+            return self.random.randrange(5)
+        return self.simulator.policy(h)
+
+
+    def __score(self, h):
+        """Returns the share of hero h of the gold projected at the end."""
+        sim = self.simulator
+        rounds = (sim.max_turns - sim.turn) // 4
+        projected = [gold + count * rounds for gold, count in zip(sim.gold, sim.mine_count)]
+        total = sum(projected)
+        if not total:
+            return 0.25
+        return float(projected[h]) / total
+
+
+class _Node(object):
+    """A node of the search tree, for a sequence of the bot's commands."""
+
+    __slots__ = ('visits', 'value', 'children', 'untried')
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {}
+        self.untried = None
+
+
+    def best(self):
+        """Returns the most visited direction, or staying if none."""
+        if not self.children:
+            return 0
+        return max(self.children, key = lambda d: self.children[d].visits)
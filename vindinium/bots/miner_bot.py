@@ -12,6 +12,7 @@ class MinerBot(BaseBot):
     """
     
     search = None
+    target = None
 
     def start(self):
         self._update_pathfinding()
@@ -19,19 +20,24 @@ class MinerBot(BaseBot):
 
     def _update_pathfinding(self):
         ms = float(self.game.map.size)
-        self.search = AStar(self.game.map, ms * 4, ms * 4, 5)
+        self.search = AStar(self.game.map, ms * 4, ms * 4, 5,
+                            distance_table = self.game.distance_table)
 
 
     def move(self):
+        x = self.hero.x
+        y = self.hero.y
 
-        self._update_pathfinding()
-
-        t, td = vin.utils.order_by_distance(self.hero.x, self.hero.y,
-                                    self.game.taverns, self.game.map, self.search)
+        # a path ends next to a tavern, so only taverns within 2 tiles can be
+        # less than 2 moves away
+        close = [tavern for tavern in self.game.taverns
+                 if vin.utils.distance_manhattan(x, y, tavern.x, tavern.y) <= 2]
+        taverns = self.game.nearest(x, y, close, 1, self.search) if close else []
+        td = [dist for tavern, dist, step in taverns]
 
         if self.hero.life < 30:
             command = self._go_to_nearest_tavern()
-        elif self.hero.life < 80 and td[0] < 2:
+        elif self.hero.life < 80 and td and td[0] < 2:
             command = self._go_to_nearest_tavern()
         else:
             command = self._go_to_nearest_mine()
@@ -44,32 +50,44 @@ class MinerBot(BaseBot):
 
 
     def _go_to_nearest_mine(self):
-        x = self.hero.x
-        y = self.hero.y
-
-        command = None
-        mines, dists = vin.utils.order_by_distance(x, y, self.game.mines,
-                                    self.game.map, self.search, lim = len(self.game.mines))
+        # the nearest mine not owned by a friendly hero
+        mines = [mine for mine in self.game.mines if not mine.friendly]
+        command = self._go_to_nearest(mines)
+        if command is None:
+            command = self._go_to_nearest_tavern()
+        return command
 
-        for i, mine in enumerate(mines):
 
-            if not mine.friendly:
-                command = self._go_to(mine.x, mine.y)
-                return command
+    def _go_to_nearest_tavern(self):
+        command = self._go_to_nearest(self.game.taverns)
+        if command is None:
+            command = self._random()
+        return command
 
-        return self._go_to_nearest_tavern()
 
+    def _go_to_nearest(self, targets):
+        """Walks towards the current target while its cached path is valid,
+        otherwise picks the nearest reachable target with a single search.
 
-    def _go_to_nearest_tavern(self):
+        Returns:
+            (str) the command, or None if no target can be reached.
+        """
         x = self.hero.x
         y = self.hero.y
 
-        # Order taverns by distance
-        taverns, dist = vin.utils.order_by_distance(x, y, self.game.taverns, self.game.map, self.search)
-        for tavern in taverns:
-            command = self._go_to(tavern.x, tavern.y)
+        path = None
+        target = self.target
+        if target is not None and any(t is target for t in targets):
+            path = self.game.paths.get(self.search, x, y, target.x, target.y)
+
+        if path is None:
+            for target, dist, step in self.game.nearest(x, y, targets, 1, self.search):
+                self.target = target
+                path = self.game.find_path(x, y, target.x, target.y, self.search)
 
-            if command:
-                return command
+        if path is None:
+            return None
 
-        return self._random()
\ No newline at end of file
+        # an empty path is next to the target, e.g. a mine to capture
+        x_, y_ = path[0] if path else (target.x, target.y)
+        return vin.utils.path_to_command(x, y, x_, y_)
@@ -111,24 +111,7 @@ class RoleBot(BaseBot):
         """
         returns a dict of valid moves, with keys as directions and values as x,y coordinates
         """
-        x = self.hero.x
-        y = self.hero.y
-
-        moves = {vin.STAY : (x, y),
-                 vin.NORTH: (x, y - 1),
-                 vin.WEST : (x - 1, y),
-                 vin.EAST : (x + 1, y),
-                 vin.SOUTH: (x, y + 1)}
-
-        valid_moves = {}
-        for key in moves:
-            try:
-                if self.game.map[moves[key]] != vin.TILE_WALL:
-                    valid_moves[key] = moves[key]
-            except IndexError:
-                pass
-
-        return valid_moves
+        return self.game.graph.moves(self.hero.x, self.hero.y)
 
 
     def _get_player_dists(self):
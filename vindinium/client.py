@@ -1,6 +1,10 @@
+import os
 import logging
+import threading
+import timeit
 import webbrowser
 import requests
+import vindinium as vin
 
 __all__ = ['Client']
 
@@ -35,6 +39,28 @@ class Client(object):
         timeout_move (int): movement timeout in seconds. Defaults to 15 seconds.
         timeout_connection (int): connection timeout in seconds. Defaults to 10
           minutes.
+        move_budget (float): seconds the bot has to decide each move, counted
+          from when the state is received. When set, the bot runs in a
+          worker thread and, if it is late, the client sends its best command
+          so far (see ``BaseBot.publish``). Keep it well below
+          ``timeout_move``, leaving room for the network. Defaults to None,
+          no budget.
+        pipelined (bool): if True, the bot prepares its next turn while the
+          move is in flight (see ``BaseBot.speculate``). Defaults to False.
+        session (requests.Session): a session opened by the caller, e.g. on
+          a connection pool shared with other clients (see ``AsyncClient``).
+          If None, the client opens and closes its own session in each run.
+          Defaults to None.
+        profile_dir (str): if set and ``vindinium.utils.PROFILER`` is
+          enabled, the spans of each game are exported there at its end, as
+          ``<game id>-<hero id>.json`` and ``.csv`` (see
+          ``Profiler.export_json`` and ``Profiler.export_csv``). Defaults to
+          None.
+        record_dir (str): if set, the states received and the commands sent
+          in each game are recorded there, as ``<game id>-<hero id>.jsonl.gz``
+          (see ``vindinium.recording``). Defaults to None.
+        bot_name (str): the name of the bot in the recordings. Defaults to
+          None, the class name of the bot.
     """
 
     def __init__(self, key,
@@ -42,7 +68,8 @@ class Client(object):
                     training_map = 'm1',
                     n_turns = 300,
                     server = 'http://vindinium.org',
-                    open_browser = False):
+                    open_browser = False,
+                    session = None):
         """Constructor.
 
         Args:
@@ -55,6 +82,8 @@ class Client(object):
               'http://vindinium.org'.
             open_browser (bool): if True, the client will open the default
               browser to show the current game. Defaults to False.
+            session (requests.Session): a session opened by the caller,
+              which is not closed by the client. Defaults to None.
         """
 
         self.key = key
@@ -65,8 +94,17 @@ class Client(object):
         self.open_browser = open_browser
         self.timeout_move = 15
         self.timeout_connection = 10 * 60
+        self.move_budget = None
+        self.pipelined = False
+        self.session = session
+        self.profile_dir = None
+        self.record_dir = None
+        self.bot_name = None
 
         self.__session = None
+        self.__worker = None
+        self.__recorder = None
+        self.__tag = None
 
 
     def run(self, bot):
@@ -78,25 +116,186 @@ class Client(object):
         Returns:
             A url to watch the game replay.
         """
+        state = None
+        profiler = vin.utils.PROFILER
         try:
-            # Connect
+            # Connect, with a provisional tag until the game is known
+            self.__tag = 'connect-%x' % id(self)
+            profiler.tag(self.__tag)
             state = self.__connect()
+            received = timeit.default_timer()
+            tag = self.__profile_tag(state)
+            profiler.retag(self.__tag, tag)
+            profiler.tag(tag)
+            self.__tag = tag
+            self.__start_recording(bot, state)
             bot._start(state)
             play_url = state['playUrl']
 
             # Move
             finished = False
             while not finished:
-                action = bot._move(state)
-                state = self.__move(play_url, action)
+                action = self.__decide(bot, state, received)
+                self.__record('command', action, timeit.default_timer() - received)
+                speculation = self.__speculate(bot, action)
+                try:
+                    state = self.__move(play_url, action)
+                    received = timeit.default_timer()
+                    self.__record('state', state)
+                finally:
+                    if speculation is not None:
+                        speculation[1].set()
+                        speculation[0].join()
                 finished = state['game']['finished']
 
             return state['viewUrl']
 
         finally:
             # End
+            if self.__worker is not None:
+                self.__worker.join()
+                self.__worker = None
             bot._end()
             self.__disconnect()
+            self.__stop_recording(state)
+
+            if state is not None:
+                self.__export_profile(self.__profile_tag(state))
+
+
+    @staticmethod
+    def __profile_tag(state):
+        """The tag of the spans of a game, unique per hero since several
+        clients may play the same game."""
+        return '%s-%d' % (state['game']['id'], state['hero']['id'])
+
+
+    def __export_profile(self, tag):
+        """Exports the spans of a game to ``profile_dir``, if profiling."""
+        profiler = vin.utils.PROFILER
+        if self.profile_dir is None or not profiler.enabled:
+            return
+
+        path = os.path.join(self.profile_dir, tag)
+        try:
+            if not os.path.isdir(self.profile_dir):
+                os.makedirs(self.profile_dir)
+            profiler.export_json(path + '.json', tag)
+            profiler.export_csv(path + '.csv', tag)
+        except (IOError, OSError):
+            logging.exception('Could not export the profile to %s.', path)
+
+
+    def __start_recording(self, bot, state):
+        """Opens the log of a game in ``record_dir``, if recording, and
+        records its first state."""
+        if self.record_dir is None:
+            return
+
+        path = os.path.join(self.record_dir, self.__profile_tag(state) + '.jsonl.gz')
+        name = self.bot_name or bot.__class__.__name__
+        try:
+            self.__recorder = vin.recording.GameRecorder(path, bot = name, mode = self.mode)
+        except (IOError, OSError):
+            logging.exception('Could not record the game to %s.', path)
+            return
+        self.__record('state', state)
+
+
+    def __record(self, kind, *args):
+        """Records a state or a command, if recording. A failure stops the
+        recording, not the game."""
+        if self.__recorder is None:
+            return
+        try:
+            getattr(self.__recorder, kind)(*args)
+        except (IOError, OSError):
+            logging.exception('Could not record the game to %s.', self.__recorder.path)
+            self.__stop_recording(None)
+
+
+    def __stop_recording(self, state):
+        """Closes the log of the game, if recording."""
+        recorder, self.__recorder = self.__recorder, None
+        if recorder is None:
+            return
+        try:
+            recorder.close(state is not None and state['game']['finished'])
+        except (IOError, OSError):
+            logging.exception('Could not record the game to %s.', recorder.path)
+
+
+    def __decide(self, bot, state, received):
+        """Asks the bot for a command, within the move budget if any.
+
+        Returns:
+            The command to send.
+        """
+        if self.move_budget is None:
+            return bot._move(state)
+
+        deadline = received + self.move_budget
+        remaining = lambda: max(0, deadline - timeit.default_timer())
+
+        # A late bot may still be working on a previous move
+        if self.__worker is not None:
+            self.__worker.join(remaining())
+            if self.__worker.is_alive():
+                logging.warning('Bot is still busy with a previous move, staying.')
+                return vin.STAY
+
+        result = {}
+        tag = self.__tag
+        def work():
+            vin.utils.PROFILER.tag(tag)
+            try:
+                result['command'] = bot._move(state, deadline)
+            except Exception as e:
+                logging.exception('Bot failed to move.')
+                result['error'] = e
+
+        self.__worker = threading.Thread(target = work)
+        self.__worker.daemon = True
+        self.__worker.start()
+        self.__worker.join(remaining())
+
+        if self.__worker.is_alive():
+            command = bot.best_move or vin.STAY
+            logging.warning('Move budget expired, sending %s.', command)
+            return command
+
+        self.__worker = None
+        if 'error' in result:
+            raise result['error']
+        return result['command']
+
+
+    def __speculate(self, bot, action):
+        """Starts the bot's speculation for the next turn, if pipelined.
+
+        Returns:
+            A (thread, cancel event) pair, or None.
+        """
+        if not self.pipelined or not hasattr(bot, 'speculate'):
+            return None
+
+        # A late bot is still working on its move
+        if self.__worker is not None:
+            return None
+
+        cancel = threading.Event()
+        tag = self.__tag
+        def work():
+            vin.utils.PROFILER.tag(tag)
+            try:
+                bot.speculate(action, cancel)
+            except Exception:
+                logging.exception('Bot failed to speculate.')
+
+        thread = threading.Thread(target = work)
+        thread.daemon = True
+        thread.start()
+        return thread, cancel
 
 
     def __connect(self):
@@ -109,8 +308,8 @@ class Client(object):
             IOError if connection is aborted.
         """
 
-        # Create requests session
-        self.__session = requests.session()
+        # Create requests session, unless a shared one is given
+        self.__session = self.session or requests.session()
 
         # Set up parameters
         server = self.server
@@ -123,11 +322,13 @@ class Client(object):
     
         # Connect
         logging.info('Trying to connect to %s%s', server, endpoint)
-        r = self.__session.post(server + endpoint, params, timeout = 10 * 60)
+        with vin.utils.PROFILER.span('http'):
+            r = self.__session.post(server + endpoint, params, timeout = self.timeout_connection)
 
         # Get response
         if r.status_code == 200:
-            state = r.json()
+            with vin.utils.PROFILER.span('decode'):
+                state = vin.utils.loads(r.content)
             print('Connected! Playing game at: %s', state['viewUrl'])
             logging.info('Connected! Playing game at: %s', state['viewUrl'])
 
@@ -151,10 +352,12 @@ class Client(object):
             IOError if connection is aborted.
         """
 
-        r = self.__session.post(url, {'dir': action}, timeout=self.timeout_move)
+        with vin.utils.PROFILER.span('http'):
+            r = self.__session.post(url, {'dir': action}, timeout=self.timeout_move)
 
         if r.status_code == 200:
-            return r.json()
+            with vin.utils.PROFILER.span('decode'):
+                return vin.utils.loads(r.content)
 
         else:
             logging.error('Connection error during game, message: "(%d) %s"', r.status_code, r.text)
@@ -162,6 +365,7 @@ class Client(object):
 
 
     def __disconnect(self):
-        """Close the session."""
-        if self.__session:
-            self.__session.close()
\ No newline at end of file
+        """Close the session, unless it was given by the caller."""
+        if self.__session and self.__session is not self.session:
+            self.__session.close()
+        self.__session = None
\ No newline at end of file
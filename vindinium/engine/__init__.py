@@ -0,0 +1,4 @@
+from .board import *
+from .game import *
+from .server import *
+from .simulator import *
\ No newline at end of file
@@ -0,0 +1,199 @@
+import random
+import vindinium as vin
+
+__all__ = ['Board']
+
+
+class Board(object):
+    """The static board of a local game.
+
+    Positions are flat tile indices, ``row * size + col``, following the
+    server's tile string (2 characters per tile, row by row). Remember that
+    the server calls the row ``x`` and the column ``y``.
+
+    Example:
+        Load a board from the server format::
+
+            board = Board.from_tiles(size, state['game']['board']['tiles'])
+
+        Or generate a random (symmetric) board::
+
+            board = Board.generate(size = 18, seed = 42)
+
+    Attributes:
+        size (int): the board size (in a single axis).
+        tiles (list): the tile VALUE of each position, one of
+          ``vindinium.TILE_EMPTY``, ``TILE_WALL``, ``TILE_TAVERN`` and
+          ``TILE_MINE``.
+        mines (list): the position of each mine.
+        taverns (list): the position of each tavern.
+        spawns (list): the spawn position of each hero, in hero id order.
+        mine_owners (list): the initial owner (hero id or None) of each mine.
+    """
+
+    def __init__(self, size, tiles, spawns, mine_owners = None):
+        """Constructor.
+
+        Args:
+            size (int): the board size.
+            tiles (list): the tile VALUE of each position.
+            spawns (list): the spawn position of each hero.
+            mine_owners (list): the initial owner of each mine. Defaults to
+              no owners.
+        """
+        self.size = size
+        self.tiles = list(tiles)
+        self.spawns = list(spawns)
+        self.mines = [i for i, tile in enumerate(self.tiles) if tile == vin.TILE_MINE]
+        self.taverns = [i for i, tile in enumerate(self.tiles) if tile == vin.TILE_TAVERN]
+
+        if mine_owners is None:
+            mine_owners = [None] * len(self.mines)
+        self.mine_owners = list(mine_owners)
+
+
+    @classmethod
+    def from_tiles(cls, size, tiles):
+        """Creates a board from the server's tile string.
+
+        Heroes (``@1`` to ``@4``) are taken as the spawn positions.
+
+        Args:
+            size (int): the board size.
+            tiles (str): the tile string, e.g. ``'##  @1[]$-$1'``.
+
+        Returns:
+            (vindinium.engine.Board) the board.
+
+        Raises:
+            ValueError if the string is malformed.
+        """
+        if len(tiles) != 2 * size * size:
+            raise ValueError('Expected %d characters for a board of size %d, '
+                             'got %d.' % (2 * size * size, size, len(tiles)))
+
+        values = []
+        spawns = {}
+        owners = []
+        for i in xrange(size * size):
+            tile = tiles[2 * i:2 * i + 2]
+            if tile == '  ':
+                values.append(vin.TILE_EMPTY)
+            elif tile == '##':
+                values.append(vin.TILE_WALL)
+            elif tile == '[]':
+                values.append(vin.TILE_TAVERN)
+            elif tile[0] == '$':
+                values.append(vin.TILE_MINE)
+                owners.append(None if tile[1] == '-' else int(tile[1]))
+            elif tile[0] == '@':
+                values.append(vin.TILE_EMPTY)
+                spawns[int(tile[1])] = i
+            else:
+                raise ValueError('Invalid tile "%s" at position %d.' % (tile, i))
+
+        if sorted(spawns) != [1, 2, 3, 4]:
+            raise ValueError('Expected heroes @1 to @4 in the board.')
+
+        return cls(size, values, [spawns[k] for k in (1, 2, 3, 4)], owners)
+
+
+    @classmethod
+    def generate(cls, size = 18, seed = None, wall_ratio = 0.3, mine_ratio = 0.06):
+        """Generates a random board with 4-fold symmetry, like the server's.
+
+        Every empty tile is connected, and every mine and tavern can be
+        reached. Each quarter has at least one mine.
+
+        Args:
+            size (int): the board size, an even number. Defaults to 18.
+            seed (int): the random seed. Defaults to None.
+            wall_ratio (float): probability of a wall. Defaults to 0.3.
+            mine_ratio (float): probability of a mine. Defaults to 0.06.
+
+        Returns:
+            (vindinium.engine.Board) the board.
+        """
+        if size % 2 or size < 6:
+            raise ValueError('Board size must be an even number >= 6.')
+
+        rnd = random.Random(seed)
+        half = size // 2
+
+        while True:
+            quarter = []
+            for k in xrange(half * half):
+                p = rnd.random()
+                if p < wall_ratio:
+                    quarter.append(vin.TILE_WALL)
+                elif p < wall_ratio + mine_ratio:
+                    quarter.append(vin.TILE_MINE)
+                else:
+                    quarter.append(vin.TILE_EMPTY)
+
+            free = [k for k, tile in enumerate(quarter) if tile == vin.TILE_EMPTY]
+            if len(free) < 2:
+                continue
+
+            tavern, spawn = rnd.sample(free, 2)
+            quarter[tavern] = vin.TILE_TAVERN
+
+            # bots expect mines, e.g. HunterBot divides by their number
+            if vin.TILE_MINE not in quarter:
+                continue
+
+            # mirror the quarter to the whole board
+            tiles = []
+            for row in xrange(size):
+                for col in xrange(size):
+                    r = min(row, size - 1 - row)
+                    c = min(col, size - 1 - col)
+                    tiles.append(quarter[r * half + c])
+
+            r, c = divmod(spawn, half)
+            spawns = [r * size + c,
+                      r * size + (size - 1 - c),
+                      (size - 1 - r) * size + (size - 1 - c),
+                      (size - 1 - r) * size + c]
+
+            board = cls(size, tiles, spawns)
+            if board.is_connected():
+                return board
+
+
+    def neighbors(self, i):
+        """Returns the positions next to i, in North, South, West, East
+        order (None when out of the board)."""
+        size = self.size
+        row, col = divmod(i, size)
+        return (i - size if row > 0 else None,
+                i + size if row < size - 1 else None,
+                i - 1 if col > 0 else None,
+                i + 1 if col < size - 1 else None)
+
+
+    def is_connected(self):
+        """Verifies that all empty tiles are connected and that every mine and
+        tavern is next to one of them."""
+        tiles = self.tiles
+        empty = [i for i, tile in enumerate(tiles) if tile == vin.TILE_EMPTY]
+        if not empty:
+            return False
+
+        visited = set([empty[0]])
+        frontier = [empty[0]]
+        while frontier:
+            i = frontier.pop()
+            for j in self.neighbors(i):
+                if j is not None and j not in visited and tiles[j] == vin.TILE_EMPTY:
+                    visited.add(j)
+                    frontier.append(j)
+
+        if len(visited) != len(empty):
+            return False
+
+        for i in self.mines + self.taverns:
+            if not any(j in visited for j in self.neighbors(i) if j is not None):
+                return False
+
+        return True
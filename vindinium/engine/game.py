@@ -0,0 +1,370 @@
+import logging
+import timeit
+import vindinium as vin
+from vindinium.engine import Board
+
+__all__ = ['LocalHero', 'LocalGame', 'play']
+
+timer = timeit.default_timer
+
+
+class LocalHero(object):
+    """The state of a hero in a local game.
+
+    Attributes:
+        id (int): the hero's id, from 1 to 4.
+        name (str): the bot's name.
+        pos (int): the hero position (see ``Board``).
+        spawn (int): the spawn position.
+        life (int): current life.
+        gold (int): current amount of gold.
+        mine_count (int): the number of mines this hero owns.
+        last_dir (str): the last command (None before the first one).
+        crashed (bool): True if the bot crashed and only stays.
+        deaths (int): how many times the hero died.
+    """
+
+    def __init__(self, id, name, spawn):
+        """Constructor.
+
+        Args:
+            id (int): the hero's id.
+            name (str): the bot's name.
+            spawn (int): the spawn position.
+        """
+        self.id = id
+        self.name = name
+        self.pos = spawn
+        self.spawn = spawn
+        self.life = LocalGame.MAX_LIFE
+        self.gold = 0
+        self.mine_count = 0
+        self.last_dir = None
+        self.crashed = False
+        self.deaths = 0
+
+
+class LocalGame(object):
+    """A game of Vindinium played in-process, following the server rules.
+
+    Heroes play in turns (hero 1, 2, 3, 4, 1, ...). In its turn a hero:
+
+    1. moves: walls and other heroes block it; walking into a tavern costs
+       2 gold and heals 50 life (up to 100); walking into a mine it does not
+       own costs 20 life and, if it survives, takes the mine.
+    2. fights: every adjacent enemy loses 20 life.
+    3. gets thirsty and paid: loses 1 life (never below 1) and earns 1 gold
+       per owned mine.
+
+    A hero that dies respawns at its spawn point with full life, losing its
+    mines to its killer (or to nobody, when killed by a mine). A hero that
+    respawns over another hero kills it.
+
+    ``state(hero_id)`` produces the same dict as the server, so the result
+    can be fed to ``BaseBot._start`` and ``BaseBot._move``.
+
+    Attributes:
+        id (str): the game id.
+        board (vindinium.engine.Board): the static board.
+        turn (int): current turn (each hero move is a turn).
+        max_turns (int): the number of turns of the game, 4 per round.
+        heroes (list): the ``LocalHero`` instances, in id order.
+        mine_owners (list): the owner (hero id or None) of each board mine.
+        move_times (dict): for each hero id, the seconds its bot took for
+          each move, filled by ``play``.
+    """
+
+    MAX_LIFE = 100
+    BEER_GOLD = 2
+    BEER_LIFE = 50
+    MINE_LIFE = 20
+    ATTACK_LIFE = 20
+    DAY_LIFE = 1
+
+    def __init__(self, board, names = None, n_turns = 300, id = 'local'):
+        """Constructor.
+
+        Args:
+            board (vindinium.engine.Board): the board.
+            names (list): the four bot names. Defaults to 'hero1'..'hero4'.
+            n_turns (int): number of rounds, each with a move per hero.
+              Defaults to 300.
+            id (str): the game id. Defaults to 'local'.
+        """
+        if names is None:
+            names = ['hero%d' % k for k in (1, 2, 3, 4)]
+
+        self.id = id
+        self.board = board
+        self.turn = 0
+        self.max_turns = 4 * n_turns
+        self.heroes = [LocalHero(k + 1, names[k], board.spawns[k]) for k in xrange(4)]
+        self.mine_owners = list(board.mine_owners)
+        self._mine_index = dict((pos, k) for k, pos in enumerate(board.mines))
+        self.move_times = dict((hero.id, []) for hero in self.heroes)
+
+        for owner in self.mine_owners:
+            if owner is not None:
+                self.heroes[owner - 1].mine_count += 1
+
+
+    @property
+    def finished(self):
+        """Whether the game is over."""
+        return self.turn >= self.max_turns
+
+
+    @property
+    def hero(self):
+        """The hero that plays the current turn."""
+        return self.heroes[self.turn % 4]
+
+
+    def move(self, command):
+        """Plays the current turn with a command for the current hero.
+
+        Unknown commands (e.g., None) are played as ``vindinium.STAY``.
+
+        Args:
+            command (str): the command, e.g. ``vindinium.NORTH``.
+        """
+        if self.finished:
+            return
+
+        hero = self.hero
+        if command not in (vin.NORTH, vin.SOUTH, vin.WEST, vin.EAST):
+            command = vin.STAY
+        hero.last_dir = command
+
+        self.__reach(hero, command)
+        self.__fights(hero)
+
+        hero.life = max(1, hero.life - self.DAY_LIFE)
+        hero.gold += hero.mine_count
+
+        self.turn += 1
+
+
+    def __destination(self, hero, command):
+        """Returns the position reached by the command, or None."""
+        north, south, west, east = self.board.neighbors(hero.pos)
+        if command == vin.NORTH:
+            return north
+        elif command == vin.SOUTH:
+            return south
+        elif command == vin.WEST:
+            return west
+        elif command == vin.EAST:
+            return east
+        return None
+
+
+    def __reach(self, hero, command):
+        """Moves the hero, drinking or fighting a mine if needed."""
+        pos = self.__destination(hero, command)
+        if pos is None:
+            return
+
+        tile = self.board.tiles[pos]
+        if tile == vin.TILE_EMPTY:
+            if self.hero_at(pos) is None:
+                hero.pos = pos
+
+        elif tile == vin.TILE_TAVERN:
+            if hero.gold >= self.BEER_GOLD:
+                hero.gold -= self.BEER_GOLD
+                hero.life = min(self.MAX_LIFE, hero.life + self.BEER_LIFE)
+
+        elif tile == vin.TILE_MINE:
+            k = self._mine_index[pos]
+            if self.mine_owners[k] != hero.id:
+                hero.life -= self.MINE_LIFE
+                if hero.life < 1:
+                    self.__respawn(hero)
+                else:
+                    self.__transfer_mine(k, hero.id)
+
+
+    def __fights(self, hero):
+        """The hero attacks every adjacent enemy."""
+        for pos in self.board.neighbors(hero.pos):
+            if pos is None:
+                continue
+
+            enemy = self.hero_at(pos)
+            if enemy is None:
+                continue
+
+            enemy.life -= self.ATTACK_LIFE
+            if enemy.life < 1:
+                self.__transfer_mines(enemy.id, hero.id)
+                self.__respawn(enemy)
+
+
+    def __respawn(self, hero):
+        """Respawns a dead hero, killing any hero at its spawn point."""
+        hero.deaths += 1
+        hero.life = self.MAX_LIFE
+        hero.pos = hero.spawn
+        self.__transfer_mines(hero.id, None)
+
+        for other in self.heroes:
+            if other is not hero and other.pos == hero.pos:
+                self.__transfer_mines(other.id, hero.id)
+                self.__respawn(other)
+
+
+    def __transfer_mine(self, k, owner):
+        """Changes the owner of the k-th mine."""
+        previous = self.mine_owners[k]
+        if previous is not None:
+            self.heroes[previous - 1].mine_count -= 1
+        if owner is not None:
+            self.heroes[owner - 1].mine_count += 1
+        self.mine_owners[k] = owner
+
+
+    def __transfer_mines(self, from_id, to_id):
+        """Gives all mines of a hero to another hero (or to nobody)."""
+        for k, owner in enumerate(self.mine_owners):
+            if owner == from_id:
+                self.__transfer_mine(k, to_id)
+
+
+    def hero_at(self, pos):
+        """Returns the hero at a position, or None."""
+        for hero in self.heroes:
+            if hero.pos == pos:
+                return hero
+        return None
+
+
+    def tiles(self):
+        """Returns the board in the server's tile string format."""
+        board = self.board
+        chars = []
+        for tile in board.tiles:
+            if tile == vin.TILE_WALL:
+                chars.append('##')
+            elif tile == vin.TILE_TAVERN:
+                chars.append('[]')
+            elif tile == vin.TILE_MINE:
+                chars.append('$-')
+            else:
+                chars.append('  ')
+
+        for k, pos in enumerate(board.mines):
+            owner = self.mine_owners[k]
+            if owner is not None:
+                chars[pos] = '$%d' % owner
+
+        for hero in self.heroes:
+            chars[hero.pos] = '@%d' % hero.id
+
+        return ''.join(chars)
+
+
+    def hero_state(self, hero):
+        """Returns the server's dict for a hero."""
+        size = self.board.size
+        row, col = divmod(hero.pos, size)
+        spawn_row, spawn_col = divmod(hero.spawn, size)
+
+        state = {'id': hero.id,
+                 'name': hero.name,
+                 'pos': {'x': row, 'y': col},
+                 'life': hero.life,
+                 'gold': hero.gold,
+                 'mineCount': hero.mine_count,
+                 'spawnPos': {'x': spawn_row, 'y': spawn_col},
+                 'crashed': hero.crashed}
+
+        if hero.last_dir is not None:
+            state['lastDir'] = hero.last_dir
+
+        return state
+
+
+    def state(self, hero_id):
+        """Returns the server's state dict as seen by a hero.
+
+        Args:
+            hero_id (int): the hero's id.
+
+        Returns:
+            (dict) the state, as consumed by ``BaseBot._start`` and
+              ``BaseBot._move``.
+        """
+        heroes = [self.hero_state(hero) for hero in self.heroes]
+        return {'game': {'id': self.id,
+                         'turn': self.turn,
+                         'maxTurns': self.max_turns,
+                         'heroes': heroes,
+                         'board': {'size': self.board.size,
+                                   'tiles': self.tiles()},
+                         'finished': self.finished},
+                'hero': heroes[hero_id - 1],
+                'token': 'local%d' % hero_id,
+                'viewUrl': 'local://%s' % self.id,
+                'playUrl': 'local://%s/%d/play' % (self.id, hero_id)}
+
+
+def play(bots, board = None, n_turns = 300, seed = None, id = 'local'):
+    """Plays a local game between four bots.
+
+    Bots are driven through ``_start``, ``_move`` and ``_end``, as by
+    ``vindinium.Client``. A bot that raises an exception is marked as crashed
+    and stays for the rest of the game, like on the server.
+
+    Args:
+        bots (list): four bot instances, for heroes 1 to 4.
+        board (vindinium.engine.Board): the board. Defaults to a random board
+          generated from ``seed``.
+        n_turns (int): number of rounds. Defaults to 300.
+        seed (int): seed for the random board. Defaults to None.
+        id (str): the game id. Defaults to 'local'.
+
+    Returns:
+        (vindinium.engine.LocalGame) the finished game.
+    """
+    if len(bots) != 4:
+        raise ValueError('A game needs 4 bots, got %d.' % len(bots))
+
+    if board is None:
+        board = Board.generate(seed = seed)
+
+    names = [bot.__class__.__name__ for bot in bots]
+    game = LocalGame(board, names, n_turns, id)
+
+    running = []
+    try:
+        for hero, bot in zip(game.heroes, bots):
+            try:
+                bot._start(game.state(hero.id))
+            except Exception:
+                logging.exception('Bot %s crashed in game %s.', hero.name, game.id)
+                hero.crashed = True
+                continue
+            running.append(bot)
+
+        while not game.finished:
+            hero = game.hero
+            command = vin.STAY
+
+            if not hero.crashed:
+                state = game.state(hero.id)
+                started = timer()
+                try:
+                    command = bots[hero.id - 1]._move(state)
+                except Exception:
+                    logging.exception('Bot %s crashed in game %s.', hero.name, game.id)
+                    hero.crashed = True
+                game.move_times[hero.id].append(timer() - started)
+
+            game.move(command)
+
+    finally:
+        for bot in running:
+            bot._end()
+
+    return game
@@ -0,0 +1,317 @@
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+import urlparse
+from SocketServer import ThreadingMixIn
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+import vindinium as vin
+from vindinium.engine import Board, LocalGame
+
+__all__ = ['LocalServer']
+
+
+class ServerGame(object):
+    """A local game shared by the request threads of its players.
+
+    Attributes:
+        game (vindinium.engine.LocalGame): the game.
+        tokens (dict): the hero id of each player token.
+        robots (list): ids of the heroes played by the server (random moves).
+        move_times (dict): for each hero id, the seconds between the state
+          being ready for the hero and its move arriving.
+    """
+
+    def __init__(self, game, robots = (), move_timeout = 15, seed = None):
+        self.game = game
+        self.tokens = dict((uuid.uuid4().hex[:8], hero.id) for hero in game.heroes
+                           if hero.id not in robots)
+        self.robots = list(robots)
+        self.move_timeout = move_timeout
+        self.move_times = dict((hero.id, []) for hero in game.heroes)
+
+        self._random = random.Random(seed)
+        self._condition = threading.Condition()
+        self._turn_started = time.time()
+        self.__autoplay()
+
+
+    def token_of(self, hero_id):
+        """Returns the token of a player hero."""
+        for token, id in self.tokens.items():
+            if id == hero_id:
+                return token
+
+
+    def wait_turn(self, hero_id):
+        """Blocks until it is the turn of the hero or the game is finished.
+
+        A hero that does not play within ``move_timeout`` seconds is crashed
+        by whichever player is waiting.
+        """
+        game = self.game
+        with self._condition:
+            while not game.finished and game.hero.id != hero_id:
+                self._condition.wait(0.1)
+
+                if time.time() - self._turn_started > self.move_timeout:
+                    logging.warning('Hero %d timed out in game %s.', game.hero.id, game.id)
+                    game.hero.crashed = True
+                    self.__autoplay()
+                    self._condition.notify_all()
+
+
+    def play(self, hero_id, command):
+        """Plays the hero's command and blocks until its next turn.
+
+        Returns:
+            (dict) the state seen by the hero.
+
+        Raises:
+            ValueError if the hero cannot play now.
+        """
+        game = self.game
+        with self._condition:
+            if game.finished:
+                raise ValueError('Vindinium - The game is finished.')
+            if game.heroes[hero_id - 1].crashed:
+                raise ValueError('Vindinium - Your hero has crashed.')
+            if game.hero.id != hero_id:
+                raise ValueError('Vindinium - Not your turn.')
+
+            self.move_times[hero_id].append(time.time() - self._turn_started)
+            game.move(command)
+            self.__autoplay()
+            self._condition.notify_all()
+
+        self.wait_turn(hero_id)
+        return self.game.state(hero_id)
+
+
+    def __autoplay(self):
+        """Plays the turns of server heroes and crashed heroes."""
+        game = self.game
+        while not game.finished and (game.hero.crashed or game.hero.id in self.robots):
+            if game.hero.crashed:
+                game.move(vin.STAY)
+            else:
+                game.move(self._random.choice([vin.STAY, vin.NORTH, vin.SOUTH, vin.WEST, vin.EAST]))
+        self._turn_started = time.time()
+
+
+class LocalServer(ThreadingMixIn, HTTPServer):
+    """A local stand-in for the Vindinium server.
+
+    It speaks the same protocol used by ``vindinium.Client``, backed by the
+    local engine:
+
+    - ``POST /api/training`` (``key``, ``turns``, ``map``): starts a game
+      against three random heroes. The ``map`` name seeds the board.
+    - ``POST /api/arena`` (``key``): waits for four players and starts a game
+      between them.
+    - ``POST playUrl`` (``dir``): plays a move and answers when it is the
+      hero's turn again.
+    - ``GET viewUrl``: the current state of a game, as JSON.
+
+    Many games may run at the same time, each request in its own thread.
+
+    Example::
+
+        server = LocalServer(('127.0.0.1', 9000))
+        server.start()
+        client = vindinium.Client(key, server = server.url)
+        client.run(vindinium.bots.MinerBot())
+        server.shutdown()
+
+    Attributes:
+        url (str): the server address, to be used as ``Client.server``.
+        games (dict): the running and finished games, by id.
+        board_size (int): size of the generated boards. Defaults to 18.
+        move_timeout (float): seconds for a player to move before its hero
+          is crashed. Defaults to 15.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address = ('127.0.0.1', 9000), board_size = 18,
+                 move_timeout = 15, seed = None):
+        """Constructor.
+
+        Args:
+            address (tuple): the (host, port) to listen to.
+            board_size (int): size of the generated boards. Defaults to 18.
+            move_timeout (float): seconds before a player's hero is crashed.
+              Defaults to 15.
+            seed (int): seed for arena boards and random heroes. Defaults to
+              None.
+        """
+        HTTPServer.__init__(self, address, LocalServerHandler)
+        self.board_size = board_size
+        self.move_timeout = move_timeout
+        self.games = {}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._arena_queue = []
+        self._thread = None
+
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+
+    def start(self):
+        """Serves requests in a background thread."""
+        self._thread = threading.Thread(target = self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def new_game(self, names, board = None, n_turns = 300, robots = ()):
+        """Creates and registers a game.
+
+        Returns:
+            (ServerGame) the game.
+        """
+        with self._lock:
+            if board is None:
+                board = Board.generate(self.board_size, self._random.random())
+            id = uuid.uuid4().hex[:8]
+            game = ServerGame(LocalGame(board, names, n_turns, id), robots,
+                              self.move_timeout, self._random.random())
+            self.games[id] = game
+        return game
+
+
+    def training(self, key, n_turns = 300, map_name = None):
+        """Starts a training game for a player against random heroes.
+
+        Returns:
+            (dict) the state of the player's first turn.
+        """
+        board = None
+        if map_name:
+            board = Board.generate(self.board_size, map_name)
+
+        game = self.new_game([key, 'random1', 'random2', 'random3'], board,
+                             n_turns, robots = (2, 3, 4))
+        return self.__player_state(game, 1)
+
+
+    def arena(self, key):
+        """Waits for four players and starts an arena game.
+
+        Returns:
+            (dict) the state of the player's first turn.
+        """
+        seat = {'key': key, 'ready': threading.Event()}
+        with self._lock:
+            self._arena_queue.append(seat)
+            seats = None
+            if len(self._arena_queue) >= 4:
+                seats, self._arena_queue = self._arena_queue[:4], self._arena_queue[4:]
+
+        if seats is not None:
+            game = self.new_game([s['key'] for s in seats])
+            for hero_id, s in enumerate(seats, 1):
+                s['game'], s['hero_id'] = game, hero_id
+                s['ready'].set()
+
+        while not seat['ready'].wait(1.0):
+            pass
+
+        return self.__player_state(seat['game'], seat['hero_id'])
+
+
+    def __player_state(self, game, hero_id):
+        """Waits for the hero's turn and returns its state with urls."""
+        game.wait_turn(hero_id)
+        return self.decorate(game.game.state(hero_id), game, hero_id)
+
+
+    def decorate(self, state, game, hero_id):
+        """Fills the token and urls of a state."""
+        token = game.token_of(hero_id)
+        state['token'] = token
+        state['viewUrl'] = '%s/%s' % (self.url, game.game.id)
+        state['playUrl'] = '%s/api/%s/%s/play' % (self.url, game.game.id, token)
+        return state
+
+
+class LocalServerHandler(BaseHTTPRequestHandler):
+    """Request handler for ``LocalServer``."""
+
+    protocol_version = 'HTTP/1.1'
+
+    # buffer the response and send it at once: written piece by piece on a
+    # keep-alive connection, it waits for the client's delayed ACK (~40ms)
+    wbufsize = -1
+
+    def do_POST(self):
+        length = int(self.headers.getheader('content-length') or 0)
+        form = urlparse.parse_qs(self.rfile.read(length))
+        form.update(urlparse.parse_qs(urlparse.urlparse(self.path).query))
+        param = lambda name, default = None: form.get(name, [default])[0]
+
+        parts = urlparse.urlparse(self.path).path.strip('/').split('/')
+        server = self.server
+
+        try:
+            if parts == ['api', 'training']:
+                state = server.training(param('key'), int(param('turns', 300)), param('map'))
+
+            elif parts == ['api', 'arena']:
+                state = server.arena(param('key'))
+
+            elif len(parts) == 4 and parts[0] == 'api' and parts[3] == 'play':
+                game = server.games.get(parts[1])
+                if game is None or parts[2] not in game.tokens:
+                    return self.__send(404, 'Vindinium - Unknown game or token.')
+
+                hero_id = game.tokens[parts[2]]
+                state = server.decorate(game.play(hero_id, param('dir')), game, hero_id)
+
+            else:
+                return self.__send(404, 'Vindinium - Not found.')
+
+        except ValueError as e:
+            return self.__send(400, str(e))
+
+        self.__send(200, json.dumps(state), 'application/json')
+
+
+    def do_GET(self):
+        game_id = urlparse.urlparse(self.path).path.strip('/')
+        game = self.server.games.get(game_id)
+        if game is None:
+            return self.__send(404, 'Vindinium - Unknown game.')
+
+        self.__send(200, json.dumps(game.game.state(1)['game']), 'application/json')
+
+
+    def __send(self, code, body, content_type = 'text/plain'):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+
+
+    def log_message(self, format, *args):
+        logging.debug('%s - %s', self.client_address[0], format % args)
+
+
+if __name__ == '__main__':
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    server = LocalServer(('127.0.0.1', port))
+    print('Serving Vindinium at %s' % server.url)
+    server.serve_forever()
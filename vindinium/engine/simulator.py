@@ -0,0 +1,367 @@
+import vindinium as vin
+
+__all__ = ['Simulator']
+
+# the commands by direction number, as used by the simulator (the values of
+# vindinium.STAY, NORTH, SOUTH, WEST and EAST, not defined yet at import)
+COMMANDS = ['Stay', 'North', 'South', 'West', 'East']
+DIRECTIONS = dict((command, d) for d, command in enumerate(COMMANDS))
+
+# tile kinds of the simulator
+_EMPTY, _WALL, _TAVERN, _MINE = 0, 1, 2, 3
+
+
+class Simulator(object):
+    """A compact forward model of a game, for search.
+
+    The simulator applies the rules of ``LocalGame`` on flat lists: the
+    position (tile id, ``y * size + x`` as ``Map.raw``), life, gold and mine
+    count of each hero, and the owner of each mine (a hero id, or 0). The
+    moves through the board are precomputed, so a turn costs a few list
+    lookups. Commands are direction numbers, indices of ``COMMANDS``
+    (``DIRECTIONS`` gives the number of a command).
+
+    Searches go back to a previous state with ``save`` and ``restore``:
+    the heroes (16 values) and the targets of the policy are copied, and the
+    mine owners, which rarely change, are kept in an undo log.
+
+    ``policy`` is a cheap MinerBot-like default policy for rollouts, based
+    on the distances to every mine and tavern, computed once per board.
+
+    Example::
+
+        sim = Simulator(game.empty_map.size, game.empty_map.raw)
+        sim.load(game)
+        token = sim.save()
+        while not sim.finished:
+            sim.move(sim.policy(sim.turn % 4))
+        sim.gold
+        sim.restore(token)
+
+    Attributes:
+        size (int): the board size.
+        mines (list): the position of each mine, in tile id order.
+        taverns (list): the position of each tavern.
+        spawn (list): the spawn position of each hero.
+        pos (list): the position of each hero.
+        life (list): the life of each hero.
+        gold (list): the gold of each hero.
+        mine_count (list): the number of mines of each hero.
+        owner (list): the id of the hero owning each mine, or 0.
+        turn (int): the current turn, hero ``turn % 4`` plays it.
+        max_turns (int): the turn at which the game ends.
+        transitions (int): the turns simulated so far.
+    """
+
+    MAX_LIFE = 100
+    BEER_GOLD = 2
+    BEER_LIFE = 50
+    MINE_LIFE = 20
+    ATTACK_LIFE = 20
+    DAY_LIFE = 1
+
+    def __init__(self, size, tiles):
+        """Constructor.
+
+        Args:
+            size (int): the board size.
+            tiles (sequence): the static tile value of each position, e.g.
+              ``Map.raw`` of ``Game.empty_map`` or ``Board.tiles``.
+        """
+        self.size = size
+        n = size * size
+
+        kinds = {vin.TILE_WALL: _WALL, vin.TILE_TAVERN: _TAVERN, vin.TILE_MINE: _MINE}
+        self._kind = [kinds.get(tile, _EMPTY) for tile in tiles]
+        self.mines = [i for i in xrange(n) if self._kind[i] == _MINE]
+        self.taverns = [i for i in xrange(n) if self._kind[i] == _TAVERN]
+        self._mine_index = dict((i, k) for k, i in enumerate(self.mines))
+
+        # the tile reached by each direction, the same tile when blocked
+        self._dest = dest = []
+        self._adj = []
+        for i in xrange(n):
+            y, x = divmod(i, size)
+            targets = [i,
+                       i - size if y > 0 else None,
+                       i + size if y < size - 1 else None,
+                       i - 1 if x > 0 else None,
+                       i + 1 if x < size - 1 else None]
+            targets = [i if j is None or self._kind[j] == _WALL else j for j in targets]
+            dest.extend(targets)
+            self._adj.append(tuple(j for j in targets[1:]
+                                   if j != i and self._kind[j] == _EMPTY))
+
+        self._tavern_steps = [self.__steps(i) for i in self.taverns]
+        self._mine_steps = [self.__steps(i) for i in self.mines]
+
+        self.spawn = [0] * 4
+        self.pos = [0] * 4
+        self.life = [0] * 4
+        self.gold = [0] * 4
+        self.mine_count = [0] * 4
+        self.owner = [0] * len(self.mines)
+        self.turn = 0
+        self.max_turns = 0
+        self.transitions = 0
+        self._log = []
+
+        # the mine each hero walks to under the policy, and its distance
+        self._targets = [None] * 4
+        self._target_dists = [0] * 4
+
+
+    def load(self, game):
+        """Sets the state from a game model.
+
+        Args:
+            game (vindinium.models.Game): the game.
+        """
+        size = self.size
+        for k, hero in enumerate(game.heroes):
+            self.spawn[k] = hero.spawn_y * size + hero.spawn_x
+            self.pos[k] = hero.y * size + hero.x
+            self.life[k] = hero.life
+            self.gold[k] = hero.gold
+            self.mine_count[k] = hero.mine_count
+
+        index = self._mine_index
+        for mine in game.mines:
+            self.owner[index[mine.y * size + mine.x]] = mine.owner or 0
+
+        self.turn = game.turn
+        self.max_turns = game.max_turns
+        del self._log[:]
+        self._targets[:] = [None] * 4
+        self._target_dists[:] = [0] * 4
+
+
+    def load_local(self, game):
+        """Sets the state from a local game, see ``LocalGame``."""
+        for k, hero in enumerate(game.heroes):
+            self.spawn[k] = hero.spawn
+            self.pos[k] = hero.pos
+            self.life[k] = hero.life
+            self.gold[k] = hero.gold
+            self.mine_count[k] = hero.mine_count
+
+        self.owner[:] = [owner or 0 for owner in game.mine_owners]
+        self.turn = game.turn
+        self.max_turns = game.max_turns
+        del self._log[:]
+        self._targets[:] = [None] * 4
+        self._target_dists[:] = [0] * 4
+
+
+    @property
+    def finished(self):
+        """Whether the game is over."""
+        return self.turn >= self.max_turns
+
+
+    def save(self):
+        """Returns a token to go back to the current state with
+        ``restore``."""
+        return (self.pos[:], self.life[:], self.gold[:], self.mine_count[:],
+                self._targets[:], self._target_dists[:], self.turn, len(self._log))
+
+
+    def restore(self, token):
+        """Goes back to the state of a token from ``save``. The states saved
+        after it can not be restored anymore."""
+        pos, life, gold, mine_count, targets, target_dists, self.turn, mark = token
+        self.pos[:] = pos
+        self.life[:] = life
+        self.gold[:] = gold
+        self.mine_count[:] = mine_count
+        self._targets[:] = targets
+        self._target_dists[:] = target_dists
+
+        log = self._log
+        owner = self.owner
+        while len(log) > mark:
+            k, previous = log.pop()
+            owner[k] = previous
+
+
+    def moves(self, h):
+        """Returns the directions hero h can take: staying, and those that do
+        not walk into a wall or off the board."""
+        i = self.pos[h]
+        dest = self._dest
+        return [d for d in xrange(5) if d == 0 or dest[i * 5 + d] != i]
+
+
+    def move(self, d):
+        """Plays the current turn, the hero ``turn % 4`` taking direction d.
+
+        Args:
+            d (int): the direction, an index of ``COMMANDS``.
+        """
+        if self.turn >= self.max_turns:
+            return
+
+        h = self.turn % 4
+        pos = self.pos
+        life = self.life
+        i = pos[h]
+        j = self._dest[i * 5 + d]
+
+        if j != i:
+            kind = self._kind[j]
+            if kind == _EMPTY:
+                if j not in pos:
+                    pos[h] = i = j
+
+            elif kind == _TAVERN:
+                if self.gold[h] >= self.BEER_GOLD:
+                    self.gold[h] -= self.BEER_GOLD
+                    life[h] = min(self.MAX_LIFE, life[h] + self.BEER_LIFE)
+
+            else:
+                k = self._mine_index[j]
+                if self.owner[k] != h + 1:
+                    life[h] -= self.MINE_LIFE
+                    if life[h] < 1:
+                        self.__respawn(h)
+                        i = pos[h]
+                    else:
+                        self.__transfer_mine(k, h + 1)
+
+        # fights, in north, south, west, east order
+        for j in self._adj[i]:
+            if j in pos:
+                e = pos.index(j)
+                life[e] -= self.ATTACK_LIFE
+                if life[e] < 1:
+                    self.__transfer_mines(e + 1, h + 1)
+                    self.__respawn(e)
+
+        if life[h] > self.DAY_LIFE:
+            life[h] -= self.DAY_LIFE
+        else:
+            life[h] = 1
+        self.gold[h] += self.mine_count[h]
+
+        self.turn += 1
+        self.transitions += 1
+
+
+    def policy(self, h):
+        """Returns the direction of hero h under a MinerBot-like policy: to
+        the nearest tavern when hurt, or when next to it and not healthy,
+        otherwise to the nearest mine it does not own.
+
+        As ``MinerBot``, a hero keeps walking to its mine while it gets
+        closer to it and does not own it, without looking for a nearer one.
+        """
+        i = self.pos[h]
+        life = self.life[h]
+
+        best_dist = 0
+        best_step = 0
+        if life < 80:
+            for dist, step in self._tavern_steps:
+                if dist[i] and (not best_dist or dist[i] < best_dist):
+                    best_dist = dist[i]
+                    best_step = step[i]
+            if best_dist and (life < 30 or best_dist <= 2):
+                return best_step
+
+        owner = self.owner
+        hero_id = h + 1
+        mine_steps = self._mine_steps
+
+        k = self._targets[h]
+        if k is not None and owner[k] != hero_id:
+            dist, step = mine_steps[k]
+            if 0 < dist[i] <= self._target_dists[h]:
+                self._target_dists[h] = dist[i]
+                return step[i]
+
+        best_dist = 0
+        best_step = 0
+        best_k = None
+        for k in xrange(len(owner)):
+            if owner[k] != hero_id:
+                dist = mine_steps[k][0][i]
+                if dist and (not best_dist or dist < best_dist):
+                    best_dist = dist
+                    best_k = k
+
+        self._targets[h] = best_k
+        self._target_dists[h] = best_dist
+        if best_k is not None:
+            best_step = mine_steps[best_k][1][i]
+        return best_step
+
+
+    def __respawn(self, h):
+        """Respawns a dead hero, killing any hero at its spawn point."""
+        pos = self.pos
+        self.life[h] = self.MAX_LIFE
+        pos[h] = spawn = self.spawn[h]
+        self.__transfer_mines(h + 1, 0)
+
+        for other in xrange(4):
+            if other != h and pos[other] == spawn:
+                self.__transfer_mines(other + 1, h + 1)
+                self.__respawn(other)
+
+
+    def __transfer_mine(self, k, hero_id):
+        """Changes the owner of the k-th mine, keeping the undo log."""
+        owner = self.owner
+        previous = owner[k]
+        if previous:
+            self.mine_count[previous - 1] -= 1
+        if hero_id:
+            self.mine_count[hero_id - 1] += 1
+        self._log.append((k, previous))
+        owner[k] = hero_id
+
+
+    def __transfer_mines(self, from_id, to_id):
+        """Gives all mines of a hero to another hero (or to nobody)."""
+        if not self.mine_count[from_id - 1]:
+            return
+        for k, owner in enumerate(self.owner):
+            if owner == from_id:
+                self.__transfer_mine(k, to_id)
+
+
+    def __steps(self, target):
+        """Returns the number of moves to reach (walk into) a target from
+        each tile, 0 if it can not be reached, and the direction of the
+        first move."""
+        n = self.size * self.size
+        dist = [0] * n
+        step = [0] * n
+        kind = self._kind
+        dest = self._dest
+
+        # the empty tiles next to the target, and the direction into it
+        frontier = []
+        for i in xrange(n):
+            if kind[i] != _EMPTY:
+                continue
+            for d in xrange(1, 5):
+                if dest[i * 5 + d] == target:
+                    dist[i] = 1
+                    step[i] = d
+                    frontier.append(i)
+
+        # each empty tile walks to a neighbor one move closer
+        back = [0, 2, 1, 4, 3]
+        while frontier:
+            next_frontier = []
+            for i in frontier:
+                for d in xrange(1, 5):
+                    j = dest[i * 5 + d]
+                    if j != i and kind[j] == _EMPTY and not dist[j]:
+                        dist[j] = dist[i] + 1
+                        step[j] = back[d]
+                        next_frontier.append(j)
+            frontier = next_frontier
+
+        return dist, step
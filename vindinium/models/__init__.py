@@ -2,4 +2,5 @@ from .map import *
 from .hero import *
 from .mine import *
 from .tavern import *
-from .game import *
\ No newline at end of file
+from .arrays import *
+from .game import *
@@ -0,0 +1,87 @@
+from array import array
+
+__all__ = ['GameArrays']
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class GameArrays(object):
+    """A struct-of-arrays view of the dynamic state of a game.
+
+    Each attribute is an ``array.array`` of ints with one entry per hero (in
+    id order) or per mine (in ``game.mines`` order), refreshed by
+    ``Game.update``. Evaluators may index them directly, or take them as
+    NumPy arrays with ``as_numpy``, instead of looping over the models.
+
+    Attributes:
+        hero_x (array): the position of each hero in X.
+        hero_y (array): the position of each hero in Y.
+        hero_life (array): the life of each hero.
+        hero_gold (array): the gold of each hero.
+        hero_mine_count (array): the number of mines of each hero.
+        mine_x (array): the position of each mine in X.
+        mine_y (array): the position of each mine in Y.
+        mine_owner (array): the id of the hero owning each mine, or 0.
+    """
+
+    __slots__ = ('hero_x', 'hero_y', 'hero_life', 'hero_gold', 'hero_mine_count',
+                 'mine_x', 'mine_y', 'mine_owner')
+
+    def __init__(self, game):
+        """Constructor.
+
+        Args:
+            game (vindinium.models.Game): the game.
+        """
+        n_heroes = len(game.heroes)
+        n_mines = len(game.mines)
+
+        self.hero_x = array('i', [0] * n_heroes)
+        self.hero_y = array('i', [0] * n_heroes)
+        self.hero_life = array('i', [0] * n_heroes)
+        self.hero_gold = array('i', [0] * n_heroes)
+        self.hero_mine_count = array('i', [0] * n_heroes)
+        self.mine_x = array('i', [mine.x for mine in game.mines])
+        self.mine_y = array('i', [mine.y for mine in game.mines])
+        self.mine_owner = array('i', [0] * n_mines)
+
+        self.refresh(game)
+
+
+    def refresh(self, game):
+        """Copies the dynamic state of the game models into the arrays."""
+        for k, hero in enumerate(game.heroes):
+            self.hero_x[k] = hero.x
+            self.hero_y[k] = hero.y
+            self.hero_life[k] = hero.life
+            self.hero_gold[k] = hero.gold
+            self.hero_mine_count[k] = hero.mine_count
+
+        mine_owner = self.mine_owner
+        for k, mine in enumerate(game.mines):
+            mine_owner[k] = mine.owner or 0
+
+
+    def as_numpy(self):
+        """Returns the arrays as NumPy arrays sharing their memory.
+
+        Returns:
+            (dict) the NumPy array of each attribute, by name.
+
+        Raises:
+            ImportError if NumPy is not installed.
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required for GameArrays.as_numpy().')
+
+        arrays = {}
+        for name in self.__slots__:
+            values = getattr(self, name)
+            if len(values):
+                arrays[name] = numpy.frombuffer(values, dtype=numpy.intc)
+            else:
+                arrays[name] = numpy.zeros(0, dtype=numpy.intc)
+        return arrays
@@ -1,7 +1,8 @@
 import vindinium as vin
-from vindinium.models import Hero, Map, Tavern, Mine
-from vindinium.ai import AStar
-from vindinium.utils.functions import distance_path, distance_manhattan
+from vindinium.models import Hero, Map, Tavern, Mine, GameArrays
+from vindinium.ai import DistanceField, DistanceTable, PathCache, default_searcher
+from vindinium.utils.functions import distance_manhattan
+from vindinium.utils.decoder import StateDecoder
 
 __all__ = ['Game']
 
@@ -21,13 +22,32 @@ class Game(object):
         heroes (list): a list of Hero instances.
         mines (list): a list of Mine instances.
         taverns (list): a list of Tavern instances.
+        arrays (vindinium.models.GameArrays): a struct-of-arrays view of the
+          heroes and mines, refreshed by ``update``.
+        decoder (vindinium.utils.StateDecoder): the decoder of the static
+          board, used to read the mine owners each turn.
+        graph (vindinium.ai.Graph): the adjacency of the board, built once
+          from ``empty_map`` and shared by ``map``, searches and moves.
+        distance_table (vindinium.ai.DistanceTable): static all-pairs
+          distances over ``empty_map``, or None if not requested.
+        incremental (bool): if True, ``update`` only repaints the map tiles
+          around heroes that moved since the previous update. Defaults to
+          True.
+        speculation (dict): how many speculative distance fields were
+          ``confirmed`` or ``discarded`` by ``update`` (see ``speculate``).
+        paths (vindinium.ai.PathCache): paths over ``map`` kept across turns,
+          invalidated by ``update`` where the map changes (see ``find_path``).
     """
 
-    def __init__(self, state):
+    def __init__(self, state, distance_table = False, cache_dir = None):
         """Constructor.
 
         Args:
             state (dict): the state object.
+            distance_table (bool): whether to build the static all-pairs
+              distance table. Defaults to False.
+            cache_dir (str): directory where distance tables are cached
+              between games. Defaults to None (no cache).
         """
         # Constants
         self.id = state['game']['id']
@@ -41,9 +61,27 @@ class Game(object):
         self.heroes = []
         self.mines = []
         self.taverns = []
+        self.arrays = None
+        self.distance_table = None
+
+        # Hero overlay bookkeeping, (hero_id, positions) of the last repaint
+        self.incremental = True
+        self._painted = None
+        self._stencils = {}
+
+        # Distance fields computed in the current turn
+        self._fields = {}
+
+        # Distance fields computed over a predicted map, (key, field) pairs
+        self._speculative = []
+        self.speculation = {'confirmed': 0, 'discarded': 0}
 
         # Process the state, creating the objects
         self.__processStartingState(state)
+        self.arrays = GameArrays(self)
+        self.paths = PathCache(self.map.size)
+        if distance_table:
+            self.distance_table = DistanceTable.load_or_build(self.empty_map, cache_dir)
         self.announce()
 
 
@@ -66,17 +104,20 @@ class Game(object):
         """Updates the game with new information.
 
         Notice that, this function does not re-create the objects, just update
-        the current objects with new information.
+        the current objects with new information. When ``incremental`` is set,
+        only the tiles within reach of a hero that moved are repainted, which
+        gives the same map as a full repaint.
 
         Args:
             state (dict): the state object.
             hero_id int: the id of friendly hero
         """
-        size = state['game']['board']['size']
+        size = self.map.size
         tiles = state['game']['board']['tiles']
         heroes = state['game']['heroes']
 
-        unit_searcher = AStar(self.empty_map, 1, 1, 1)
+        self.turn = state['game']['turn']
+        self._fields.clear()
 
         # update the heroes
         for hero, hero_state in zip(self.heroes, heroes):
@@ -90,86 +131,298 @@ class Game(object):
 
 
         # update the mines
-        for mine in self.mines:
-            char = tiles[mine.x * 2 + mine.y * 2 * size + 1]
-            if char == "-":
-                mine.owner = None
-                mine.friendly = False
+        for mine, owner in zip(self.mines, self.decoder.mine_owners(tiles)):
+            mine.owner = owner
+            mine.friendly = owner is not None and self.heroes[owner - 1].friendly
+
+        self.arrays.refresh(self)
+
+
+        # repaint the hero overlay, either the whole map or only the tiles
+        # around heroes that changed position since the last update
+        positions = [(hero.x, hero.y) for hero in self.heroes]
+        painted = self._painted
+
+        if self.incremental and painted is not None and painted[0] == hero_id:
+            dirty = set()
+            for old, new in zip(painted[1], positions):
+                if old != new:
+                    dirty.update(self.__near_tiles(old[0], old[1]))
+                    dirty.update(self.__near_tiles(new[0], new[1]))
+
+            raw, empty_raw = self.map.raw, self.empty_map.raw
+            before = {}
+            for x, y in dirty:
+                i = y * size + x
+                before[i] = raw[i]
+                raw[i] = empty_raw[i]
+        else:
+            dirty = None
+            before = bytearray(self.map.raw)
+            self.map.restore(self.empty_map)
+
+        self.__paint_heroes(hero_id, dirty)
+        self._painted = (hero_id, positions)
+
+        # drop the cached paths around the tiles that changed
+        raw = self.map.raw
+        if dirty is None:
+            changed = [i for i in xrange(len(raw)) if raw[i] != before[i]]
+        else:
+            changed = [i for i, tile in before.iteritems() if raw[i] != tile]
+        self.paths.invalidate(changed)
+
+        # keep what is still valid of the speculative fields
+        speculative, self._speculative = self._speculative, []
+        for (profile, x, y), field in speculative:
+            if field.rebase(self.map.raw) > 1:
+                self._fields[self.turn, profile, x, y] = field
+                self.speculation['confirmed'] += 1
             else:
-                mine.owner = int(char)
-                mine.friendly = self.heroes[mine.owner - 1].friendly
+                self.speculation['discarded'] += 1
+
+
+    def distance_field(self, x, y, searcher = None):
+        """Returns the distance field from (x, y) for the current turn.
+
+        Fields are memoized per turn, source and searcher cost profile, and
+        discarded by ``update``.
+
+        Args:
+            x (int): the source position in X.
+            y (int): the source position in Y.
+            searcher (vindinium.ai.AStar): the map and cost configuration.
+              Defaults to ``vindinium.ai.default_searcher`` over ``map``.
+
+        Returns:
+            (vindinium.ai.DistanceField) the distance field.
+        """
+        if searcher is None:
+            searcher = default_searcher(self.map)
+
+        key = (self.turn, searcher.profile(), x, y)
+        field = self._fields.get(key)
+        if field is None:
+            field = DistanceField(searcher, x, y)
+            self._fields[key] = field
+
+        return field
+
+
+    def find_path(self, x0, y0, x1, y1, searcher = None):
+        """Finds a path from (x0, y0) to (x1, y1), reusing the paths of
+        previous turns when the tiles around them did not change (see
+        ``vindinium.ai.PathCache``).
 
+        Args:
+            x0 (int): initial position in X.
+            y0 (int): initial position in Y.
+            x1 (int): goal position in X.
+            y1 (int): goal position in Y.
+            searcher (vindinium.ai.AStar): the cost configuration, over
+              ``map``. Defaults to ``vindinium.ai.default_searcher`` over
+              ``map``.
+
+        Returns:
+            (list) the path, as ``AStar.find``, or None if there is no path.
+        """
+        if searcher is None:
+            searcher = default_searcher(self.map)
 
-        # set the map to empty and refill it with hero information
-        for y in xrange(size):
-            for x in xrange(size):
+        return self.paths.find(searcher, x0, y0, x1, y1)
 
-                self.map[x, y] = self.empty_map[x, y]
 
-                for hero in self.heroes:
+    def predict(self, hero, command):
+        """Predicts the position of a hero after a command, assuming the
+        other heroes stay where they are.
 
-                    # for performance, only check tiles near the hero
-                    if distance_manhattan(hero.x, hero.y, x, y) < 3:
-                        # logical checks
-                        is_mine        = self.map[x, y] == vin.TILE_MINE
-                        is_wall        = self.map[x, y] == vin.TILE_WALL
-                        is_tavern      = self.map[x, y] == vin.TILE_TAVERN
-                        is_spawn       = self.map[x, y] == vin.TILE_SPAWN
+        Returns:
+            (tuple) the (x, y) predicted position.
+        """
+        x, y = hero.x, hero.y
+        if command == vin.NORTH:
+            y -= 1
+        elif command == vin.SOUTH:
+            y += 1
+        elif command == vin.WEST:
+            x -= 1
+        elif command == vin.EAST:
+            x += 1
+
+        size = self.map.size
+        if not (-1 < x < size and -1 < y < size):
+            return hero.x, hero.y
+        if self.empty_map[x, y] in (vin.TILE_WALL, vin.TILE_TAVERN, vin.TILE_MINE):
+            return hero.x, hero.y
+        if any((other.x, other.y) == (x, y) for other in self.heroes if other is not hero):
+            return hero.x, hero.y
+
+        return x, y
+
+
+    def speculate(self, hero, command, sources = None, searcher = None, cancel = None):
+        """Computes distance fields for the next turn, before it arrives.
+
+        The fields are flooded over the map predicted for the hero's command
+        (see ``predict``) and kept aside. The next ``update`` confirms them
+        against the real map, keeping the part of each flood that does not
+        depend on the tiles that changed (see
+        ``vindinium.ai.DistanceField.rebase``), and ``distance_field`` then
+        returns them. Meant to run while the move is sent to the server.
 
-                        is_now_hero    = hero.x == x and hero.y == y
-                        is_now_adj     = distance_path(hero.x, hero.y, x, y, self.empty_map, unit_searcher) == 1
-                        is_now_near    = distance_path(hero.x, hero.y, x, y, self.empty_map, unit_searcher) == 2
+        Args:
+            hero (vindinium.models.Hero): the hero that moves, usually the
+              bot's hero.
+            command (str): the command sent.
+            sources (list): the (x, y) sources of the fields. Defaults to the
+              predicted position of the hero.
+            searcher (vindinium.ai.AStar): the map and cost configuration, as
+              in ``distance_field``.
+            cancel (threading.Event): stops the floods when set, e.g. when
+              the real state arrives.
+        """
+        if searcher is None:
+            searcher = default_searcher(self.map)
+
+        x, y = self.predict(hero, command)
+        if sources is None:
+            sources = [(x, y)]
+
+        # the map with the hero moved, painted as update would do
+        predicted = self.map.copy()
+        positions = [(x, y) if other is hero else (other.x, other.y) for other in self.heroes]
+        dirty = set()
+        if (x, y) != (hero.x, hero.y):
+            dirty.update(self.__near_tiles(hero.x, hero.y))
+            dirty.update(self.__near_tiles(x, y))
+            for tx, ty in dirty:
+                predicted[tx, ty] = self.empty_map[tx, ty]
+            self.__paint_heroes(hero.id, dirty, predicted, positions)
+
+        profile = searcher.profile()
+        for sx, sy in sources:
+            field = DistanceField(searcher, sx, sy, predicted.raw)
+            for _ in field.settled():
+                if cancel is not None and cancel.is_set():
+                    break
+            self._speculative.append(((profile, sx, sy), field))
+
+            if cancel is not None and cancel.is_set():
+                break
+
+
+    def nearest(self, x, y, targets, k = 1, searcher = None):
+        """Finds the k nearest targets from (x, y), reusing the distance
+        field of the current turn (see ``vindinium.ai.DistanceField.nearest``).
+
+        Returns:
+            (list) up to k ``(target, distance, (x, y))`` triples, nearest
+              first, where (x, y) is the first step towards the target.
+        """
+        with vin.utils.PROFILER.span('nearest'):
+            return self.distance_field(x, y, searcher).nearest(targets, k)
 
-                        if is_now_hero and is_spawn:
-                            self.map[x, y] = vin.TILE_SPAWN_HERO
-                        elif is_now_hero:
-                            self.map[x, y] = vin.TILE_HERO
 
-                        # only set adjacency's if they are about an enemy hero.
-                        if hero_id is not None and hero.id != hero_id:
-                            if is_now_adj and not any([is_mine, is_wall, is_tavern, is_spawn, is_now_hero]):
-                                self.map[x, y] = vin.TILE_ADJ_HERO
+    def __near_tiles(self, x0, y0):
+        """Yields the tiles whose overlay may depend on a hero at (x0, y0)."""
+        size = self.map.size
+        for y in xrange(max(0, y0 - 2), min(size, y0 + 3)):
+            for x in xrange(max(0, x0 - 2), min(size, x0 + 3)):
+                if distance_manhattan(x0, y0, x, y) < 3:
+                    yield x, y
 
-                            if is_now_near and not any([is_mine, is_wall, is_tavern, is_spawn, is_now_hero, is_now_adj]):
-                                self.map[x, y] = vin.TILE_NEAR_HERO
 
+    def __hero_stencil(self, x0, y0):
+        """Returns the tiles at most two moves away from (x0, y0).
+
+        The stencil is a depth-2 breadth-first flood over the empty map, as a
+        list of ``(x, y, distance)`` tuples. It only depends on static tiles,
+        so it is cached by position.
+        """
+        stencil = self._stencils.get((x0, y0))
+        if stencil is not None:
+            return stencil
+
+        raw = self.empty_map.raw
+        size = self.empty_map.size
+        neighbors = self.graph.neighbors
+        obstacles = (vin.TILE_TAVERN, vin.TILE_MINE)
+
+        stencil = [(x0, y0, 0)]
+        source = y0 * size + x0
+        visited = set([source])
+        frontier = [source]
+        for distance in (1, 2):
+            next_frontier = []
+            for i in frontier:
+                for j in neighbors[i]:
+                    if j in visited:
+                        continue
+
+                    visited.add(j)
+                    if raw[j] not in obstacles:
+                        stencil.append((j % size, j // size, distance))
+                        next_frontier.append(j)
+            frontier = next_frontier
+
+        self._stencils[x0, y0] = stencil
+        return stencil
+
+
+    def __paint_heroes(self, hero_id, dirty = None, game_map = None, positions = None):
+        """Paints the hero, adjacency and nearness tiles over the map.
+
+        Heroes are applied in order, a later hero overriding the tiles set by
+        a previous one. If ``dirty`` is given, only those tiles are painted.
+        ``game_map`` and ``positions`` default to the game map and the
+        current hero positions.
+        """
+        if game_map is None:
+            game_map = self.map
+        if positions is None:
+            positions = [(hero.x, hero.y) for hero in self.heroes]
+
+        for hero, (x0, y0) in zip(self.heroes, positions):
+            # only set adjacency's if they are about an enemy hero.
+            enemy = hero_id is not None and hero.id != hero_id
+
+            for x, y, distance in self.__hero_stencil(x0, y0):
+                if dirty is not None and (x, y) not in dirty:
+                    continue
+
+                tile = game_map[x, y]
+                if distance == 0:
+                    if tile == vin.TILE_SPAWN:
+                        game_map[x, y] = vin.TILE_SPAWN_HERO
+                    else:
+                        game_map[x, y] = vin.TILE_HERO
+
+                elif enemy and tile != vin.TILE_SPAWN:
+                    if distance == 1:
+                        game_map[x, y] = vin.TILE_ADJ_HERO
+                    else:
+                        game_map[x, y] = vin.TILE_NEAR_HERO
 
 
     def __processStartingState(self, state):
         """ Process the state for the FIRST time only."""
-        # helper variables
-        board = state['game']['board']
-        size = board['size']
-        tiles = board['tiles']
-        tiles = [tiles[i:i + 2] for i in xrange(0, len(tiles), 2)]
+        # the board is decoded once, later turns only read the mine owners
+        self.decoder = decoder = StateDecoder(state)
+        size = decoder.size
 
         # run through the map and update map, mines and taverns
         self.map = Map(size)
         self.empty_map = Map(size)
-        for y in xrange(size):
-            for x in xrange(size):
-                tile = tiles[y * size + x]
-                if tile == '##':
-                    self.map[x, y] = vin.TILE_WALL
-                    self.empty_map[x, y] = vin.TILE_WALL
-
-                elif tile == '[]':
-                    self.map[x, y] = vin.TILE_TAVERN
-                    self.empty_map[x, y] = vin.TILE_TAVERN
-                    self.taverns.append(Tavern(x, y))
-
-                elif tile.startswith('$'):
-                    self.map[x, y] = vin.TILE_MINE
-                    self.empty_map[x, y] = vin.TILE_MINE
-                    self.mines.append(Mine(x, y))
-
-                elif tile.startswith("@"):
-                    self.map[x, y] = vin.TILE_HERO
-                    self.empty_map[x, y] = vin.TILE_EMPTY
-
-                else:
-                    self.map[x, y] = vin.TILE_EMPTY
-                    self.empty_map[x, y] = vin.TILE_EMPTY
+        self.map.raw[:] = bytearray(decoder.tiles)
+        self.empty_map.raw[:] = bytearray(vin.TILE_EMPTY if tile == vin.TILE_HERO else tile
+                                          for tile in decoder.tiles)
+
+        # the walls never change, so both maps share a single adjacency
+        self.graph = self.empty_map.graph
+        self.map.graph = self.graph
+
+        self.taverns = [Tavern(x, y) for x, y in decoder.taverns]
+        self.mines = [Mine(x, y) for x, y in decoder.mines]
 
         # create heroes
         for hero in state['game']['heroes']:
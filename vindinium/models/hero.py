@@ -19,8 +19,18 @@ class Hero(object):
         y (int): the bot's position in the Y axis.
         spawn_x (int): the bot's spawn position in X.
         spawn_y (int): the bot's spawn position in Y.
+        friendly (bool): whether the bot is in ``vindinium.FRIENDLY``.
+
+    The remaining attributes are free for the bots' analysis (e.g., the
+    ``path_dist`` set by ``DecisionBot``), and default to None.
     """
-    
+
+    __slots__ = ('id', 'name', 'friendly', 'user_id', 'elo', 'crashed',
+                 'mine_count', 'gold', 'life', 'last_dir', 'x', 'y',
+                 'spawn_x', 'spawn_y',
+                 # analysis
+                 'income', 'distance', 'priority', 'dist_to_heroes', 'path_dist')
+
     def __init__(self, hero):
         """Constructor.
 
@@ -44,3 +54,10 @@ class Hero(object):
         self.y          = hero['pos']['x']
         self.spawn_x    = hero['spawnPos']['y']
         self.spawn_y    = hero['spawnPos']['x']
+
+        # Analysis
+        self.income         = None
+        self.distance       = None
+        self.priority       = None
+        self.dist_to_heroes = None
+        self.path_dist      = None
@@ -2,14 +2,26 @@ __all__ = ['Map']
 
 import vindinium as vin
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class Map(object):
     """Represents static elements in the game, such as walls, paths, taverns,
     mines and spawn points.
 
+    The board is stored in a flat ``bytearray``, one byte per tile, where the
+    tile (x, y) lives at index ``y * size + x``. Hot loops (e.g., pathfinding)
+    may index ``raw`` directly instead of going through ``map[x, y]``.
+
     Attributes:
         size (int): the board size (in a single axis).
+        raw (bytearray): the flat tile buffer, indexed by ``y * size + x``.
+        graph (vindinium.ai.Graph): the adjacency of the tiles, built from
+          the walls on first use.
     """
-    
+
     def __init__(self, size):
         """Constructor.
 
@@ -17,15 +29,84 @@ class Map(object):
             size (int): the board size.
         """
         self.size = size
-        self.__board = [[0 for i in xrange(size)] for j in xrange(size)]
+        self.raw = bytearray(size * size)
+        self._graph = None
+
+    @property
+    def graph(self):
+        """The adjacency of the tiles (see ``vindinium.ai.Graph``), built
+        on first use. The walls must not change after that."""
+        if self._graph is None:
+            self._graph = vin.ai.Graph(self)
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph):
+        """Shares the adjacency of another map with the same walls."""
+        self._graph = graph
 
     def __getitem__(self, key):
         """Returns an item in the map."""
-        return self.__board[key[0]][key[1]]
+        return self.raw[self.__index(key)]
 
     def __setitem__(self, key, value):
         """Sets an item in the map."""
-        self.__board[key[0]][key[1]] = value
+        self.raw[self.__index(key)] = value
+
+    def __index(self, key):
+        """Converts a (x, y) key to the flat index, with list semantics for
+        negative and out of range values."""
+        x, y = key
+        size = self.size
+
+        if x < 0:
+            x += size
+        if y < 0:
+            y += size
+        if not (-1 < x < size and -1 < y < size):
+            raise IndexError('map index out of range')
+
+        return y * size + x
+
+    def index(self, x, y):
+        """Returns the flat index of the tile (x, y) in ``raw``."""
+        return y * self.size + x
+
+    def copy(self):
+        """Returns a snapshot of this map.
+
+        Returns:
+            (vindinium.models.Map) a new map with a copy of the tiles.
+        """
+        snapshot = Map(self.size)
+        snapshot.raw[:] = self.raw
+        snapshot._graph = self._graph
+        return snapshot
+
+    def restore(self, other):
+        """Overwrites all tiles of this map with the tiles of another map.
+
+        Args:
+            other (vindinium.models.Map): a map of the same size.
+
+        Raises:
+            ValueError if the maps have different sizes.
+        """
+        if other.size != self.size:
+            raise ValueError('Cannot restore a map of size %d from a map of '
+                             'size %d.' % (self.size, other.size))
+        self.raw[:] = other.raw
+
+    def as_array(self):
+        """Returns a NumPy ``uint8`` view of the tiles, sharing the memory of
+        this map and indexed as ``array[y, x]``.
+
+        Raises:
+            ImportError if NumPy is not installed.
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required for Map.as_array().')
+        return numpy.frombuffer(self.raw, dtype=numpy.uint8).reshape(self.size, self.size)
 
     def __str__(self, heroes = None):
         """ Pretty map. input heroes for hero IDs to print to the map"""
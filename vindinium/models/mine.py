@@ -8,8 +8,11 @@ class Mine(object):
         x (int): the mine position in X.
         y (int): the mine position in Y.
         owner (int): the hero's id that owns this mine.
+        friendly (bool): whether the owner is a friendly hero.
+        path_dist (int): free for the bots' analysis, defaults to None.
     """
 
+    __slots__ = ('x', 'y', 'owner', 'friendly', 'path_dist')
 
     def __init__(self, x, y):
         """Constructor.
@@ -21,3 +24,5 @@ class Mine(object):
         self.x = x
         self.y = y
         self.owner = None
+        self.friendly = False
+        self.path_dist = None
@@ -7,8 +7,11 @@ class Tavern(object):
     Attributes:
         x (int): the tavern position in X.
         y (int): the tavern position in Y.
+        path_dist (int): free for the bots' analysis, defaults to None.
     """
 
+    __slots__ = ('x', 'y', 'path_dist')
+
     def __init__(self, x, y):
         """Constructor
 
@@ -17,4 +20,5 @@ class Tavern(object):
             y (int): the mine position in Y.
         """
         self.x = x
-        self.y = y
\ No newline at end of file
+        self.y = y
+        self.path_dist = None
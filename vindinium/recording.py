@@ -0,0 +1,273 @@
+"""Recording of the games played by a bot, and their offline replay.
+
+A game log is a gzip file of JSON lines, one record per line:
+
+- ``{"type": "header", "version": 1, ...}``: written once when the log is
+  opened, with the ``created`` time and any extra fields given.
+- ``{"type": "state", "state": {...}}``: a state received from the server.
+  The ``token`` and ``playUrl`` fields are left out, as they would let
+  anyone play the hero.
+- ``{"type": "command", "command": "North", "time": 0.012}``: the command
+  sent for the previous state, and the seconds it took from receiving the
+  state.
+- ``{"type": "end"}``: written when the game is over.
+
+A log holds a single game. Records are only appended and the compressed
+stream is flushed after each one, so the log of a client that crashed is
+readable up to its last record. Consecutive states differ in a few tiles,
+which the compression takes advantage of.
+
+``replay`` feeds a log back to a bot through ``BaseBot._start``,
+``BaseBot._move`` and ``BaseBot._end``, without the server nor any
+deadline, and compares its commands with the recorded ones.
+
+Example::
+
+    client = vindinium.Client('<botskey>')
+    client.record_dir = 'games'
+    client.run(MyBot())
+
+    from vindinium.recording import replay
+    result = replay('games/<game id>-<hero id>.jsonl.gz', MyBot())
+    result['mismatches'], result['elapsed']
+
+"""
+
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import zlib
+import timeit
+
+import vindinium as vin
+
+__all__ = ['GameRecorder', 'read_log', 'load_log', 'replay']
+
+VERSION = 1
+
+# state fields left out of the logs
+SECRET_FIELDS = ('token', 'playUrl')
+
+
+class GameRecorder(object):
+    """Appends the states and commands of a game to a log file.
+
+    Example::
+
+        recorder = GameRecorder('game.jsonl.gz', bot = 'MinerBot')
+        recorder.state(state)
+        recorder.command('North', 0.012)
+        ...
+        recorder.close()
+
+    Attributes:
+        path (str): the log file.
+        n_records (int): the records written, header included.
+    """
+
+    def __init__(self, path, **header):
+        """Constructor.
+
+        Creates the file, and its directory if needed, and writes the
+        header. An existing log is never overwritten nor appended to.
+
+        Args:
+            path (str): the log file.
+            **header: extra fields of the header record, e.g. the bot name.
+
+        Raises:
+            IOError or OSError if the file exists or cannot be created.
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.n_records = 0
+        if os.path.exists(path):
+            raise IOError('Log "%s" already exists.' % path)
+        self._file = gzip.open(path, 'wb')
+
+        header.update({'type': 'header', 'version': VERSION, 'created': time.time()})
+        self._write(header)
+
+
+    def state(self, state):
+        """Records a state received from the server."""
+        state = dict((key, value) for key, value in state.items()
+                     if key not in SECRET_FIELDS)
+        self._write({'type': 'state', 'state': state})
+
+
+    def command(self, command, elapsed = None):
+        """Records a command sent to the server.
+
+        Args:
+            command (str): the command.
+            elapsed (float): the seconds from the state to the command.
+              Defaults to None.
+        """
+        self._write({'type': 'command', 'command': command, 'time': elapsed})
+
+
+    def close(self, finished = True):
+        """Closes the log.
+
+        Args:
+            finished (bool): whether the game is over, recorded as an ``end``
+              record. Defaults to True.
+        """
+        if self._file is None:
+            return
+        try:
+            if finished:
+                self._write({'type': 'end'})
+        finally:
+            self._file.close()
+            self._file = None
+
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators = (',', ':')) + '\n')
+        self._file.flush()
+        self.n_records += 1
+
+
+def read_log(path):
+    """Yields the records of a log, in order.
+
+    A log cut short (e.g. by a crash) is read up to its last complete
+    record.
+
+    Args:
+        path (str): the log file.
+    """
+    f = gzip.open(path, 'rb')
+    try:
+        while True:
+            try:
+                line = f.readline()
+            except (IOError, EOFError, zlib.error):
+                return
+            if not line.endswith('\n'):
+                return
+            yield vin.utils.loads(line)
+    finally:
+        f.close()
+
+
+def load_log(path):
+    """Reads a log into memory.
+
+    Returns:
+        (dict) with the ``header`` record, the ``states`` and the
+          ``commands`` in order, the ``times`` of the commands, and whether
+          the game ``finished``. ``commands[k]`` was sent for ``states[k]``.
+
+    Raises:
+        ValueError if the file is not a game log, or of a newer version.
+    """
+    log = {'header': None, 'states': [], 'commands': [], 'times': [], 'finished': False}
+    for record in read_log(path):
+        kind = record['type']
+        if kind == 'state':
+            log['states'].append(record['state'])
+        elif kind == 'command':
+            log['commands'].append(record['command'])
+            log['times'].append(record['time'])
+        elif kind == 'end':
+            log['finished'] = True
+        elif kind == 'header' and log['header'] is None:
+            if record['version'] > VERSION:
+                raise ValueError('Log "%s" has version %d, expected %d or older.' % (
+                                 path, record['version'], VERSION))
+            log['header'] = record
+
+    if log['header'] is None:
+        raise ValueError('"%s" is not a game log.' % path)
+    return log
+
+
+def replay(log, bot):
+    """Plays a recorded game again with a bot, as fast as it goes.
+
+    The bot starts with the first state and moves with every state that was
+    answered with a command, as ``Client.run`` does, but without a deadline.
+    The commands of the bot are compared with the recorded ones, which only
+    match for a deterministic bot (or a seeded one) that was not late.
+
+    Args:
+        log (str or dict): the log file, or a log from ``load_log``.
+        bot (vindinium.bots.BaseBot): the bot, a fresh instance.
+
+    Returns:
+        (dict) with the ``turns`` played, the bot's ``commands``, the
+          ``recorded`` ones, the number of ``mismatches``, the seconds of
+          each move in ``move_times`` and the ``elapsed`` seconds of the
+          whole replay.
+    """
+    if isinstance(log, basestring):
+        log = load_log(log)
+
+    states = log['states']
+    recorded = log['commands']
+    clock = timeit.default_timer
+
+    commands = []
+    move_times = []
+    start = clock()
+    if states:
+        bot._start(states[0])
+        try:
+            for state in states[:len(recorded)]:
+                tic = clock()
+                commands.append(bot._move(state))
+                move_times.append(clock() - tic)
+        finally:
+            bot._end()
+    elapsed = clock() - start
+
+    return {'turns': len(commands),
+            'commands': commands,
+            'recorded': recorded,
+            'mismatches': sum(1 for a, b in zip(commands, recorded) if a != b),
+            'move_times': move_times,
+            'elapsed': elapsed}
+
+
+if __name__ == '__main__':
+    # python -m vindinium.recording <bot class> <log or directory>...
+    if len(sys.argv) < 3:
+        print('Usage: python -m vindinium.recording <bot class> <log or directory>...')
+        sys.exit(2)
+
+    bot_class = getattr(vin.bots, sys.argv[1])
+    paths = []
+    for path in sys.argv[2:]:
+        if os.path.isdir(path):
+            paths.extend(sorted(glob.glob(os.path.join(path, '*.jsonl.gz'))))
+        else:
+            paths.append(path)
+
+    stdout = sys.stdout
+    total_turns = total_mismatches = 0
+    total_elapsed = 0.0
+    for path in paths:
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            result = replay(path, bot_class())
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+        total_turns += result['turns']
+        total_mismatches += result['mismatches']
+        total_elapsed += result['elapsed']
+        print('%s: %d turns, %d mismatches, %.3fs' % (path, result['turns'],
+              result['mismatches'], result['elapsed']))
+
+    print('%d games, %d turns, %d mismatches, %.3fs' % (len(paths), total_turns,
+          total_mismatches, total_elapsed))
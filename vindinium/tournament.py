@@ -0,0 +1,324 @@
+"""Self-play tournaments between bot classes on the local engine.
+
+Matches are played in parallel, one game per process of a
+``multiprocessing`` pool, and every finished game is appended as a JSON line
+to a results file. ``summarize`` computes aggregate statistics with 95%
+confidence intervals from those results.
+
+Example::
+
+    from vindinium.bots import MinerBot, HunterBot, DecisionBot
+    from vindinium.tournament import Tournament, summarize, print_summary
+
+    tournament = Tournament({'miner': MinerBot, 'hunter': HunterBot,
+                             'decision': DecisionBot}, 'results.jsonl')
+    tournament.round_robin(rounds = 5)
+    print_summary(summarize('results.jsonl'))
+
+"""
+
+import os
+import sys
+import json
+import math
+import random
+import itertools
+import multiprocessing
+
+from vindinium.engine import Board, play
+from vindinium.utils import percentile
+
+__all__ = ['Tournament', 'play_match', 'read_results', 'summarize', 'print_summary']
+
+POINTS = [3, 2, 1, 0]
+
+
+def play_match(match):
+    """Plays a single match, used by the process pool.
+
+    Args:
+        match (dict): with ``id``, ``seed``, ``bots`` (list of 4 names),
+          ``classes`` (list of 4 bot classes or factories), ``board_size``
+          and ``n_turns``.
+
+    Returns:
+        (dict) the match result, with a record per hero (see ``Tournament``).
+    """
+    board = Board.generate(match['board_size'], match['seed'])
+    bots = [factory() for factory in match['classes']]
+
+    # bots print a lot, keep the workers quiet
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        game = play(bots, board, match['n_turns'], id = str(match['id']))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    heroes = []
+    for hero, name in zip(game.heroes, match['bots']):
+        times = sorted(game.move_times[hero.id])
+        rank = 1 + sum(1 for other in game.heroes if other.gold > hero.gold)
+        heroes.append({'bot': name,
+                       'hero': hero.id,
+                       'gold': hero.gold,
+                       'mines': hero.mine_count,
+                       'deaths': hero.deaths,
+                       'crashed': hero.crashed,
+                       'rank': rank,
+                       'points': POINTS[rank - 1],
+                       'moves': len(times),
+                       'move_mean': sum(times) / len(times) if times else 0.0,
+                       'move_p95': percentile(times, 0.95),
+                       'move_max': times[-1] if times else 0.0})
+
+    return {'match': match['id'],
+            'round': match.get('round'),
+            'seed': match['seed'],
+            'board_size': match['board_size'],
+            'n_turns': match['n_turns'],
+            'heroes': heroes}
+
+
+class Tournament(object):
+    """Schedules and plays matches between bot classes.
+
+    Attributes:
+        bots (dict): bot classes (or factories returning a bot), by name.
+        results_path (str): the append-only results file (JSON lines).
+        processes (int): the pool size. Defaults to the number of cores.
+        n_turns (int): rounds per game. Defaults to 300.
+        board_size (int): size of the generated boards. Defaults to 18.
+        seed (int): seed for the schedule and the boards.
+    """
+
+    def __init__(self, bots, results_path, processes = None, n_turns = 300,
+                 board_size = 18, seed = None):
+        """Constructor.
+
+        Args:
+            bots (dict): bot classes (or picklable factories), by name.
+            results_path (str): the results file, results are appended.
+            processes (int): the pool size. Defaults to the number of cores.
+            n_turns (int): rounds per game. Defaults to 300.
+            board_size (int): size of the generated boards. Defaults to 18.
+            seed (int): seed for the schedule and the boards. Defaults to
+              None.
+        """
+        self.bots = dict(bots)
+        self.results_path = results_path
+        self.processes = processes or multiprocessing.cpu_count()
+        self.n_turns = n_turns
+        self.board_size = board_size
+        self.seed = seed
+
+        self._random = random.Random(seed)
+        self._next_id = 0
+
+
+    def match(self, names, round = None):
+        """Creates a match between four bots, with a new board seed."""
+        self._next_id += 1
+        return {'id': self._next_id,
+                'round': round,
+                'seed': self._random.randint(0, 2 ** 31),
+                'bots': list(names),
+                'classes': [self.bots[name] for name in names],
+                'board_size': self.board_size,
+                'n_turns': self.n_turns}
+
+
+    def run(self, matches):
+        """Plays matches in the process pool, appending each result to the
+        results file as soon as it is finished.
+
+        Returns:
+            (list) the match results, in completion order.
+        """
+        results = []
+        pool = multiprocessing.Pool(self.processes)
+        try:
+            with open(self.results_path, 'a') as f:
+                for result in pool.imap_unordered(play_match, matches):
+                    f.write(json.dumps(result) + '\n')
+                    f.flush()
+                    results.append(result)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        return results
+
+
+    def round_robin(self, rounds = 1):
+        """Plays every group of four bots, rotating seats so that each bot
+        plays from each spawn point.
+
+        With less than four bots, groups repeat bots.
+
+        Args:
+            rounds (int): how many times the whole schedule is played.
+
+        Returns:
+            (list) the match results.
+        """
+        names = sorted(self.bots)
+        if len(names) >= 4:
+            groups = list(itertools.combinations(names, 4))
+        else:
+            groups = list(itertools.combinations_with_replacement(names, 4))
+            groups = [g for g in groups if set(g) == set(names)] or groups
+
+        matches = []
+        for r in xrange(rounds):
+            for group in groups:
+                for k in xrange(4):
+                    matches.append(self.match(group[k:] + group[:k], r))
+
+        return self.run(matches)
+
+
+    def swiss(self, rounds = 5):
+        """Plays a Swiss tournament: each round, bots are ranked by points and
+        consecutive bots of the ranking play together.
+
+        Needs at least four bots. When the number of bots is not a multiple
+        of four, the leftover bots sit out the round (a bye) and score the
+        mean points of a match. Byes go to the lowest ranked bots with the
+        fewest byes, so each bot plays at most once per round.
+
+        Args:
+            rounds (int): the number of rounds.
+
+        Returns:
+            (list) the match results of all rounds.
+        """
+        names = sorted(self.bots)
+        if len(names) < 4:
+            raise ValueError('A Swiss tournament needs at least 4 bots.')
+
+        points = dict((name, 0) for name in names)
+        byes = dict((name, 0) for name in names)
+        results = []
+        for r in xrange(rounds):
+            ranking = sorted(names, key = lambda name: (-points[name], self._random.random()))
+
+            # sorting is stable: the lowest ranked among the fewest byes
+            resting = sorted(reversed(ranking), key = lambda name: byes[name])[:len(ranking) % 4]
+            for name in resting:
+                byes[name] += 1
+                points[name] += sum(POINTS) / 4.0
+
+            playing = [name for name in ranking if name not in resting]
+            groups = [playing[i:i + 4] for i in xrange(0, len(playing), 4)]
+
+            matches = []
+            for group in groups:
+                self._random.shuffle(group)
+                matches.append(self.match(group, r))
+
+            for result in self.run(matches):
+                for hero in result['heroes']:
+                    points[hero['bot']] += hero['points']
+                results.append(result)
+
+        return results
+
+
+def read_results(path):
+    """Reads the match results from a results file.
+
+    Returns:
+        (list) the match results.
+    """
+    results = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                results.append(json.loads(line))
+    return results
+
+
+def summarize(results):
+    """Computes aggregate statistics per bot.
+
+    Args:
+        results (list or str): the match results, or a results file path.
+
+    Returns:
+        (dict) for each bot name, a dict with the number of ``games``, the
+          ``win_rate``, and the ``gold``, ``mines``, ``deaths``, ``points`` and
+          ``move_mean`` statistics as ``(mean, half_width)`` tuples, the 95%
+          confidence interval being ``mean +- half_width``. Also the worst
+          ``move_p95`` and the ``crashes`` count.
+    """
+    if isinstance(results, basestring):
+        results = read_results(results)
+
+    records = {}
+    for result in results:
+        for hero in result['heroes']:
+            records.setdefault(hero['bot'], []).append(hero)
+
+    summary = {}
+    for name, heroes in records.items():
+        wins = [1.0 if hero['rank'] == 1 else 0.0 for hero in heroes]
+        summary[name] = {
+            'games': len(heroes),
+            'win_rate': _mean_ci(wins),
+            'gold': _mean_ci([hero['gold'] for hero in heroes]),
+            'mines': _mean_ci([hero['mines'] for hero in heroes]),
+            'deaths': _mean_ci([hero['deaths'] for hero in heroes]),
+            'points': _mean_ci([hero['points'] for hero in heroes]),
+            'move_mean': _mean_ci([hero['move_mean'] for hero in heroes]),
+            'move_p95': max(hero['move_p95'] for hero in heroes),
+            'crashes': sum(1 for hero in heroes if hero['crashed'])}
+
+    return summary
+
+
+def print_summary(summary):
+    """Prints the summary of ``summarize`` as a table, best bots first."""
+    print('{0:<16} {1:>6} {2:>14} {3:>16} {4:>12} {5:>12} {6:>10} {7:>8}'.format(
+          'bot', 'games', 'win rate', 'gold', 'mines', 'deaths', 'move ms', 'crashes'))
+
+    ranking = sorted(summary.items(), key = lambda item: -item[1]['points'][0])
+    for name, s in ranking:
+        print('{0:<16} {1:>6} {2:>14} {3:>16} {4:>12} {5:>12} {6:>10.2f} {7:>8}'.format(
+              name, s['games'],
+              '%.2f +- %.2f' % s['win_rate'],
+              '%.0f +- %.0f' % s['gold'],
+              '%.1f +- %.1f' % s['mines'],
+              '%.1f +- %.1f' % s['deaths'],
+              s['move_mean'][0] * 1000, s['crashes']))
+
+
+def _mean_ci(values, z = 1.96):
+    """Returns the mean and the half width of its normal confidence
+    interval."""
+    n = len(values)
+    if n == 0:
+        return 0.0, 0.0
+
+    mean = float(sum(values)) / n
+    if n == 1:
+        return mean, 0.0
+
+    variance = sum((v - mean) ** 2 for v in values) / (n - 1)
+    return mean, z * math.sqrt(variance / n)
+
+
+if __name__ == '__main__':
+    import vindinium as vin
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'tournament.jsonl'
+    tournament = Tournament({'MinerBot': vin.bots.MinerBot,
+                             'HunterBot': vin.bots.HunterBot,
+                             'DecisionBot': vin.bots.DecisionBot}, path)
+    tournament.round_robin()
+    print_summary(summarize(path))
@@ -0,0 +1,319 @@
+"""Genetic search over the propensities of ``DecisionBot``.
+
+Each individual is a ``props`` dict, e.g. ``{'mine': 1.0, 'drink': 1.0,
+'kill': 1.0, 'flee': 1.0}``. Its fitness comes from local games against
+fixed opponents (see ``vindinium.engine``), played in parallel in a
+``multiprocessing`` pool. The state of the search is saved to a checkpoint
+file after every generation, and a new ``Tuner`` with the same checkpoint
+resumes from it.
+
+Example::
+
+    from vindinium.bots import DecisionBot
+    from vindinium.tuning import Tuner
+
+    tuner = Tuner(DecisionBot, 'tuning.json', population = 16, games = 4)
+    best = tuner.run(generations = 20)
+
+"""
+
+import os
+import sys
+import json
+import math
+import random
+import logging
+import tempfile
+import functools
+import multiprocessing
+
+from vindinium.tournament import play_match
+
+__all__ = ['Tuner']
+
+
+class Tuner(object):
+    """Genetic algorithm over bot propensities.
+
+    Every generation, each individual plays ``games`` local games, one per
+    board, against the ``opponents``, rotating its seat. All individuals of
+    a generation play the same boards. The fitness of an individual is its
+    mean rank points (3 for the first, 2, 1, 0 for the last) plus its mean
+    share of the gold in the game. A game where the individual crashed
+    scores 0, and an individual crashing in all its games stops the search.
+
+    The next generation keeps the ``elite`` best individuals. The others
+    are children of parents picked by tournament selection, with uniform
+    crossover and log-normal mutation, clipped to ``bounds``.
+
+    Attributes:
+        bot_class (class): the bot to tune, built as ``bot_class(props)``.
+        checkpoint_path (str): the checkpoint file, JSON.
+        keys (list): the propensity names.
+        opponents (list): three bot classes (or factories).
+        population (int): the number of individuals per generation.
+        games (int): games played by each individual per generation.
+        elite (int): the best individuals kept in the next generation.
+        sigma (float): the mutation strength, in log scale.
+        bounds (tuple): the (min, max) value of a propensity.
+        processes (int): the pool size. Defaults to the number of cores.
+        n_turns (int): rounds per game.
+        board_size (int): size of the generated boards.
+        generation (int): the current generation.
+        individuals (list): the props of the current generation.
+        history (list): the best and mean fitness of each generation.
+        best (dict): the best individual found, with its ``props`` and
+          ``fitness``.
+    """
+
+    def __init__(self, bot_class, checkpoint_path, keys = ('mine', 'drink', 'kill', 'flee'),
+                 opponents = None, population = 16, games = 4, elite = 2, sigma = 0.3,
+                 bounds = (0.05, 10.0), processes = None, n_turns = 300, board_size = 18,
+                 seed = None):
+        """Constructor.
+
+        Resumes from the checkpoint if the file exists.
+
+        Args:
+            bot_class (class): the bot to tune, e.g. ``DecisionBot``.
+            checkpoint_path (str): the checkpoint file.
+            keys (list): the propensity names. Defaults to mine, drink, kill
+              and flee.
+            opponents (list): three bot classes. Defaults to ``MinerBot``,
+              ``HunterBot`` and ``DecisionBot``.
+            population (int): individuals per generation. Defaults to 16.
+            games (int): games per individual and generation. Defaults to 4.
+            elite (int): best individuals kept. Defaults to 2.
+            sigma (float): the mutation strength. Defaults to 0.3.
+            bounds (tuple): the (min, max) of a propensity. Defaults to
+              (0.05, 10.0).
+            processes (int): the pool size. Defaults to the number of cores.
+            n_turns (int): rounds per game. Defaults to 300.
+            board_size (int): size of the boards. Defaults to 18.
+            seed (int): the random seed. Defaults to None.
+        """
+        if opponents is None:
+            import vindinium as vin
+            opponents = [vin.bots.MinerBot, vin.bots.HunterBot, vin.bots.DecisionBot]
+        if len(opponents) != 3:
+            raise ValueError('Expected 3 opponents, got %d.' % len(opponents))
+
+        self.bot_class = bot_class
+        self.checkpoint_path = checkpoint_path
+        self.keys = list(keys)
+        self.opponents = list(opponents)
+        self.population = population
+        self.games = games
+        self.elite = elite
+        self.sigma = sigma
+        self.bounds = bounds
+        self.processes = processes or multiprocessing.cpu_count()
+        self.n_turns = n_turns
+        self.board_size = board_size
+
+        self._random = random.Random(seed)
+        self.generation = 0
+        self.individuals = None
+        self.history = []
+        self.best = None
+
+        if os.path.exists(checkpoint_path):
+            self.load()
+
+
+    def run(self, generations = 10):
+        """Runs the search until the given number of generations is reached,
+        saving a checkpoint after each one.
+
+        Returns:
+            (dict) the props of the best individual found.
+        """
+        if self.individuals is None:
+            self.individuals = self.initial_population()
+
+        pool = multiprocessing.Pool(self.processes)
+        try:
+            while self.generation < generations:
+                fitness = self.evaluate(self.individuals, pool)
+                self.__record(fitness)
+                self.individuals = self.next_generation(self.individuals, fitness)
+                self.generation += 1
+                self.save()
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        return self.best['props']
+
+
+    def initial_population(self):
+        """Returns the first generation: the bot's default props (if any)
+        and random props around 1."""
+        individuals = []
+
+        default = getattr(self.bot_class(), 'propensity_to', None)
+        if default:
+            individuals.append(self.__clip(dict((key, default.get(key, 1.0)) for key in self.keys)))
+
+        while len(individuals) < self.population:
+            individuals.append(self.__clip(dict((key, math.exp(self._random.gauss(0, 1)))
+                                                for key in self.keys)))
+        return individuals
+
+
+    def evaluate(self, individuals, pool):
+        """Plays the games of a generation in the pool.
+
+        Returns:
+            (list) the fitness of each individual.
+
+        Raises:
+            RuntimeError if an individual crashed in all its games.
+        """
+        seeds = [self._random.randint(0, 2 ** 31) for _ in xrange(self.games)]
+
+        matches = []
+        for k, props in enumerate(individuals):
+            for g, seed in enumerate(seeds):
+                seat = g % 4
+                classes = list(self.opponents)
+                classes.insert(seat, functools.partial(self.bot_class, props))
+                names = ['opponent'] * 4
+                names[seat] = 'candidate'
+                matches.append({'id': (k, g),
+                                'round': self.generation,
+                                'seed': seed,
+                                'bots': names,
+                                'classes': classes,
+                                'seat': seat,
+                                'board_size': self.board_size,
+                                'n_turns': self.n_turns})
+
+        scores = [[] for _ in individuals]
+        crashes = [0] * len(individuals)
+        for match, result in zip(matches, pool.map(play_match, matches)):
+            k = match['id'][0]
+            heroes = result['heroes']
+            hero = heroes[match['seat']]
+            if hero['crashed']:
+                crashes[k] += 1
+                scores[k].append(0.0)
+                continue
+            total = sum(h['gold'] for h in heroes)
+            share = float(hero['gold']) / total if total else 0.25
+            scores[k].append(hero['points'] + share)
+
+        for k, props in enumerate(individuals):
+            if crashes[k] == len(seeds):
+                raise RuntimeError('%s crashed in all its games with %s, check the log.' % (
+                                   self.bot_class.__name__, props))
+            if crashes[k]:
+                logging.warning('%s crashed in %d of %d games with %s.', self.bot_class.__name__,
+                                crashes[k], len(seeds), props)
+
+        return [sum(s) / len(s) for s in scores]
+
+
+    def next_generation(self, individuals, fitness):
+        """Returns the next generation: the elite and the children."""
+        ranking = sorted(range(len(individuals)), key = lambda k: -fitness[k])
+        children = [dict(individuals[k]) for k in ranking[:self.elite]]
+
+        while len(children) < self.population:
+            a = self.__select(individuals, fitness)
+            b = self.__select(individuals, fitness)
+            child = {}
+            for key in self.keys:
+                value = a[key] if self._random.random() < 0.5 else b[key]
+                child[key] = value * math.exp(self._random.gauss(0, self.sigma))
+            children.append(self.__clip(child))
+
+        return children
+
+
+    def __select(self, individuals, fitness, size = 3):
+        """Tournament selection."""
+        picks = [self._random.randrange(len(individuals)) for _ in xrange(size)]
+        return individuals[max(picks, key = lambda k: fitness[k])]
+
+
+    def __clip(self, props):
+        low, high = self.bounds
+        return dict((key, min(max(value, low), high)) for key, value in props.items())
+
+
+    def __record(self, fitness):
+        """Keeps the statistics of a generation and the best individual."""
+        k = max(range(len(fitness)), key = lambda k: fitness[k])
+        self.history.append({'generation': self.generation,
+                             'best': fitness[k],
+                             'mean': sum(fitness) / len(fitness),
+                             'props': self.individuals[k]})
+
+        if self.best is None or fitness[k] > self.best['fitness']:
+            self.best = {'props': dict(self.individuals[k]),
+                         'fitness': fitness[k],
+                         'generation': self.generation}
+
+        print('Generation %d: best %.3f, mean %.3f, %s' % (
+              self.generation, fitness[k], self.history[-1]['mean'], self.individuals[k]))
+
+
+    def save(self):
+        """Saves the state of the search to the checkpoint file, atomically."""
+        state = {'bot': self.bot_class.__name__,
+                 'keys': self.keys,
+                 'generation': self.generation,
+                 'individuals': self.individuals,
+                 'history': self.history,
+                 'best': self.best,
+                 'random': self._random.getstate()}
+
+        path = self.checkpoint_path
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.rename(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+    def load(self):
+        """Restores the state of the search from the checkpoint file.
+
+        Raises:
+            ValueError if the checkpoint is for another bot or other keys.
+        """
+        with open(self.checkpoint_path) as f:
+            state = json.load(f)
+
+        if state['bot'] != self.bot_class.__name__ or state['keys'] != self.keys:
+            raise ValueError('Checkpoint "%s" is for %s %s.' % (self.checkpoint_path,
+                             state['bot'], state['keys']))
+
+        self.generation = state['generation']
+        self.individuals = [dict((str(k), v) for k, v in props.items())
+                            for props in state['individuals']]
+        self.history = state['history']
+        self.best = state['best']
+        if self.best is not None:
+            self.best['props'] = dict((str(k), v) for k, v in self.best['props'].items())
+
+        # JSON turns the tuples of the random state into lists
+        version, internal, gauss = state['random']
+        self._random.setstate((version, tuple(internal), gauss))
+
+
+if __name__ == '__main__':
+    import vindinium as vin
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'tuning.json'
+    generations = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    tuner = Tuner(vin.bots.DecisionBot, path)
+    print(tuner.run(generations))
@@ -1,2 +1,4 @@
 from .functions import *
-from .timer import *
\ No newline at end of file
+from .timer import *
+from .profiler import *
+from .decoder import *
@@ -0,0 +1,107 @@
+import vindinium as vin
+
+__all__ = ['loads', 'JSON_BACKEND', 'StateDecoder']
+
+# The fastest JSON parser installed
+try:
+    import orjson as _json
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    try:
+        import ujson as _json
+        JSON_BACKEND = 'ujson'
+    except ImportError:
+        try:
+            import simplejson as _json
+            JSON_BACKEND = 'simplejson'
+        except ImportError:
+            import json as _json
+            JSON_BACKEND = 'json'
+
+
+def loads(data):
+    """Parses a JSON document (e.g., a server response) with the fastest
+    backend installed: orjson, ujson, simplejson or the standard json
+    module, in this order. The backend in use is ``JSON_BACKEND``.
+
+    Args:
+        data (str): the JSON document.
+
+    Returns:
+        The parsed object.
+    """
+    return _json.loads(data)
+
+
+# owner characters of the tile string
+_OWNERS = {'-': None, '1': 1, '2': 2, '3': 3, '4': 4}
+
+
+class StateDecoder(object):
+    """Decodes the server's board once and the dynamic fields each turn.
+
+    The board layout never changes during a game, so the tile string is
+    parsed only for the first state. Mine owners are then read from their
+    known offsets in the tile string, and the cost of decoding a turn does
+    not depend on the board size.
+
+    Example::
+
+        decoder = StateDecoder(state)
+        decoder.tiles                        # static tile values
+        decoder.mine_owners(tiles)           # [None, 2, None, ...]
+
+    Attributes:
+        size (int): the board size.
+        tiles (list): the tile value of each position (``y*size + x``) of
+          the first state. Heroes are ``vindinium.TILE_HERO``.
+        mines (list): the (x, y) position of each mine.
+        taverns (list): the (x, y) position of each tavern.
+    """
+
+    def __init__(self, state):
+        """Constructor.
+
+        Args:
+            state (dict): the first state of the game.
+        """
+        board = state['game']['board']
+        size = board['size']
+        tiles = board['tiles']
+
+        self.size = size
+        self.tiles = []
+        self.mines = []
+        self.taverns = []
+        self._mine_offsets = []
+
+        # only the first character of each tile tells its kind
+        values = self.tiles
+        for i in xrange(size * size):
+            char = tiles[2 * i]
+            if char == ' ':
+                values.append(vin.TILE_EMPTY)
+            elif char == '#':
+                values.append(vin.TILE_WALL)
+            elif char == '[':
+                values.append(vin.TILE_TAVERN)
+                self.taverns.append((i % size, i // size))
+            elif char == '$':
+                values.append(vin.TILE_MINE)
+                self.mines.append((i % size, i // size))
+                self._mine_offsets.append(2 * i + 1)
+            elif char == '@':
+                values.append(vin.TILE_HERO)
+            else:
+                raise ValueError('Invalid tile "%s" at position %d.' % (tiles[2 * i:2 * i + 2], i))
+
+
+    def mine_owners(self, tiles):
+        """Returns the owner (hero id or None) of each mine, in the order of
+        ``mines``.
+
+        Args:
+            tiles (str): the tile string of a state of the same game.
+        """
+        owners = _OWNERS
+        return [owners[tiles[offset]] for offset in self._mine_offsets]
@@ -1,12 +1,15 @@
+import math
 import vindinium
-from vindinium.ai import AStar
+from vindinium.ai import DistanceField, default_searcher
 
 __all__ = ['dir_to_command',
            'command_to_dir',
            'path_to_command',
            'distance_manhattan',
            'distance_path',
-           'order_by_distance']
+           'order_by_distance',
+           'nearest',
+           'percentile']
 
 
 def dir_to_command(dx, dy):
@@ -108,13 +111,15 @@ def distance_manhattan(x0, y0, x1, y1):
 def distance_path(x0, y0, x1, y1, game_map, searcher = None):
     """
     finds preference weighted path distance between two points for a given game map and
-    AStar pathfinding instance.
+    AStar pathfinding instance. without a searcher, the map's default searcher is
+    reused (see vindinium.ai.default_searcher).
     """
     if searcher is None:
-        searcher = AStar(game_map)
+        searcher = default_searcher(game_map)
 
-    if searcher.find(x0, y0, x1, y1) is not None:
-        return len(searcher.find(x0, y0, x1, y1))
+    path = searcher.find(x0, y0, x1, y1)
+    if path is not None:
+        return len(path)
     else:
         return 0
 
@@ -127,6 +132,9 @@ def order_by_distance(x0, y0, objects, game_map = None, searcher = None, lim = 1
     player positions, and avoidance preferences. if a game_map and searcher are
     not provided this function returns the simple manhattan distance.
 
+    the path distances of all objects come from a single distance field
+    flooded from (x0, y0), instead of a search per object.
+
     only provides the nearest 10
     """
 
@@ -138,13 +146,52 @@ def order_by_distance(x0, y0, objects, game_map = None, searcher = None, lim = 1
         objects   = objects[:lim]
 
     if game_map is not None:
-        distances = [distance_path(x0, y0, obj.x, obj.y, game_map, searcher) for obj in objects]
+        if searcher is None:
+            searcher = default_searcher(game_map)
+
+        # unreachable objects count as 0, like distance_path
+        field = DistanceField(searcher, x0, y0)
+        distances = [field.distance(obj.x, obj.y) or 0 for obj in objects]
         distances, objects = zip(*sorted(zip(distances, objects)))
 
     return objects, distances
 
 
+def nearest(x0, y0, targets, k = 1, searcher = None, game_map = None):
+    """Finds the k nearest targets from (x0, y0) with a single multi-goal
+    search, which stops as soon as k targets are reached.
+
+    Args:
+        x0 (int): initial position in X axis.
+        y0 (int): initial position in Y axis.
+        targets (list): objects with ``x`` and ``y`` attributes.
+        k (int): the maximum number of targets. Defaults to 1.
+        searcher (vindinium.ai.AStar): the map and cost profile of the search.
+        game_map (vindinium.models.Map): the map, used with the default costs
+          if no searcher is given.
+
+    Returns:
+        (list) up to k ``(target, distance, (x, y))`` triples, nearest first,
+          where (x, y) is the first step towards the target. Unreachable
+          targets are left out.
+    """
+    if searcher is None:
+        searcher = default_searcher(game_map)
+
+    return DistanceField(searcher, x0, y0).nearest(targets, k)
 
 
+def percentile(values, q):
+    """Returns a quantile of sorted values, by the nearest rank method.
 
+    Args:
+        values (list): the values, sorted.
+        q (float): the quantile, e.g. 0.95.
 
+    Returns:
+        (float) the value, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    k = int(math.ceil(q * len(values))) - 1
+    return values[min(max(k, 0), len(values) - 1)]
@@ -0,0 +1,254 @@
+import csv
+import json
+import itertools
+import threading
+
+from vindinium.utils.timer import Timer
+from vindinium.utils.functions import percentile
+
+__all__ = ['Profiler', 'Span', 'PROFILER']
+
+
+class Profiler(object):
+    """Records named, nested time spans of the hot path.
+
+    Spans are opened with ``span`` in a ``with`` statement. A span opened
+    inside another one is recorded with the path of names from the
+    outermost span, e.g. ``'move/update'``. The package opens spans for the
+    HTTP round-trip (``http``), the state decoding (``decode``), the bot
+    move (``move``), ``Game.update`` (``update``), the bot decision
+    (``decide``) and the pathfinding (``search`` and ``nearest``).
+
+    The spans are kept in a ring buffer of ``capacity`` entries, the oldest
+    being overwritten. Nesting is tracked per thread, and each span carries
+    the tag of its thread (see ``tag``), e.g. the game and hero set by
+    ``vindinium.Client``, so concurrent games can be exported apart.
+
+    A disabled profiler returns a shared no-op span, so the instrumented
+    code only pays for a method call.
+
+    Example::
+
+        from vindinium.utils import PROFILER
+
+        PROFILER.enable()
+        with PROFILER.span('move'):
+            with PROFILER.span('update'):
+                ...
+        PROFILER.summary()['move/update']['p95']
+        PROFILER.export_json('profile.json')
+
+    Attributes:
+        capacity (int): the maximum number of spans kept.
+        enabled (bool): whether spans are recorded.
+    """
+
+    def __init__(self, capacity = 65536, enabled = False):
+        """Constructor.
+
+        Args:
+            capacity (int): the size of the ring buffer. Defaults to 65536.
+            enabled (bool): whether spans are recorded. Defaults to False.
+        """
+        self.capacity = capacity
+        self.enabled = enabled
+        self._local = threading.local()
+        self.clear()
+
+
+    def enable(self):
+        """Starts recording spans."""
+        self.enabled = True
+
+
+    def disable(self):
+        """Stops recording spans."""
+        self.enabled = False
+
+
+    def clear(self):
+        """Drops all recorded spans."""
+        self._counter = itertools.count()
+        self._spans = [None] * self.capacity
+
+
+    def tag(self, value):
+        """Sets the tag of the spans recorded by the current thread, e.g.
+        the game id."""
+        self._local.tag = value
+
+
+    def retag(self, old, new):
+        """Changes the tag of the recorded spans tagged ``old``, e.g. the
+        spans recorded before the game id was known."""
+        spans = self._spans
+        for k, span in enumerate(spans):
+            if span is not None and span[1] == old:
+                spans[k] = span[:1] + (new,) + span[2:]
+
+
+    def span(self, name):
+        """Returns a span to use in a ``with`` statement.
+
+        Args:
+            name (str): the name of the span.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name)
+
+
+    def records(self, tag = None):
+        """Returns the recorded spans, oldest first.
+
+        Args:
+            tag: only the spans with this tag. Defaults to None, all spans.
+
+        Returns:
+            (list) a dict for each span, with its ``tag``, ``path``,
+              ``depth``, ``start`` and ``elapsed`` time in seconds.
+        """
+        spans = sorted(span for span in self._spans if span is not None)
+        return [{'tag': t, 'path': path, 'depth': depth, 'start': start, 'elapsed': elapsed}
+                for _, t, path, depth, start, elapsed in spans
+                if tag is None or t == tag]
+
+
+    def summary(self, tag = None):
+        """Returns the statistics of the spans of each path.
+
+        Args:
+            tag: only the spans with this tag. Defaults to None, all spans.
+
+        Returns:
+            (dict) by path, the ``count`` of spans and the ``total``,
+              ``mean``, ``p50``, ``p95``, ``p99`` and ``max`` times in
+              seconds.
+        """
+        times = {}
+        for record in self.records(tag):
+            times.setdefault(record['path'], []).append(record['elapsed'])
+
+        summary = {}
+        for path, values in times.items():
+            values.sort()
+            summary[path] = {'count': len(values),
+                             'total': sum(values),
+                             'mean': sum(values) / len(values),
+                             'p50': percentile(values, 0.50),
+                             'p95': percentile(values, 0.95),
+                             'p99': percentile(values, 0.99),
+                             'max': values[-1]}
+        return summary
+
+
+    def export_json(self, path, tag = None):
+        """Writes the spans and their summary to a JSON file.
+
+        Args:
+            path (str): the file path.
+            tag: only the spans with this tag. Defaults to None, all spans.
+        """
+        with open(path, 'w') as f:
+            json.dump({'tag': tag,
+                       'summary': self.summary(tag),
+                       'spans': self.records(tag)}, f)
+
+
+    def export_csv(self, path, tag = None):
+        """Writes the spans to a CSV file, one row per span, and the summary
+        to a second CSV file next to it (``<name>.summary.csv``).
+
+        Args:
+            path (str): the file path.
+            tag: only the spans with this tag. Defaults to None, all spans.
+        """
+        fields = ['tag', 'path', 'depth', 'start', 'elapsed']
+        with open(path, 'wb') as f:
+            writer = csv.DictWriter(f, fields)
+            writer.writeheader()
+            writer.writerows(self.records(tag))
+
+        root, ext = path.rsplit('.', 1) if '.' in path else (path, 'csv')
+        stats = ['count', 'total', 'mean', 'p50', 'p95', 'p99', 'max']
+        with open('%s.summary.%s' % (root, ext), 'wb') as f:
+            writer = csv.writer(f)
+            writer.writerow(['path'] + stats)
+            for span_path, values in sorted(self.summary(tag).items()):
+                writer.writerow([span_path] + [values[stat] for stat in stats])
+
+
+    def _enter(self, name):
+        """Pushes a span of the current thread, returning its path and
+        depth."""
+        local = self._local
+        stack = getattr(local, 'stack', None)
+        if stack is None:
+            stack = local.stack = []
+
+        path = stack[-1] + '/' + name if stack else name
+        stack.append(path)
+        return path, len(stack) - 1
+
+
+    def _exit(self, path, depth, start, elapsed):
+        """Pops a span of the current thread and records it."""
+        self._local.stack.pop()
+
+        k = next(self._counter)
+        self._spans[k % self.capacity] = (k, getattr(self._local, 'tag', None),
+                                          path, depth, start, elapsed)
+
+
+class Span(Timer):
+    """A ``Timer`` recorded by a ``Profiler`` when it stops.
+
+    Attributes:
+        name (str): the name of the span.
+        path (str): the names of the enclosing spans and this one, joined by
+          ``/``.
+        depth (int): the number of enclosing spans.
+    """
+
+    def __init__(self, profiler, name):
+        """Constructor.
+
+        Args:
+            profiler (vindinium.utils.Profiler): where the span is recorded.
+            name (str): the name of the span.
+        """
+        Timer.__init__(self)
+        self.name = name
+        self.path = None
+        self.depth = None
+        self._profiler = profiler
+
+
+    def __enter__(self):
+        """Enters with"""
+        self.path, self.depth = self._profiler._enter(self.name)
+        self.tic()
+        return self
+
+
+    def __exit__(self, type, value, traceback):
+        """Leaves with"""
+        self.toc()
+        self._profiler._exit(self.path, self.depth, self._start_time, self.elapsed)
+
+
+class _NullSpan(object):
+    """The span of a disabled profiler, which does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# The profiler used by the package, disabled by default
+PROFILER = Profiler()
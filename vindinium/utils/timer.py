@@ -1,7 +1,12 @@
 import time
+import timeit
 
 __all__ = ['Timer']
 
+# the most precise clock: perf_counter where available, else the best
+# clock of the platform
+_clock = getattr(time, 'perf_counter', timeit.default_timer)
+
 
 class Timer(object):
     """Timer helper.
@@ -26,6 +31,9 @@ class Timer(object):
             # your code here
             print timer.toc()
 
+    The time is measured with ``time.perf_counter`` where available,
+    otherwise ``timeit.default_timer``.
+
     Attributes:
         elapsed (float): the elapsed time between ``tic()`` and ``toc()``.
     """
@@ -59,7 +67,7 @@ class Timer(object):
 
     def tic(self):
         """Start the timer."""
-        self._start_time = time.time()
+        self._start_time = _clock()
 
 
     def toc(self):
@@ -68,5 +76,5 @@ class Timer(object):
         Returns
             (float) the elapsed time.
         """
-        self.elapsed = time.time() - self._start_time
+        self.elapsed = _clock() - self._start_time
         return self.elapsed